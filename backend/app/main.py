@@ -82,6 +82,16 @@ async def startup_event():
     asyncio.create_task(init_services())
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """释放节点猎手的常驻进程和连接"""
+    if node_hunter:
+        try:
+            await node_hunter.shutdown()
+        except Exception as e:
+            print(f"⚠️ [System] 节点猎手关闭异常: {e}")
+
+
 # 伪装根目录
 @app.get("/", response_class=HTMLResponse)
 async def read_root():
@@ -1,22 +1,68 @@
 # backend/app/modules/link_scraper/link_scraper.py
 import re
 import json
-import base64
-from typing import List, Dict, Any, Optional
+import hashlib
+import os
+import time
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Awaitable, Callable, Optional
 import logging
 from urllib.parse import urlparse, urljoin
 import aiohttp
 import asyncio
 from bs4 import BeautifulSoup
-from aiohttp_socks import ProxyConnector
+from aiohttp_socks import ProxyError, ProxyConnectionError, ProxyTimeoutError
+
+from .session_manager import RouteSessionManager
+from .route_stats import RouteScoreboard
+from .stream_extractor import StreamingLinkExtractor, build_link_regex
 
 logger = logging.getLogger(__name__)
 
+# aiohttp 只有在安装了 brotli 时才能解码 br
+try:
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    ACCEPT_ENCODING = "gzip, deflate"
+
+# 对冲抓取：最优线路在 HEDGE_DELAY 秒内没有收到响应头时，并行发起下一条线路
+HEDGE_ENABLED = os.environ.get("SCRAPER_HEDGE_ENABLED", "true").lower() == "true"
+HEDGE_DELAY = float(os.environ.get("SCRAPER_HEDGE_DELAY", "1.5"))
+
+# 流式读取响应体的块大小
+STREAM_CHUNK_SIZE = 64 * 1024
+# 单次抓取总时长上限（线路超时只约束建连和读间隔，大文件持续有数据时不会被中途掐断）
+BODY_TIMEOUT = float(os.environ.get("SCRAPER_BODY_TIMEOUT", "60"))
+
+# 抓取结果状态
+FETCH_OK = "fetched"                # 正常下载并提取
+FETCH_NOT_MODIFIED = "not_modified"  # 服务器返回 304，复用上次的链接
+FETCH_UNCHANGED = "unchanged"        # 下载了但内容哈希未变，跳过提取
+FETCH_FAILED = "failed"
+
+
+@dataclass
+class SourceFetchResult:
+    """订阅源抓取结果（含下次条件请求所需的校验信息）"""
+    status: str
+    links: List[str] = field(default_factory=list)
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    sha256: Optional[str] = None
+    wire_bytes: int = 0   # 实际传输字节数（压缩后，无 Content-Length 时为解压后大小）
+    body_bytes: int = 0   # 解压后正文大小
+    route: Optional[str] = None
+    text: Optional[str] = None  # keep_text=True 且内容有变化时的完整正文
+
+
 class LinkScraper:
     """智能链接抓取器 (接入全球代理池)"""
 
     def __init__(self, pool_manager: Optional[Any] = None):
         self.pool_manager = pool_manager
+        self.sessions = RouteSessionManager()
+        self.route_stats = RouteScoreboard()
         self.user_agents = [
             'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
             'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36',
@@ -34,50 +80,187 @@ class LinkScraper:
         }
         self.node_keywords = ['订阅', 'subscribe', 'sub', '节点', 'node', 'proxy', 'v2ray', 'clash', 'free', 'share']
         self.github_patterns = [r'github\.com', r'raw\.githubusercontent\.com']
+        # 所有协议合并的单一正则（一次扫描提取全部链接）
+        self.link_regex = build_link_regex(self.patterns)
+
+    async def close(self):
+        """关闭所有线路的长期会话"""
+        await self.sessions.close()
 
     async def scrape_links_from_url(self, url: str) -> List[str]:
+        result = await self.fetch_source(url)
+        return result.links
+
+    def _get_chain(self) -> List[tuple]:
+        """代理链 + 直连，按历史胜率排序"""
         chain = []
         if self.pool_manager:
             chain = self.pool_manager.get_standard_chain()
         chain.append((None, "Direct", 5))
+        return self.route_stats.order(chain)
+
+    async def _request_via(self, proxy_url: Optional[str], name: str, timeout_sec: int, url: str,
+                           headers: Dict[str, str], first_byte: asyncio.Event,
+                           consume: Callable[[aiohttp.ClientResponse, str], Awaitable[Any]]) -> Any:
+        """经指定线路请求一次，由 consume 处理响应；非 200/304 或出错返回 None"""
+        session = None
+        try:
+            timeout = aiohttp.ClientTimeout(total=BODY_TIMEOUT, sock_connect=timeout_sec, sock_read=timeout_sec + 5)
+            async with self.sessions.acquire(proxy_url) as session:
+                async with session.get(url, headers=headers, timeout=timeout) as response:
+                    if response.status not in (200, 304):
+                        return None
+                    # 已收到响应头，暂不对冲下一条线路
+                    first_byte.set()
+                    return await consume(response, name)
+        except (ProxyError, ProxyConnectionError, ProxyTimeoutError):
+            await self.sessions.discard(proxy_url, session)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            pass
+        return None
 
-        for proxy_url, name, timeout_sec in chain:
-            try:
-                connector = ProxyConnector.from_url(proxy_url) if proxy_url else aiohttp.TCPConnector(ssl=False)
-                async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=timeout_sec + 5)) as session:
-                    headers = {'User-Agent': self.user_agents[0]}
-                    async with session.get(url, headers=headers) as response:
-                        if response.status == 200:
-                            content_type = response.headers.get('Content-Type', '').lower()
-                            if 'text/html' in content_type:
-                                html = await response.text()
-                                return await self.extract_links_from_html(html, url)
-                            else:
-                                text = await response.text()
-                                return self.extract_links_from_text(text)
-            except:
-                continue
-        logger.error(f"❌ [Scraper] 所有通道均无法抓取: {url}")
-        return []
+    async def _hedged_request(self, url: str, headers: Dict[str, str],
+                              consume: Callable[[aiohttp.ClientResponse, str], Awaitable[Any]]) -> Any:
+        """
+        对冲请求
+
+        按胜率顺序先走最优线路；HEDGE_DELAY 秒内还没有任何线路收到响应头，
+        就再发起下一条线路；某条线路失败则立即发起下一条。
+        第一个成功（consume 返回非 None）的线路胜出，其余请求取消。关闭对冲时退化为逐条顺序尝试。
+        """
+        chain = self._get_chain()
+        pending: Dict[asyncio.Task, tuple] = {}
+        started = time.monotonic()
+        next_index = 0
+
+        def launch():
+            nonlocal next_index
+            proxy_url, name, timeout_sec = chain[next_index]
+            next_index += 1
+            first_byte = asyncio.Event()
+            task = asyncio.create_task(
+                self._request_via(proxy_url, name, timeout_sec, url, headers, first_byte, consume)
+            )
+            pending[task] = (proxy_url, first_byte)
+            self.route_stats.record_attempt(proxy_url)
+
+        try:
+            launch()
+            while pending:
+                can_hedge = HEDGE_ENABLED and next_index < len(chain) and \
+                    not any(first_byte.is_set() for _, first_byte in pending.values())
+                done, _ = await asyncio.wait(
+                    pending, timeout=HEDGE_DELAY if can_hedge else None, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    # 对冲：等待期间仍可能已有线路收到响应头
+                    if not any(first_byte.is_set() for _, first_byte in pending.values()):
+                        launch()
+                    continue
+                for task in done:
+                    proxy_url, _ = pending.pop(task)
+                    result = task.result()
+                    if result is not None:
+                        self.route_stats.record_win(proxy_url, time.monotonic() - started)
+                        return result
+                    self.route_stats.record_failure(proxy_url)
+                    # 失败的线路立即由下一条接替（关闭对冲时只在全部失败后接替）
+                    if next_index < len(chain) and (HEDGE_ENABLED or not pending):
+                        launch()
+            return None
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+    async def fetch_source(self, url: str, etag: Optional[str] = None, last_modified: Optional[str] = None,
+                           sha256: Optional[str] = None, cached_links: Optional[List[str]] = None,
+                           keep_text: bool = False) -> SourceFetchResult:
+        """
+        抓取订阅源并提取链接（支持条件请求）
+
+        传入上次的 etag / last_modified / sha256 和提取出的 cached_links 时：
+        - 发送 If-None-Match / If-Modified-Since，304 直接复用 cached_links
+        - 200 但正文哈希与上次相同，同样复用 cached_links
+        没有 cached_links 时不发送条件请求头（否则 304 之后无链接可用）
+
+        非 HTML 响应按块流式读取并提取链接，不在内存中保留完整正文；
+        keep_text=True 时完整读取并在 result.text 中返回正文（供需要解析 YAML 等格式的调用方使用）。
+        """
+        headers = {'User-Agent': self.user_agents[0], 'Accept-Encoding': ACCEPT_ENCODING}
+        if cached_links is not None:
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
+
+        async def consume(response: aiohttp.ClientResponse, route: str) -> Optional[SourceFetchResult]:
+            if response.status == 304:
+                if cached_links is None:
+                    return None
+                return SourceFetchResult(
+                    status=FETCH_NOT_MODIFIED, links=cached_links,
+                    etag=response.headers.get('ETag', etag),
+                    last_modified=response.headers.get('Last-Modified', last_modified),
+                    sha256=sha256, route=route
+                )
+
+            result = SourceFetchResult(
+                status=FETCH_OK,
+                etag=response.headers.get('ETag'),
+                last_modified=response.headers.get('Last-Modified'),
+                route=route
+            )
+            content_type = response.headers.get('Content-Type', '').lower()
+            is_html = 'text/html' in content_type
+            if is_html or keep_text:
+                body = await response.read()
+                result.sha256 = hashlib.sha256(body).hexdigest()
+                result.body_bytes = len(body)
+                if not (cached_links is not None and result.sha256 == sha256):
+                    text = body.decode(response.get_encoding(), errors='replace')
+                    del body
+                    if is_html:
+                        result.links = await self.extract_links_from_html(text, url)
+                    else:
+                        result.links = self.extract_links_from_text(text)
+                    if keep_text:
+                        result.text = text
+            else:
+                extractor = StreamingLinkExtractor(self.link_regex, response.charset or 'utf-8')
+                async for chunk in response.content.iter_chunked(STREAM_CHUNK_SIZE):
+                    extractor.feed(chunk)
+                result.links = extractor.finish()
+                result.sha256 = extractor.sha256
+                result.body_bytes = extractor.body_bytes
+            result.wire_bytes = response.content_length or result.body_bytes
+
+            if cached_links is not None and result.sha256 == sha256:
+                result.status = FETCH_UNCHANGED
+                result.links = cached_links
+            return result
+
+        result = await self._hedged_request(url, headers, consume)
+        if result is None:
+            logger.error(f"❌ [Scraper] 所有通道均无法抓取: {url}")
+            return SourceFetchResult(status=FETCH_FAILED)
+        return result
 
     async def test_link_validity(self, url: str) -> Dict[str, Any]:
-        chain = []
-        if self.pool_manager:
-            chain = self.pool_manager.get_standard_chain()
-        chain.append((None, "Direct", 5))
+        async def consume(response: aiohttp.ClientResponse, route: str) -> Optional[Dict[str, Any]]:
+            if response.status != 200:
+                return None
+            content = await response.text(errors='replace')
+            is_valid = self.validate_node_content(content)
+            return {'valid': is_valid, 'status': 200, 'content': content if is_valid else None, 'size': len(content), 'nodes_found': len(self.extract_links_from_text(content))}
 
-        for proxy_url, name, timeout_sec in chain:
-            try:
-                connector = ProxyConnector.from_url(proxy_url) if proxy_url else aiohttp.TCPConnector(ssl=False)
-                async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=timeout_sec + 5)) as session:
-                    async with session.get(url, headers={'User-Agent': self.user_agents[0]}) as response:
-                        if response.status == 200:
-                            content = await response.text()
-                            is_valid = self.validate_node_content(content)
-                            return {'valid': is_valid, 'status': 200, 'content': content if is_valid else None, 'size': len(content), 'nodes_found': len(self.extract_links_from_text(content))}
-            except:
-                continue
-        return {'valid': False, 'error': "All connections failed"}
+        result = await self._hedged_request(url, {'User-Agent': self.user_agents[0]}, consume)
+        if result is None:
+            return {'valid': False, 'error': "All connections failed"}
+        return result
 
     async def extract_links_from_html(self, html: str, base_url: str) -> List[str]:
         links = []
@@ -89,32 +272,17 @@ class LinkScraper:
                     links.append(full_url)
             text = soup.get_text()
             links.extend(self.extract_links_from_text(text))
-            for pattern in self.patterns.values():
-                matches = re.findall(pattern, html)
-                for m in matches:
-                    links.append(urljoin(base_url, m if isinstance(m, str) else m[0]))
+            for m in self.link_regex.finditer(html):
+                links.append(urljoin(base_url, m.group(0)))
         except:
             pass
         return list(set(links))
 
     def extract_links_from_text(self, text: str) -> List[str]:
-        # 🔥 关键修复：尝试 Base64 解码
-        try:
-            # 移除空白字符
-            clean_text = text.strip().replace(" ", "").replace("\n", "")
-            # 简单的 Base64 格式检查
-            if len(clean_text) % 4 == 0 and re.match(r'^[A-Za-z0-9+/=]+$', clean_text):
-                decoded = base64.b64decode(clean_text).decode('utf-8')
-                text = decoded # 如果解码成功，使用解码后的内容进行正则匹配
-        except:
-            pass
-
-        links = []
-        for pattern in self.patterns.values():
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            for m in matches:
-                links.append(m if isinstance(m, str) else m[0])
-        return links
+        # 🔥 Base64 订阅自动解码，所有协议一次扫描
+        extractor = StreamingLinkExtractor(self.link_regex)
+        extractor.feed(text.encode('utf-8', errors='replace'))
+        return extractor.finish()
 
     def validate_node_content(self, content: str) -> bool:
         if not content.strip(): return False
@@ -0,0 +1,65 @@
+# backend/app/modules/link_scraper/route_stats.py
+"""
+抓取线路胜率统计
+
+对冲抓取时多条线路同时竞争，记录每条线路的发起次数和胜出次数，
+下次按胜率（拉普拉斯平滑，未知线路视为 0.5）重新排列代理链，
+胜率相同的保持原有顺序。
+"""
+
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from .session_manager import DIRECT_ROUTE
+
+# 代理链中的随机代理会不断轮换，统计条目数设上限
+MAX_TRACKED_ROUTES = 256
+
+ChainItem = Tuple[Optional[str], str, int]
+
+
+class RouteScoreboard:
+    """线路 -> {attempts, wins, failures, last_latency}"""
+
+    def __init__(self, max_routes: int = MAX_TRACKED_ROUTES):
+        self.max_routes = max_routes
+        self._routes: "OrderedDict[str, Dict]" = OrderedDict()
+
+    def _entry(self, proxy_url: Optional[str]) -> Dict:
+        route = proxy_url or DIRECT_ROUTE
+        entry = self._routes.get(route)
+        if entry is None:
+            entry = {"attempts": 0, "wins": 0, "failures": 0, "last_latency": None}
+            self._routes[route] = entry
+            while len(self._routes) > self.max_routes:
+                self._routes.popitem(last=False)
+        else:
+            self._routes.move_to_end(route)
+        return entry
+
+    def record_attempt(self, proxy_url: Optional[str]):
+        self._entry(proxy_url)["attempts"] += 1
+
+    def record_win(self, proxy_url: Optional[str], latency: float):
+        entry = self._entry(proxy_url)
+        entry["wins"] += 1
+        entry["last_latency"] = round(latency, 3)
+
+    def record_failure(self, proxy_url: Optional[str]):
+        self._entry(proxy_url)["failures"] += 1
+
+    def score(self, proxy_url: Optional[str]) -> float:
+        entry = self._routes.get(proxy_url or DIRECT_ROUTE)
+        if entry is None:
+            return 0.5
+        return (entry["wins"] + 1) / (entry["attempts"] + 2)
+
+    def order(self, chain: List[ChainItem]) -> List[ChainItem]:
+        """按胜率从高到低排列代理链（稳定排序）"""
+        return sorted(chain, key=lambda item: -self.score(item[0]))
+
+    def snapshot(self) -> Dict[str, Dict]:
+        return {
+            route: {**entry, "win_rate": round(self.score(None if route == DIRECT_ROUTE else route), 3)}
+            for route, entry in self._routes.items()
+        }
@@ -0,0 +1,149 @@
+# backend/app/modules/link_scraper/session_manager.py
+"""
+按线路复用的 HTTP 会话
+
+原先每个 URL、每次代理尝试都新建 ClientSession + Connector，
+抓取 20 多个源时每次都要重新解析 DNS、重新握手 TLS。
+这里为每条上游线路（直连 + 代理链中的每个代理）保持一个长期会话：
+- keep-alive 复用连接，DNS 结果缓存
+- 按主机限制连接数，避免同时对 raw.githubusercontent.com 打开过多连接
+- 代理链会随可用节点轮换，会话数按 LRU 限制，长时间未使用的会话自动关闭
+- 会话按引用计数借用，被淘汰的会话等在途请求全部结束后才关闭
+"""
+
+import logging
+import os
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+import aiohttp
+from aiohttp_socks import ProxyConnector
+
+logger = logging.getLogger(__name__)
+
+SCRAPER_MAX_SESSIONS = int(os.environ.get("SCRAPER_MAX_SESSIONS", "16"))
+SCRAPER_CONN_LIMIT = int(os.environ.get("SCRAPER_CONN_LIMIT", "64"))
+SCRAPER_LIMIT_PER_HOST = int(os.environ.get("SCRAPER_LIMIT_PER_HOST", "6"))
+SCRAPER_DNS_TTL = int(os.environ.get("SCRAPER_DNS_TTL", "300"))
+SCRAPER_KEEPALIVE = float(os.environ.get("SCRAPER_KEEPALIVE", "30"))
+SCRAPER_SESSION_IDLE = float(os.environ.get("SCRAPER_SESSION_IDLE", "600"))
+
+DIRECT_ROUTE = "direct"
+
+
+class RouteSessionManager:
+    """线路 -> 长期 ClientSession"""
+
+    def __init__(self, max_sessions: int = SCRAPER_MAX_SESSIONS,
+                 idle_timeout: float = SCRAPER_SESSION_IDLE):
+        self.max_sessions = max(1, max_sessions)
+        self.idle_timeout = idle_timeout
+        # route -> (session, last_used)
+        self._sessions: "OrderedDict[str, Tuple[aiohttp.ClientSession, float]]" = OrderedDict()
+        # 会话 -> 正在使用它的请求数
+        self._in_use: Dict[aiohttp.ClientSession, int] = {}
+        self.created = 0
+        self.reused = 0
+
+    def _new_connector(self, proxy_url: Optional[str]):
+        kwargs = dict(
+            limit=SCRAPER_CONN_LIMIT,
+            limit_per_host=SCRAPER_LIMIT_PER_HOST,
+            ttl_dns_cache=SCRAPER_DNS_TTL,
+            keepalive_timeout=SCRAPER_KEEPALIVE,
+        )
+        if proxy_url:
+            return ProxyConnector.from_url(proxy_url, **kwargs)
+        return aiohttp.TCPConnector(ssl=False, **kwargs)
+
+    @asynccontextmanager
+    async def acquire(self, proxy_url: Optional[str] = None) -> AsyncIterator[aiohttp.ClientSession]:
+        """
+        借用线路对应的会话（proxy_url 为 None 表示直连），退出时归还
+
+        会话被多个请求共享：淘汰、空闲回收或 discard 只把会话移出表，
+        仍有请求在用的会话等最后一个使用者归还时才关闭。
+        超时请在每次请求时单独传入，会话本身不设总超时
+        """
+        session = await self._get(proxy_url)
+        self._in_use[session] = self._in_use.get(session, 0) + 1
+        try:
+            yield session
+        finally:
+            await self._release(session, proxy_url or DIRECT_ROUTE)
+
+    async def _get(self, proxy_url: Optional[str]) -> aiohttp.ClientSession:
+        route = proxy_url or DIRECT_ROUTE
+        now = time.monotonic()
+        await self._close_idle(now)
+
+        cached = self._sessions.get(route)
+        if cached is not None and not cached[0].closed:
+            self._sessions[route] = (cached[0], now)
+            self._sessions.move_to_end(route)
+            self.reused += 1
+            return cached[0]
+
+        session = aiohttp.ClientSession(connector=self._new_connector(proxy_url))
+        self._sessions[route] = (session, now)
+        self._sessions.move_to_end(route)
+        self.created += 1
+        while len(self._sessions) > self.max_sessions:
+            _, (old, _) = self._sessions.popitem(last=False)
+            await self._retire(old)
+        return session
+
+    async def _release(self, session: aiohttp.ClientSession, route: str):
+        remaining = self._in_use.get(session, 1) - 1
+        if remaining > 0:
+            self._in_use[session] = remaining
+            return
+        self._in_use.pop(session, None)
+        cached = self._sessions.get(route)
+        if cached is not None and cached[0] is session:
+            # 空闲计时从最后一次归还算起
+            self._sessions[route] = (session, time.monotonic())
+        elif not session.closed:
+            # 已被移出表（淘汰 / 代理失效），最后一个使用者负责关闭
+            await session.close()
+
+    async def _retire(self, session: aiohttp.ClientSession):
+        """会话已移出表：没人在用就立即关闭，否则留给最后一个使用者关闭"""
+        if session not in self._in_use:
+            await session.close()
+
+    async def _close_idle(self, now: float):
+        idle = [route for route, (session, last_used) in self._sessions.items()
+                if now - last_used > self.idle_timeout and session not in self._in_use]
+        for route in idle:
+            session, _ = self._sessions.pop(route)
+            await session.close()
+
+    async def discard(self, proxy_url: Optional[str] = None,
+                      session: Optional[aiohttp.ClientSession] = None):
+        """
+        丢弃某条线路的会话（代理失效时下次重新建立；正在使用的请求不受影响）
+
+        传入 session 时，只有表中仍是这个会话才丢弃（线路可能已经换了新会话）
+        """
+        route = proxy_url or DIRECT_ROUTE
+        cached = self._sessions.get(route)
+        if cached is None or (session is not None and cached[0] is not session):
+            return
+        del self._sessions[route]
+        await self._retire(cached[0])
+
+    async def close(self):
+        sessions = {session for session, _ in self._sessions.values()} | set(self._in_use)
+        self._sessions.clear()
+        self._in_use.clear()
+        for session in sessions:
+            try:
+                await session.close()
+            except Exception as e:
+                logger.debug(f"关闭会话失败: {e}")
+
+    def stats(self) -> dict:
+        return {"sessions": len(self._sessions), "created": self.created, "reused": self.reused}
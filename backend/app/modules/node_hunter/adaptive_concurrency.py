@@ -0,0 +1,219 @@
+# backend/app/modules/node_hunter/adaptive_concurrency.py
+"""
+自适应并发控制器 (AIMD)
+
+替代 _test_nodes_with_new_system 里手工调低的固定并发：
+- 每轮批量检测结束后根据探测信号调整窗口
+- 健康（超时率、内核启动失败率、成功探测延迟、CPU/内存压力都正常）→ 加法增大
+- 拥塞 → 乘法减小
+窗口包括 Clash 并发、Xray 并发（同时运行的内核进程数）和每批取出的节点数。
+"""
+
+import os
+import time
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import psutil
+
+from .core_readiness import FAILURE_CORE_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+# 压力阈值
+CPU_PRESSURE_PERCENT = 85.0
+RSS_PRESSURE_MB = float(os.environ.get("NODE_CHECK_RSS_LIMIT_MB", "1536"))
+
+# 与基线相比超时率上升多少视为拥塞（死节点本身就会超时，所以比较的是变化量）
+TIMEOUT_RATE_MARGIN = 0.2
+# 内核启动失败率超过多少视为拥塞
+SPAWN_FAILURE_RATE_LIMIT = 0.1
+# 成功探测的平均延迟超过基线多少倍视为拥塞
+LATENCY_INFLATION_LIMIT = 2.0
+
+
+@dataclass
+class ConcurrencyWindow:
+    """单个 AIMD 窗口"""
+    name: str
+    value: float
+    minimum: int
+    maximum: int
+    increase_step: float
+    decrease_factor: float = 0.5
+
+    @property
+    def limit(self) -> int:
+        return max(self.minimum, min(self.maximum, int(self.value)))
+
+    def increase(self):
+        self.value = min(self.maximum, self.value + self.increase_step)
+
+    def decrease(self):
+        self.value = max(self.minimum, self.value * self.decrease_factor)
+
+
+@dataclass
+class StageSignals:
+    """一轮检测中某个阶段（clash / xray）收集到的探测信号"""
+    probes: int = 0
+    successes: int = 0
+    timeouts: int = 0
+    spawn_failures: int = 0
+    latencies: List[int] = field(default_factory=list)
+
+    @property
+    def timeout_rate(self) -> float:
+        return self.timeouts / self.probes if self.probes else 0.0
+
+    @property
+    def spawn_failure_rate(self) -> float:
+        return self.spawn_failures / self.probes if self.probes else 0.0
+
+    @property
+    def avg_latency(self) -> Optional[float]:
+        return sum(self.latencies) / len(self.latencies) if self.latencies else None
+
+
+class AdaptiveConcurrencyController:
+    """AIMD 并发控制器"""
+
+    def __init__(self, clash_concurrency: int = 5, xray_concurrency: int = 3, batch_size: int = 50):
+        self.windows: Dict[str, ConcurrencyWindow] = {
+            "clash": ConcurrencyWindow("clash", clash_concurrency, minimum=2, maximum=64, increase_step=2),
+            "xray": ConcurrencyWindow("xray", xray_concurrency, minimum=1, maximum=8, increase_step=1),
+            "batch": ConcurrencyWindow("batch", batch_size, minimum=20, maximum=500, increase_step=25),
+        }
+        self._signals: Dict[str, StageSignals] = {}
+        # 基线：历史健康轮次的超时率 / 成功延迟（EWMA）
+        self._baseline_timeout_rate: Dict[str, float] = {}
+        self._baseline_latency: Dict[str, float] = {}
+        self.last_decision: Dict = {}
+        self.rounds = 0
+        # cpu_percent(interval=None) 的首次调用没有参考点，先预热一次
+        psutil.cpu_percent(interval=None)
+
+    def limit(self, name: str) -> int:
+        """当前窗口值"""
+        return self.windows[name].limit
+
+    @property
+    def batch_size(self) -> int:
+        return self.windows["batch"].limit
+
+    def record(self, stage: str, is_available: bool, latency_ms: Optional[int] = None,
+               error_message: Optional[str] = None, failure_reason: Optional[str] = None):
+        """记录一次探测结果（ClashCheckResult / V2RayCheckResult 的字段）"""
+        signals = self._signals.setdefault(stage, StageSignals())
+        signals.probes += 1
+        if is_available:
+            signals.successes += 1
+            if latency_ms:
+                signals.latencies.append(latency_ms)
+        elif failure_reason == FAILURE_CORE_TIMEOUT or (error_message or "").startswith("检测异常"):
+            # 内核起不来或检测器自身异常，属于本机过载信号（core_exited 多为节点配置问题，不计入）
+            signals.spawn_failures += 1
+        elif error_message == "连接超时":
+            signals.timeouts += 1
+
+    def record_results(self, stage: str, results: List):
+        for result in results:
+            self.record(stage, result.is_available, result.latency_ms,
+                        result.error_message, getattr(result, "failure_reason", None))
+
+    def _system_pressure(self) -> Dict:
+        """本进程及其子进程（mihomo / Xray）的 CPU、内存压力"""
+        try:
+            cpu = psutil.cpu_percent(interval=None)
+            proc = psutil.Process()
+            rss = proc.memory_info().rss
+            for child in proc.children(recursive=True):
+                try:
+                    rss += child.memory_info().rss
+                except psutil.Error:
+                    pass
+            return {"cpu_percent": cpu, "rss_mb": round(rss / 1024 / 1024, 1)}
+        except Exception as e:
+            logger.debug(f"读取系统负载失败: {e}")
+            return {"cpu_percent": 0.0, "rss_mb": 0.0}
+
+    def _stage_congested(self, stage: str, signals: StageSignals) -> List[str]:
+        reasons = []
+        if signals.spawn_failure_rate > SPAWN_FAILURE_RATE_LIMIT:
+            reasons.append(f"{stage}内核启动失败率{signals.spawn_failure_rate:.0%}")
+
+        baseline_timeout = self._baseline_timeout_rate.get(stage)
+        if baseline_timeout is not None and signals.timeout_rate > baseline_timeout + TIMEOUT_RATE_MARGIN:
+            reasons.append(f"{stage}超时率{signals.timeout_rate:.0%}(基线{baseline_timeout:.0%})")
+
+        baseline_latency = self._baseline_latency.get(stage)
+        avg_latency = signals.avg_latency
+        if baseline_latency and avg_latency and avg_latency > baseline_latency * LATENCY_INFLATION_LIMIT:
+            reasons.append(f"{stage}延迟{avg_latency:.0f}ms(基线{baseline_latency:.0f}ms)")
+        return reasons
+
+    def _update_baseline(self, stage: str, signals: StageSignals, alpha: float = 0.3):
+        old = self._baseline_timeout_rate.get(stage)
+        self._baseline_timeout_rate[stage] = signals.timeout_rate if old is None else \
+            (1 - alpha) * old + alpha * signals.timeout_rate
+        if signals.avg_latency:
+            old = self._baseline_latency.get(stage)
+            self._baseline_latency[stage] = signals.avg_latency if old is None else \
+                (1 - alpha) * old + alpha * signals.avg_latency
+
+    def end_round(self) -> Dict:
+        """
+        一轮批量检测结束：根据本轮信号调整窗口
+
+        Returns:
+            本轮决策（同时保存在 last_decision 中）
+        """
+        self.rounds += 1
+        pressure = self._system_pressure()
+        reasons = []
+        if pressure["cpu_percent"] >= CPU_PRESSURE_PERCENT:
+            reasons.append(f"CPU {pressure['cpu_percent']:.0f}%")
+        if pressure["rss_mb"] >= RSS_PRESSURE_MB:
+            reasons.append(f"内存 {pressure['rss_mb']:.0f}MB")
+
+        congested_stages = set()
+        for stage, signals in self._signals.items():
+            stage_reasons = self._stage_congested(stage, signals)
+            if stage_reasons:
+                congested_stages.add(stage)
+                reasons.extend(stage_reasons)
+
+        system_pressure = any(r.startswith(("CPU", "内存")) for r in reasons)
+        for stage in ("clash", "xray"):
+            if stage not in self._signals:
+                continue
+            if system_pressure or stage in congested_stages:
+                self.windows[stage].decrease()
+            else:
+                self.windows[stage].increase()
+                self._update_baseline(stage, self._signals[stage])
+
+        if reasons:
+            self.windows["batch"].decrease()
+        elif self._signals:
+            self.windows["batch"].increase()
+
+        self.last_decision = {
+            "action": "decrease" if reasons else "increase",
+            "reasons": reasons,
+            "pressure": pressure,
+            "time": time.time(),
+        }
+        self._signals = {}
+        return self.last_decision
+
+    def snapshot(self) -> Dict:
+        """当前窗口状态（用于 /nodes/stats）"""
+        return {
+            "clash_concurrency": self.limit("clash"),
+            "xray_concurrency": self.limit("xray"),
+            "batch_size": self.batch_size,
+            "rounds": self.rounds,
+            "last_decision": self.last_decision,
+        }
@@ -5,15 +5,26 @@ import re
 import logging
 import base64
 import yaml
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Optional, Tuple
 
 try:
-    from .parsers import parse_node_url
+    from .parsers import parse_many
+    from .country_matcher import compile_keywords
 except ImportError:
-    from parsers import parse_node_url
+    from parsers import parse_many
+    from country_matcher import compile_keywords
+
+try:
+    from ..link_scraper.link_scraper import FETCH_OK, FETCH_FAILED
+except ImportError:
+    FETCH_OK, FETCH_FAILED = "fetched", "failed"
 
 logger = logging.getLogger(__name__)
 
+# 明确的回国关键字 / 明确的出境标志（名称已转为大写）
+BACK_HOME_KEYWORDS = ["回国", "BACK"]
+EXIT_KEYWORDS = ["US", "JP", "HK", "SG", "TW", "KR", "出", "->"]
+
 
 class ChinaHunter:
     """
@@ -22,11 +33,17 @@ class ChinaHunter:
     1. 接入 TelegramV2rayCollector & LalatinaHub (数万节点的大池子)。
     2. 增强型关键字过滤，覆盖中国主流城市和云厂商。
     3. 智能解析混合格式 (Base64, YAML, Text)。
+
+    传入 fetch_service 时通过共享抓取服务下载（与 NodeHunter 合并重复请求、共用源健康状态），
+    否则自行直连下载。
     """
 
-    def __init__(self):
+    def __init__(self, fetch_service: Optional[Any] = None):
         self.scan_cycle_count = 0
-        self.source_stats = {}
+        self.fetch_service = fetch_service
+        self.source_stats = fetch_service.source_stats if fetch_service else {}
+        # 各源上次解析出的节点（共享抓取返回内容未变化时复用）
+        self.source_nodes: Dict[str, List[Dict[str, Any]]] = {}
 
         # 🎯 关键字过滤器：大幅扩充国内城市和运营商
         self.cn_keywords = [
@@ -36,6 +53,10 @@ class ChinaHunter:
             "Aliyun", "Tencent", "Huawei", "Qcloud", "BGP", "CT", "CU", "CM",  # 运营商/云厂商
             "江苏", "浙江", "广东", "四川", "山东"
         ]
+        # 关键字在初始化时编译为正则，每个名称只扫描一遍
+        self._back_home_regex = compile_keywords(BACK_HOME_KEYWORDS)
+        self._exit_regex = compile_keywords(EXIT_KEYWORDS)
+        self._cn_regex = compile_keywords(kw.upper() for kw in self.cn_keywords)
 
         self.sources = [
             # === 👑 神级聚合 (专门爬取 TG/Discord/Twitter) ===
@@ -68,10 +89,16 @@ class ChinaHunter:
         ]
 
         # 初始化状态
-        for src in self.sources:
-            self.source_stats[src] = {"is_disabled": False, "disabled_at": 0, "retry_fails": 0}
+        if fetch_service:
+            fetch_service.register_sources(self.sources)
+        else:
+            for src in self.sources:
+                self.source_stats[src] = {"is_disabled": False, "disabled_at": 0, "retry_fails": 0}
 
     async def fetch_all(self) -> List[Dict[str, Any]]:
+        if self.fetch_service:
+            return await self._fetch_all_shared()
+
         self.scan_cycle_count += 1
         current_cycle = self.scan_cycle_count
 
@@ -104,20 +131,7 @@ class ChinaHunter:
                     stats["is_disabled"] = False
                     stats["retry_fails"] = 0
 
-                for node in nodes:
-                    # 🔍 核心筛选
-                    if self._is_cn_node(node, url):
-                        # 强制加上国旗
-                        if "🇨🇳" not in node.get('name', ''):
-                            node['name'] = f"🇨🇳 {node.get('name')}"
-
-                        node['country'] = 'CN'
-                        node['type'] = 'back_to_china'
-
-                        unique_id = f"{node['host']}:{node['port']}"
-                        if unique_id not in seen:
-                            seen.add(unique_id)
-                            merged_nodes.append(node)
+                self._collect_cn_nodes(url, nodes, seen, merged_nodes)
             else:
                 if not stats["is_disabled"]:
                     stats["is_disabled"] = True
@@ -126,6 +140,58 @@ class ChinaHunter:
         logger.info(f"🇨🇳 [全网猎手] 经深度筛选，捕获 {len(merged_nodes)} 个回国节点")
         return merged_nodes
 
+    async def _fetch_all_shared(self) -> List[Dict[str, Any]]:
+        """经共享抓取服务抓取（源健康由服务统一维护）"""
+        target_urls = self.fetch_service.select_targets(self.sources)
+        if not target_urls: return []
+
+        logger.info(f"🇨🇳 [全网猎手] 扫描 {len(target_urls)} 个聚合源 (含TG/Discord采集库)...")
+
+        results = await asyncio.gather(*[self._fetch_shared(url) for url in target_urls])
+
+        merged_nodes = []
+        seen = set()
+        for url, (nodes, is_success) in zip(target_urls, results):
+            if is_success:
+                self._collect_cn_nodes(url, nodes, seen, merged_nodes)
+
+        logger.info(f"🇨🇳 [全网猎手] 经深度筛选，捕获 {len(merged_nodes)} 个回国节点")
+        return merged_nodes
+
+    async def _fetch_shared(self, url: str) -> Tuple[List[Dict[str, Any]], bool]:
+        result = await self.fetch_service.fetch(url)
+        if result.status == FETCH_FAILED:
+            return [], False
+        if result.text is not None:
+            nodes = await self._parse_text_async(url, result.text)
+        elif result.status != FETCH_OK and url in self.source_nodes:
+            # 内容未变化（304 / 哈希相同），复用上次的解析结果
+            nodes = self.source_nodes[url]
+        else:
+            # 未登记为需要正文的源：只能解析提取出的链接
+            nodes = await asyncio.get_running_loop().run_in_executor(
+                None, self._extract_links, "\n".join(result.links)
+            )
+        self.source_nodes[url] = nodes
+        # 返回副本，筛选时会改写名称和国家
+        return [dict(node) for node in nodes], True
+
+    def _collect_cn_nodes(self, url: str, nodes: List[Dict[str, Any]], seen: set, merged_nodes: List[Dict[str, Any]]):
+        for node in nodes:
+            # 🔍 核心筛选
+            if self._is_cn_node(node, url):
+                # 强制加上国旗
+                if "🇨🇳" not in node.get('name', ''):
+                    node['name'] = f"🇨🇳 {node.get('name')}"
+
+                node['country'] = 'CN'
+                node['type'] = 'back_to_china'
+
+                unique_id = f"{node['host']}:{node['port']}"
+                if unique_id not in seen:
+                    seen.add(unique_id)
+                    merged_nodes.append(node)
+
     def _is_cn_node(self, node: Dict, source_url: str) -> bool:
         """判断是否为回国节点"""
         # 🔥 核心修复：更严格的判断，防止误伤
@@ -137,19 +203,12 @@ class ChinaHunter:
         name = node.get('name', '').upper()
         
         # 明确的回国关键字
-        back_home_keywords = ["回国", "BACK"]
-        for kw in back_home_keywords:
-            if kw in name:
-                return True
+        if self._back_home_regex.search(name):
+            return True
 
         # 城市和运营商关键字 (仅当没有明确的“出境”标志时)
-        exit_keywords = ["US", "JP", "HK", "SG", "TW", "KR", "出", "->"]
-        has_exit_keyword = any(kw in name for kw in exit_keywords)
-        
-        if not has_exit_keyword:
-            for kw in self.cn_keywords:
-                if kw.upper() in name:
-                    return True
+        if not self._exit_regex.search(name):
+            return self._cn_regex.search(name) is not None
 
         return False
 
@@ -161,24 +220,32 @@ class ChinaHunter:
                 async with session.get(url, timeout=30) as resp:
                     if resp.status != 200: return [], False
                     text = await resp.text()
-
-                    # 🕵️ 智能格式识别
-                    if "proxies:" in text or url.endswith(".yaml") or url.endswith(".yml"):
-                        nodes.extend(self._parse_yaml(text))
-
-                    elif self._is_likely_base64(text):
-                        decoded = self._safe_base64_decode(text)
-                        if decoded:
-                            nodes.extend(self._extract_links(decoded))
-
-                    else:
-                        nodes.extend(self._extract_links(text))
-                        nodes.extend(self._extract_raw_ips(text))
+                    nodes.extend(await self._parse_text_async(url, text))
 
             return nodes, True
         except Exception:
             return [], False
 
+    async def _parse_text_async(self, url: str, text: str) -> List[Dict[str, Any]]:
+        """在线程中解析源内容（大文件的 YAML / 链接解析不阻塞事件循环）"""
+        return await asyncio.get_running_loop().run_in_executor(None, self._parse_text, url, text)
+
+    def _parse_text(self, url: str, text: str) -> List[Dict[str, Any]]:
+        # 🕵️ 智能格式识别
+        nodes = []
+        if "proxies:" in text or url.endswith(".yaml") or url.endswith(".yml"):
+            nodes.extend(self._parse_yaml(text))
+
+        elif self._is_likely_base64(text):
+            decoded = self._safe_base64_decode(text)
+            if decoded:
+                nodes.extend(self._extract_links(decoded))
+
+        else:
+            nodes.extend(self._extract_links(text))
+            nodes.extend(self._extract_raw_ips(text))
+        return nodes
+
     def _parse_yaml(self, text: str) -> List[Dict[str, Any]]:
         nodes = []
         try:
@@ -217,6 +284,7 @@ class ChinaHunter:
 
     def _extract_links(self, text: str) -> List[Dict[str, Any]]:
         nodes = []
+        links = []
         for line in text.splitlines():
             line = line.strip()
             if not line: continue
@@ -248,9 +316,16 @@ class ChinaHunter:
                 except: pass
                 continue
 
-            node = parse_node_url(line)
-            if node: nodes.append(node)
-        return nodes
+            # 先占位，整批解析后按原顺序填回
+            links.append((len(nodes), line))
+            nodes.append(None)
+
+        # 其余链接整批解析（批量查询 / 写入解析缓存，量大时走进程池）
+        if links:
+            parsed, _ = parse_many([line for _, line in links])
+            for (index, _), node in zip(links, parsed):
+                nodes[index] = node
+        return [node for node in nodes if node]
 
     def _extract_raw_ips(self, text: str) -> List[Dict[str, Any]]:
         nodes = []
@@ -9,13 +9,18 @@ import json
 import subprocess
 import tempfile
 import os
+import shutil
+import secrets
 import yaml
 import httpx
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional
+from urllib.parse import quote
 from dataclasses import dataclass
 import logging
 
+from .core_readiness import CoreStartupError, find_free_port, wait_for_port, wait_until_ready
+
 logger = logging.getLogger(__name__)
 
 
@@ -26,6 +31,12 @@ class ClashCheckResult:
     latency_ms: Optional[int] = None
     error_message: Optional[str] = None
     protocol: Optional[str] = None
+    failure_reason: Optional[str] = None  # 内核启动类失败的分类（见 core_readiness）
+
+
+# 流式结果回调：每得到一个检测结果立即调用 on_result(输入下标, 结果)，
+# 不必等整批结束。回调应当轻量且不抛异常；最终返回的结果列表仍以返回值为准
+ResultCallback = Callable[[int, ClashCheckResult], None]
 
 
 class ClashBasicChecker:
@@ -92,9 +103,8 @@ class ClashBasicChecker:
             检测结果
         """
         if port is None:
-            # 随机选择一个未使用的端口 (10000-20000)
-            import random
-            port = random.randint(10000, 20000)
+            # 申请空闲端口，避免随机端口被占用时误判为内核已就绪
+            port = find_free_port()
         
         # 创建临时配置文件
         with tempfile.NamedTemporaryFile(mode='w', suffix='.yaml', delete=False) as f:
@@ -113,8 +123,16 @@ class ClashBasicChecker:
                 stderr=asyncio.subprocess.DEVNULL
             )
             
-            # 等待mihomo启动并准备好接收请求（增加等待时间）
-            await asyncio.sleep(3)
+            # 等待mihomo监听端口就绪（进程提前退出则直接判定失败，不做探测）
+            try:
+                await wait_for_port(process, port, timeout=5, name="mihomo")
+            except CoreStartupError as e:
+                return ClashCheckResult(
+                    is_available=False,
+                    error_message=str(e),
+                    protocol=node.get("type", "unknown"),
+                    failure_reason=e.failure_reason
+                )
             
             # 测试连接
             start_time = asyncio.get_event_loop().time()
@@ -169,24 +187,29 @@ class ClashBasicChecker:
             except:
                 pass
     
-    async def check_nodes_batch(self, nodes: List[Dict], max_concurrent: int = 5) -> List[ClashCheckResult]:
+    async def check_nodes_batch(self, nodes: List[Dict], max_concurrent: int = 5,
+                                on_result: Optional[ResultCallback] = None) -> List[ClashCheckResult]:
         """
         批量检测节点
         
         Args:
             nodes: 节点列表
             max_concurrent: 最大并发数
+            on_result: 流式结果回调
             
         Returns:
             检测结果列表
         """
         semaphore = asyncio.Semaphore(max_concurrent)
         
-        async def check_with_semaphore(node):
+        async def check_with_semaphore(index, node):
             async with semaphore:
-                return await self.test_node_with_clash(node)
+                result = await self.test_node_with_clash(node)
+            if on_result:
+                on_result(index, result)
+            return result
         
-        tasks = [check_with_semaphore(node) for node in nodes]
+        tasks = [check_with_semaphore(i, node) for i, node in enumerate(nodes)]
         results = await asyncio.gather(*tasks, return_exceptions=True)
         
         # 处理异常结果
@@ -204,6 +227,297 @@ class ClashBasicChecker:
         return final_results
 
 
+# ==================== 常驻 mihomo 进程池 ====================
+
+# 进程池大小和单进程承载节点数（可通过环境变量调整）
+MIHOMO_POOL_SIZE = int(os.environ.get("MIHOMO_POOL_SIZE", "2"))
+MIHOMO_WORKER_CAPACITY = int(os.environ.get("MIHOMO_WORKER_CAPACITY", "50"))
+
+
+class MihomoConfigError(Exception):
+    """mihomo 拒绝加载配置（通常是某个节点配置非法）"""
+
+
+class MihomoWorker:
+    """
+    常驻 mihomo 进程
+
+    启动后不再退出，每批节点通过 external-controller 的 PUT /configs 热替换，
+    然后用 /proxies/{name}/delay 在进程内部完成延迟测试，无需再为每个节点启动进程。
+    """
+
+    def __init__(self, mihomo_path: Path, worker_id: int = 0):
+        self.mihomo_path = mihomo_path
+        self.worker_id = worker_id
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self.work_dir: Optional[str] = None
+        self.controller_port: Optional[int] = None
+        self.mixed_port: Optional[int] = None
+        self.secret = secrets.token_hex(8)
+        self.client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def is_alive(self) -> bool:
+        return self.process is not None and self.process.returncode is None
+
+    def _base_config(self, proxies: List[Dict]) -> Dict:
+        return {
+            "mixed-port": self.mixed_port,
+            "allow-lan": False,
+            "mode": "rule",
+            "log-level": "silent",
+            "external-controller": f"127.0.0.1:{self.controller_port}",
+            "secret": self.secret,
+            "proxies": proxies,
+            "rules": ["MATCH,DIRECT"],
+        }
+
+    async def start(self, startup_timeout: float = 10):
+        """启动进程并等待控制器可用"""
+        await self.stop()
+
+        self.work_dir = tempfile.mkdtemp(prefix=f"mihomo_worker_{self.worker_id}_")
+        self.controller_port = find_free_port()
+        self.mixed_port = find_free_port()
+
+        config_path = os.path.join(self.work_dir, "config.yaml")
+        with open(config_path, "w") as f:
+            yaml.dump(self._base_config([]), f, allow_unicode=True)
+
+        self.process = await asyncio.create_subprocess_exec(
+            str(self.mihomo_path),
+            "-f", config_path,
+            "-d", self.work_dir,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.DEVNULL
+        )
+        self.client = httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{self.controller_port}",
+            headers={"Authorization": f"Bearer {self.secret}"},
+            timeout=httpx.Timeout(30, connect=2),
+            trust_env=False,
+        )
+
+        # 轮询 /version，直到控制器就绪或进程提前退出
+        async def controller_ready() -> bool:
+            response = await self.client.get("/version")
+            return response.status_code == 200
+
+        elapsed = await wait_until_ready(
+            self.process, controller_ready, timeout=startup_timeout, name=f"mihomo worker#{self.worker_id}"
+        )
+        logger.info(f"✅ mihomo worker#{self.worker_id} 已就绪 ({elapsed * 1000:.0f}ms, controller:{self.controller_port})")
+
+    async def load_proxies(self, proxies: List[Dict]):
+        """通过控制器热替换节点配置"""
+        payload = yaml.dump(self._base_config(proxies), allow_unicode=True)
+        response = await self.client.put("/configs", params={"force": "true"}, json={"path": "", "payload": payload})
+        if response.status_code >= 400:
+            raise MihomoConfigError(response.text[:200])
+
+    async def probe(self, name: str, test_url: str, timeout_ms: int) -> ClashCheckResult:
+        """在进程内部对单个节点做延迟测试"""
+        try:
+            response = await self.client.get(
+                f"/proxies/{quote(name, safe='')}/delay",
+                params={"url": test_url, "timeout": timeout_ms},
+                timeout=timeout_ms / 1000 + 5,
+            )
+            data = response.json() if response.content else {}
+            if response.status_code == 200 and data.get("delay"):
+                return ClashCheckResult(is_available=True, latency_ms=int(data["delay"]))
+            if response.status_code == 408:
+                return ClashCheckResult(is_available=False, error_message="连接超时")
+            return ClashCheckResult(
+                is_available=False,
+                error_message=data.get("message") or f"HTTP {response.status_code}"
+            )
+        except httpx.TimeoutException:
+            return ClashCheckResult(is_available=False, error_message="连接超时")
+        except Exception as e:
+            return ClashCheckResult(is_available=False, error_message=str(e))
+
+    async def stop(self):
+        if self.client:
+            await self.client.aclose()
+            self.client = None
+        if self.process and self.process.returncode is None:
+            try:
+                self.process.terminate()
+                await asyncio.wait_for(self.process.wait(), timeout=2)
+            except:
+                self.process.kill()
+        self.process = None
+        if self.work_dir:
+            shutil.rmtree(self.work_dir, ignore_errors=True)
+            self.work_dir = None
+
+
+class MihomoWorkerPool:
+    """
+    mihomo 常驻进程池
+
+    每个 worker 一次加载最多 capacity 个节点，节点检测变成对热进程的 HTTP 请求，
+    一批 50 个节点只需一次配置热替换 + 并发延迟测试。
+    """
+
+    def __init__(self, size: int = MIHOMO_POOL_SIZE, capacity: int = MIHOMO_WORKER_CAPACITY,
+                 mihomo_path: str = None):
+        # 复用 ClashBasicChecker 的内核路径查找逻辑
+        checker = ClashBasicChecker(mihomo_path)
+        self.mihomo_path = checker.mihomo_path
+        self.test_url = checker.test_url
+        self.timeout = checker.timeout
+        self.size = max(1, size)
+        self.capacity = max(1, capacity)
+        self.workers = [MihomoWorker(self.mihomo_path, i) for i in range(self.size)]
+        self._idle: Optional[asyncio.Queue] = None
+        self._start_lock = asyncio.Lock()
+
+    async def _ensure_started(self):
+        async with self._start_lock:
+            if self._idle is not None:
+                return
+            for worker in self.workers:
+                await worker.start()
+            self._idle = asyncio.Queue()
+            for worker in self.workers:
+                self._idle.put_nowait(worker)
+
+    async def _probe_chunk(self, worker: MihomoWorker, nodes: List[Dict], max_concurrent: int,
+                           on_result: Optional[ResultCallback] = None,
+                           offset: int = 0) -> List[ClashCheckResult]:
+        """
+        在一个 worker 上加载并检测一组节点；配置整体被拒时二分定位坏节点
+
+        offset 为本组第一个节点在整批输入中的下标（用于 on_result）
+        """
+        if not worker.is_alive:
+            await worker.start()
+
+        # 节点名在配置内必须唯一，检测时使用内部名称
+        proxies = []
+        for i, node in enumerate(nodes):
+            proxy = dict(node)
+            proxy["name"] = f"node-{i}"
+            proxies.append(proxy)
+
+        try:
+            await worker.load_proxies(proxies)
+        except MihomoConfigError as e:
+            if len(nodes) == 1:
+                result = ClashCheckResult(
+                    is_available=False,
+                    error_message=f"配置无效: {str(e)[:80]}",
+                    protocol=nodes[0].get("type", "unknown")
+                )
+                if on_result:
+                    on_result(offset, result)
+                return [result]
+            mid = len(nodes) // 2
+            left = await self._probe_chunk(worker, nodes[:mid], max_concurrent, on_result, offset)
+            right = await self._probe_chunk(worker, nodes[mid:], max_concurrent, on_result, offset + mid)
+            return left + right
+
+        semaphore = asyncio.Semaphore(max_concurrent)
+        timeout_ms = self.timeout * 1000
+
+        async def probe_one(index: int, proxy: Dict, node: Dict) -> ClashCheckResult:
+            async with semaphore:
+                result = await worker.probe(proxy["name"], self.test_url, timeout_ms)
+            result.protocol = node.get("type", "unknown")
+            if on_result:
+                on_result(offset + index, result)
+            return result
+
+        return await asyncio.gather(*[
+            probe_one(i, p, n) for i, (p, n) in enumerate(zip(proxies, nodes))
+        ])
+
+    async def check_nodes(self, nodes: List[Dict], max_concurrent: int = 5,
+                          on_result: Optional[ResultCallback] = None) -> List[ClashCheckResult]:
+        """
+        批量检测节点，结果顺序与输入一致
+
+        Args:
+            nodes: Clash 格式节点列表
+            max_concurrent: 每个 worker 内并发延迟测试数
+            on_result: 流式结果回调（每个节点一出结果就调用）
+        """
+        if not nodes:
+            return []
+        await self._ensure_started()
+
+        chunks = [(i, nodes[i:i + self.capacity]) for i in range(0, len(nodes), self.capacity)]
+
+        async def run_chunk(offset: int, chunk: List[Dict]) -> List[ClashCheckResult]:
+            worker = await self._idle.get()
+            # 本组已出结果的节点（下标 -> 结果），worker 中途异常时保留这些结果
+            done: Dict[int, ClashCheckResult] = {}
+            finished = False
+
+            def record(index: int, result: ClashCheckResult):
+                # 本组已按异常收尾后，残留探测的迟到结果不再上报，避免与返回值矛盾
+                if finished:
+                    return
+                done[index] = result
+                if on_result:
+                    on_result(index, result)
+
+            try:
+                return await self._probe_chunk(worker, chunk, max_concurrent, record, offset)
+            except Exception as e:
+                # worker 异常时重启；已出结果的节点保留结果（可能已流式上线），只有未检测的记为检测异常
+                logger.warning(f"⚠️ mihomo worker#{worker.worker_id} 异常: {e}，正在重启")
+                try:
+                    await worker.start()
+                except Exception as restart_error:
+                    logger.error(f"❌ mihomo worker#{worker.worker_id} 重启失败: {restart_error}")
+                finished = True
+                results = []
+                for i, node in enumerate(chunk, offset):
+                    result = done.get(i)
+                    if result is None:
+                        result = ClashCheckResult(
+                            is_available=False,
+                            error_message=f"检测异常: {str(e)[:80]}",
+                            protocol=node.get("type", "unknown")
+                        )
+                        if on_result:
+                            on_result(i, result)
+                    results.append(result)
+                return results
+            finally:
+                self._idle.put_nowait(worker)
+
+        chunk_results = await asyncio.gather(*[run_chunk(o, c) for o, c in chunks])
+        return [r for results in chunk_results for r in results]
+
+    async def close(self):
+        for worker in self.workers:
+            await worker.stop()
+        self._idle = None
+
+
+_mihomo_pool: Optional[MihomoWorkerPool] = None
+
+
+def get_mihomo_pool() -> MihomoWorkerPool:
+    """获取全局 mihomo 进程池（单例，首次检测时才真正启动进程）"""
+    global _mihomo_pool
+    if _mihomo_pool is None:
+        _mihomo_pool = MihomoWorkerPool()
+    return _mihomo_pool
+
+
+async def close_mihomo_pool():
+    """关闭全局进程池（服务退出时调用）"""
+    global _mihomo_pool
+    if _mihomo_pool is not None:
+        await _mihomo_pool.close()
+        _mihomo_pool = None
+
+
 async def check_node_clash(node: Dict) -> ClashCheckResult:
     """
     便捷函数：检测单个节点
@@ -218,19 +532,28 @@ async def check_node_clash(node: Dict) -> ClashCheckResult:
     return await checker.test_node_with_clash(node)
 
 
-async def check_nodes_clash(nodes: List[Dict], max_concurrent: int = 5) -> List[ClashCheckResult]:
+async def check_nodes_clash(nodes: List[Dict], max_concurrent: int = 5,
+                            on_result: Optional[ResultCallback] = None) -> List[ClashCheckResult]:
     """
-    便捷函数：批量检测节点
-    
+    便捷函数：批量检测节点（使用常驻 mihomo 进程池）
+
     Args:
         nodes: 节点列表
         max_concurrent: 最大并发数
-        
+        on_result: 流式结果回调，检测出一个结果就调用一次 on_result(下标, 结果)
+
     Returns:
         检测结果列表
     """
-    checker = ClashBasicChecker()
-    return await checker.check_nodes_batch(nodes, max_concurrent)
+    try:
+        return await get_mihomo_pool().check_nodes(nodes, max_concurrent, on_result)
+    except FileNotFoundError:
+        raise
+    except Exception as e:
+        # 进程池无法启动时退回逐节点启动进程的旧方式
+        logger.warning(f"⚠️ mihomo 进程池不可用 ({e})，退回单进程检测")
+        checker = ClashBasicChecker()
+        return await checker.check_nodes_batch(nodes, max_concurrent, on_result)
 
 
 # 测试代码
@@ -0,0 +1,141 @@
+# backend/app/modules/node_hunter/core_readiness.py
+"""
+代理内核就绪检测模块
+
+替代启动 mihomo / Xray 之后固定 sleep 的做法：
+1. 以指数退避轮询本地端口或控制器接口，内核一就绪立即开始探测
+2. 轮询期间持续观察进程状态，进程提前退出时立即报告（不再做无意义的探测）
+3. 统一的空闲端口分配
+"""
+
+import asyncio
+import socket
+import time
+from typing import Awaitable, Callable, List, Optional
+
+# 失败分类（写入检测结果的 failure_reason 字段）
+FAILURE_CORE_EXITED = "core_exited"            # 内核进程启动后立即退出（通常是配置非法）
+FAILURE_CORE_TIMEOUT = "core_startup_timeout"  # 内核在超时时间内未就绪
+
+
+class CoreStartupError(Exception):
+    """内核启动失败"""
+
+    failure_reason = FAILURE_CORE_TIMEOUT
+
+    def __init__(self, message: str, returncode: Optional[int] = None):
+        super().__init__(message)
+        self.returncode = returncode
+
+
+class CoreExitedError(CoreStartupError):
+    """内核进程在就绪前退出"""
+
+    failure_reason = FAILURE_CORE_EXITED
+
+
+def allocate_free_ports(count: int) -> List[int]:
+    """一次性向系统申请 count 个互不相同的空闲本地端口"""
+    sockets = []
+    try:
+        for _ in range(count):
+            s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            s.bind(("127.0.0.1", 0))
+            sockets.append(s)
+        return [s.getsockname()[1] for s in sockets]
+    finally:
+        for s in sockets:
+            s.close()
+
+
+def find_free_port() -> int:
+    """申请单个空闲本地端口"""
+    return allocate_free_ports(1)[0]
+
+
+async def wait_until_ready(
+    process: asyncio.subprocess.Process,
+    check: Callable[[], Awaitable[bool]],
+    timeout: float = 10,
+    initial_delay: float = 0.05,
+    max_delay: float = 0.5,
+    name: str = "core",
+) -> float:
+    """
+    轮询 check() 直到返回 True
+
+    Args:
+        process: 内核进程
+        check: 就绪检查协程（返回 True 表示就绪，异常视为未就绪）
+        timeout: 最长等待秒数
+        initial_delay / max_delay: 退避间隔的初值和上限
+
+    Returns:
+        实际等待秒数
+
+    Raises:
+        CoreExitedError: 进程在就绪前退出
+        CoreStartupError: 超时未就绪
+    """
+    start = time.monotonic()
+    delay = initial_delay
+    # 在退避间隔内同时等待进程退出，进程崩溃时无需等满间隔
+    exit_waiter = asyncio.ensure_future(process.wait())
+    try:
+        while True:
+            if process.returncode is not None:
+                raise CoreExitedError(f"{name} 进程提前退出 (code {process.returncode})", process.returncode)
+            try:
+                if await check():
+                    return time.monotonic() - start
+            except Exception:
+                pass
+
+            elapsed = time.monotonic() - start
+            if elapsed >= timeout:
+                raise CoreStartupError(f"{name} 启动超时 ({timeout}s)")
+
+            await asyncio.wait({exit_waiter}, timeout=min(delay, timeout - elapsed))
+            delay = min(delay * 2, max_delay)
+    finally:
+        exit_waiter.cancel()
+
+
+async def _port_open(port: int, host: str = "127.0.0.1") -> bool:
+    try:
+        _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout=0.5)
+    except (OSError, asyncio.TimeoutError):
+        return False
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except Exception:
+        pass
+    return True
+
+
+async def wait_for_ports(
+    process: asyncio.subprocess.Process,
+    ports: List[int],
+    timeout: float = 10,
+    name: str = "core",
+) -> float:
+    """等待内核的所有本地监听端口可连接"""
+    pending = list(ports)
+
+    async def check() -> bool:
+        results = await asyncio.gather(*[_port_open(p) for p in pending])
+        pending[:] = [p for p, ok in zip(pending, results) if not ok]
+        return not pending
+
+    return await wait_until_ready(process, check, timeout=timeout, name=name)
+
+
+async def wait_for_port(
+    process: asyncio.subprocess.Process,
+    port: int,
+    timeout: float = 10,
+    name: str = "core",
+) -> float:
+    """等待内核的单个本地监听端口可连接"""
+    return await wait_for_ports(process, [port], timeout=timeout, name=name)
@@ -0,0 +1,241 @@
+# backend/app/modules/node_hunter/country_matcher.py
+"""
+节点名称 -> 国家代码
+
+原先有四套互不一致的关键词表（NodeHunter 两套、GeolocationHelper、parsers），
+每次识别都按国家逐个关键词做子串查找，一个名称要做几百次 `in`，
+两字母代码当子串用还会误判（"SINGAPORE" 里的 "IN"、"BUSAN" 里的 "US"）。
+这里合并为一张按优先级排列的关键词表，导入时编译成一个前缀树形式的正则，
+每个名称只扫描一遍，取命中关键词中优先级最高的一个：
+- 国旗 Emoji（任意两个区域指示符，直接换算成代码）
+- 中文名称（香港、日本……）
+- 英文国名 / 城市（4 个字符以上，按子串匹配；多词名称同时接受连字符、下划线和无空格写法）
+- 机场代码（3 个字母）与国家代码（2 个字母），前后不能紧挨字母
+同一档内取名称中最靠左的命中（"US No.1" 取 US 而不是 NO）。
+NO / IT / ID / IN 与常见英文单词（No.1、IT、ID、IN）冲突，不作为单独代码识别，
+这几个国家靠国旗、中文名和英文名识别。
+"""
+
+import re
+from typing import Dict, Iterable, List, Optional, Pattern, Tuple
+
+# 按优先级排列的关键词表（同一档内越靠前优先级越高）；关键词一律大写
+COUNTRY_KEYWORDS: List[Tuple[str, List[str]]] = [
+    # 亚洲
+    ('CN', ['CN', 'CHINA', '中国', '回国', 'BEIJING', 'SHANGHAI', 'SHENZHEN', 'GUANGZHOU', 'CHONGQING', 'HANGZHOU',
+            'WUHAN', 'CHENG', 'XIAN', 'SICHUAN', 'JIANGSU', 'GUANGDONG']),
+    ('HK', ['HK', 'HONG KONG', 'HONGKONG', '香港', 'HKG']),
+    ('TW', ['TW', 'TAIWAN', 'TAIPEI', '台湾', 'TPE']),
+    ('MO', ['MO', 'MACAO', 'MACAU', '澳门']),
+    ('JP', ['JP', 'JAPAN', '日本', 'TOKYO', 'OSAKA', 'KYOTO', 'YOKOHAMA', 'KOBE', 'TYO', 'NRT', 'KIX']),
+    ('SG', ['SG', 'SINGAPORE', '新加坡', 'SIN']),
+    ('KR', ['KR', 'KOREA', '韩国', 'SEOUL', 'BUSAN', 'ICN', 'PUS']),
+    ('TH', ['TH', 'THAILAND', '泰国', 'BANGKOK', 'BKK']),
+    ('MY', ['MY', 'MALAYSIA', '马来西亚', 'KUALA LUMPUR', 'KUL']),
+    ('PH', ['PH', 'PHILIPPINES', '菲律宾', 'MANILA', 'MNL']),
+    ('VN', ['VN', 'VIETNAM', '越南', 'HANOI', 'HO CHI MINH', 'HAN', 'SGN']),
+    ('ID', ['ID', 'INDONESIA', '印尼', 'JAKARTA', 'CGK']),
+    ('IN', ['IN', 'INDIA', '印度', 'DELHI', 'BOMBAY', 'MUMBAI', 'BANGALORE', 'DEL', 'BOM']),
+    ('PK', ['PK', 'PAKISTAN', '巴基斯坦', 'ISLAMABAD', 'KARACHI']),
+    ('BD', ['BD', 'BANGLADESH', '孟加拉', 'DHAKA']),
+    ('LK', ['LK', 'SRI LANKA', '斯里兰卡', 'COLOMBO', 'CMB']),
+    # 中东
+    ('TR', ['TR', 'TURKEY', '土耳其', 'ISTANBUL', 'ANKARA', 'IST']),
+    ('AE', ['AE', 'UAE', 'UNITED ARAB EMIRATES', '阿联酋', 'DUBAI', 'ABU DHABI', 'DXB']),
+    ('SA', ['SA', 'SAUDI ARABIA', '沙特', 'RIYADH', 'JEDDAH', 'RUH']),
+    ('IL', ['IL', 'ISRAEL', '以色列', 'TEL AVIV', 'JERUSALEM', 'TLV']),
+    ('JO', ['JO', 'JORDAN', '约旦', 'AMMAN', 'AMM']),
+    # 欧洲
+    ('GB', ['GB', 'UK', 'UNITED KINGDOM', '英国', 'LONDON', 'MANCHESTER', 'LIVERPOOL', 'EDINBURGH', 'LHR', 'LGW']),
+    ('IE', ['IE', 'IRELAND', '爱尔兰', 'DUBLIN', 'DUB']),
+    ('DE', ['DE', 'GERMANY', '德国', 'FRANKFURT', 'BERLIN', 'MUNICH', 'HAMBURG', 'FRA', 'BER']),
+    ('FR', ['FR', 'FRANCE', '法国', 'PARIS', 'LYON', 'MARSEILLE', 'CDG', 'ORY']),
+    ('IT', ['IT', 'ITALY', '意大利', 'MILAN', 'ROME', 'VENICE', 'MXP', 'FCO']),
+    ('ES', ['ES', 'SPAIN', '西班牙', 'MADRID', 'BARCELONA', 'VALENCIA', 'MAD', 'BCN']),
+    ('NL', ['NL', 'NETHERLANDS', '荷兰', 'AMSTERDAM', 'ROTTERDAM', 'AMS']),
+    ('BE', ['BE', 'BELGIUM', '比利时', 'BRUSSELS', 'ANTWERP', 'BRU']),
+    ('PT', ['PT', 'PORTUGAL', '葡萄牙', 'LISBON', 'PORTO', 'LIS']),
+    ('PL', ['PL', 'POLAND', '波兰', 'WARSAW', 'KRAKOW', 'WAW']),
+    ('SE', ['SE', 'SWEDEN', '瑞典', 'STOCKHOLM', 'ARN']),
+    ('NO', ['NO', 'NORWAY', '挪威', 'OSLO', 'OSL']),
+    ('DK', ['DK', 'DENMARK', '丹麦', 'COPENHAGEN', 'CPH']),
+    ('FI', ['FI', 'FINLAND', '芬兰', 'HELSINKI', 'HEL']),
+    ('CH', ['CH', 'SWITZERLAND', '瑞士', 'ZURICH', 'GENEVA', 'ZRH']),
+    ('AT', ['AT', 'AUSTRIA', '奥地利', 'VIENNA', 'VIE']),
+    ('CZ', ['CZ', 'CZECH', '捷克', 'PRAGUE', 'PRG']),
+    ('HU', ['HU', 'HUNGARY', '匈牙利', 'BUDAPEST', 'BUD']),
+    ('RO', ['RO', 'ROMANIA', '罗马尼亚', 'BUCHAREST', 'BUH']),
+    ('GR', ['GR', 'GREECE', '希腊', 'ATHENS', 'THESSALONIKI', 'ATH']),
+    ('RU', ['RU', 'RUSSIA', '俄罗斯', 'MOSCOW', 'ST PETERSBURG', 'SAINT PETERSBURG', 'SIBERIA', 'VLADIVOSTOK',
+            'SVO', 'LED']),
+    ('UA', ['UA', 'UKRAINE', '乌克兰', 'KYIV', 'KHARKIV', 'KBP']),
+    ('BG', ['BG', 'BULGARIA', '保加利亚', 'SOFIA', 'SOF']),
+    # 北美
+    ('US', ['US', 'USA', 'AMERICA', 'UNITED STATES', '美国', 'NEW YORK', 'LOS ANGELES', 'SAN FRANCISCO', 'CHICAGO',
+            'DALLAS', 'SEATTLE', 'MIAMI', 'DENVER', 'SFO', 'LAX', 'JFK', 'ORD', 'DFW']),
+    ('CA', ['CA', 'CANADA', '加拿大', 'TORONTO', 'VANCOUVER', 'MONTREAL', 'CALGARY', 'YYZ', 'YVR']),
+    ('MX', ['MX', 'MEXICO', '墨西哥', 'MEXICO CITY', 'MEX']),
+    # 南美
+    ('BR', ['BR', 'BRAZIL', '巴西', 'SAO PAULO', 'SÃO PAULO', 'RIO DE JANEIRO', 'RIO', 'GIG', 'GRU']),
+    ('AR', ['AR', 'ARGENTINA', '阿根廷', 'BUENOS AIRES', 'AEP']),
+    ('CL', ['CL', 'CHILE', '智利', 'SANTIAGO', 'SCL']),
+    ('CO', ['CO', 'COLOMBIA', '哥伦比亚', 'BOGOTA', 'BOG']),
+    ('PE', ['PE', 'PERU', '秘鲁', 'LIMA', 'LIM']),
+    ('VE', ['VE', 'VENEZUELA', '委内瑞拉', 'CARACAS', 'CCS']),
+    # 大洋洲
+    ('AU', ['AU', 'AUSTRALIA', '澳洲', '澳大利亚', 'SYDNEY', 'MELBOURNE', 'BRISBANE', 'SYD', 'MEL']),
+    ('NZ', ['NZ', 'NEW ZEALAND', '新西兰', 'AUCKLAND', 'WELLINGTON', 'AKL']),
+    # 非洲
+    ('ZA', ['ZA', 'SOUTH AFRICA', '南非', 'JOHANNESBURG', 'CAPE TOWN', 'JNB']),
+    ('EG', ['EG', 'EGYPT', '埃及', 'CAIRO', 'ALEXANDRIA', 'CAI']),
+    ('NG', ['NG', 'NIGERIA', '尼日利亚', 'LAGOS', 'LOS']),
+]
+
+# 优先级档位（数值越小越优先）
+TIER_FLAG = 0
+TIER_NATIVE = 1     # 非 ASCII 关键词（中文名称）
+TIER_NAME = 2       # 英文国名 / 城市
+TIER_CODE = 3       # 3 字母机场代码与 2 字母国家代码（同一档，按位置取最左）
+_TIER_SPAN = 1000
+
+# 与常见英文单词冲突的两字母代码，不作为关键词
+AMBIGUOUS_CODES = frozenset({'NO', 'IT', 'ID', 'IN'})
+
+# 国旗 Emoji：两个区域指示符（U+1F1E6 ~ U+1F1FF 对应 A ~ Z），展开为 26×26 个关键词并入前缀树
+_REGIONAL_A = 0x1F1E6
+FLAG_KEYWORDS: Dict[str, str] = {
+    chr(_REGIONAL_A + a) + chr(_REGIONAL_A + b): chr(ord("A") + a) + chr(ord("A") + b)
+    for a in range(26) for b in range(26)
+}
+
+
+def _tier_of(keyword: str) -> int:
+    if not keyword.isascii():
+        return TIER_NATIVE
+    return TIER_NAME if len(keyword) >= 4 else TIER_CODE
+
+
+def _variants(keyword: str) -> List[str]:
+    """多词名称的常见写法：原样、连字符、下划线、去掉空格（"LOS ANGELES" -> "LOS-ANGELES" 等）"""
+    if " " not in keyword:
+        return [keyword]
+    return [keyword] + [keyword.replace(" ", sep) for sep in ("-", "_", "")]
+
+
+def _is_letter(ch: str) -> bool:
+    return "A" <= ch <= "Z"
+
+
+def _trie_pattern(words: Iterable[str], bounded: Iterable[str] = ()) -> str:
+    """
+    把关键词列表转成前缀树形式的正则（公共前缀只比较一次，较长的分支优先）
+
+    Args:
+        bounded: 其中要求后面不紧挨字母的关键词（前面是否紧挨字母由调用方检查）
+    """
+    bounded = set(bounded)
+    trie: Dict = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = word in bounded
+
+    def build(node: Dict) -> str:
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if "" not in node:
+            return branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        # 可以在此结束：先尝试更长的延续（贪婪），否则在这里结束
+        end = "(?![A-Z])" if node[""] else ""
+        if not branches:
+            return end
+        return "(?:" + "|".join(branches + [end]) + ")"
+
+    return build(trie)
+
+
+def compile_keywords(keywords: Iterable[str]) -> Pattern:
+    """把一组关键词编译成一个正则（用于只需判断「是否包含任一关键词」的场合；调用方负责大小写统一）"""
+    return re.compile(_trie_pattern(keywords))
+
+
+class CountryMatcher:
+    """编译后的国家关键词匹配器"""
+
+    def __init__(self, table: Iterable[Tuple[str, Iterable[str]]] = COUNTRY_KEYWORDS):
+        # 关键词 -> (优先级, 国家代码)；同一关键词出现多次时保留表中靠前的国家
+        self.keywords: Dict[str, Tuple[int, str]] = {
+            flag: (TIER_FLAG, code) for flag, code in FLAG_KEYWORDS.items()
+        }
+        for index, (code, words) in enumerate(table):
+            for word in words:
+                word = word.upper()
+                if word in AMBIGUOUS_CODES:
+                    continue
+                priority = _tier_of(word) * _TIER_SPAN + index
+                for variant in _variants(word):
+                    if variant not in self.keywords or priority < self.keywords[variant][0]:
+                        self.keywords[variant] = (priority, code)
+
+        # 长关键词按子串匹配；短代码要求前后不紧挨字母，避免 "SINGAPORE" 命中 "IN"
+        self._bounded = frozenset(w for w, (p, _) in self.keywords.items() if p >= TIER_CODE * _TIER_SPAN)
+        self.regex = re.compile(_trie_pattern(self.keywords, self._bounded))
+
+    def match(self, name: str) -> Optional[str]:
+        """单次扫描名称，返回档位最高的国家代码（同档取最靠左的命中）；没有命中返回 None"""
+        if not name:
+            return None
+        text = name.upper()
+        search = self.regex.search
+        keywords = self.keywords
+        bounded = self._bounded
+        best_tier = None
+        best_code = None
+        m = search(text)
+        while m is not None:
+            start = m.start()
+            keyword = m.group()
+            if keyword in bounded and start and _is_letter(text[start - 1]):
+                # 短代码前面紧挨字母（如 "BUSAN" 中的 "US"），从下一个字符继续
+                m = search(text, start + 1)
+                continue
+            priority, code = keywords[keyword]
+            if priority == TIER_FLAG:
+                # 国旗：第一个命中的国旗即为最高优先级
+                return code
+            tier = priority // _TIER_SPAN
+            if best_tier is None or tier < best_tier:
+                best_tier, best_code = tier, code
+            m = search(text, m.end())
+        return best_code
+
+    def match_many(self, names: Iterable[str]) -> List[Optional[str]]:
+        """批量识别（同一次扫描中重复的名称只匹配一次）"""
+        memo: Dict[str, Optional[str]] = {}
+        results = []
+        for name in names:
+            if name in memo:
+                results.append(memo[name])
+                continue
+            code = self.match(name)
+            memo[name] = code
+            results.append(code)
+        return results
+
+
+# 导入时编译一次，全进程共用
+_matcher = CountryMatcher()
+
+
+def get_country_matcher() -> CountryMatcher:
+    return _matcher
+
+
+def match_country(name: str) -> Optional[str]:
+    """从节点名称识别国家代码，没有命中返回 None"""
+    return _matcher.match(name)
+
+
+def match_countries(names: Iterable[str]) -> List[Optional[str]]:
+    """批量识别，结果与 names 一一对应"""
+    return _matcher.match_many(names)
@@ -0,0 +1,227 @@
+# backend/app/modules/node_hunter/dns_resolver.py
+"""
+批量 DNS 预解析
+
+检测流程中每一层（check_dns_resolution、TCP 预过滤、TLS 握手）都各自解析主机名，
+而抓取到的节点大量共用同一批 CDN 域名，同一个域名一批里要解析几百次；
+域名早已失效（NXDOMAIN）的节点也要一路走到内核检测才被淘汰。
+这里在检测前加一层：
+- 一批节点的不同主机名只解析一次，并发解析，同时在途的查询数有上限
+- 结果按记录 TTL 缓存（安装了 aiodns 时取 DNS 应答里的 TTL，否则用默认 TTL），
+  NXDOMAIN 按负缓存处理
+- NXDOMAIN 的节点直接淘汰；解析成功的节点写入 resolved_ips，后续各层直接连 IP
+- 超时 / SERVFAIL 等临时错误不淘汰也不缓存，交给后续各层自行处理
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .ttl_cache import TTLCache, MISSING
+from .real_availability_check import PREFILTER_DNS_FAILED
+
+try:
+    import aiodns
+except ImportError:
+    aiodns = None
+
+logger = logging.getLogger(__name__)
+
+DNS_MAX_IN_FLIGHT = int(os.environ.get("DNS_MAX_IN_FLIGHT", "100"))
+DNS_TIMEOUT = float(os.environ.get("DNS_TIMEOUT", "3"))
+DNS_CACHE_MAX_SIZE = int(os.environ.get("DNS_CACHE_MAX_SIZE", "50000"))
+# 记录 TTL 的上下限；getaddrinfo 拿不到 TTL 时用默认值
+DNS_MIN_TTL = int(os.environ.get("DNS_MIN_TTL", "60"))
+DNS_MAX_TTL = int(os.environ.get("DNS_MAX_TTL", "3600"))
+DNS_DEFAULT_TTL = int(os.environ.get("DNS_DEFAULT_TTL", "300"))
+DNS_NEGATIVE_TTL = int(os.environ.get("DNS_NEGATIVE_TTL", "600"))
+
+# 解析结果
+DNS_RESOLVED = "resolved"
+DNS_NXDOMAIN = "nxdomain"
+DNS_FAILED = "failed"  # 临时错误（超时、SERVFAIL 等）
+
+# c-ares 错误码（aiodns.error.DNSError.args[0]）
+_ARES_ENODATA = 1
+_ARES_ENOTFOUND = 4
+# getaddrinfo 表示「域名不存在 / 没有地址」的错误码
+_GAI_NOT_FOUND = {socket.EAI_NONAME, getattr(socket, "EAI_NODATA", socket.EAI_NONAME)}
+
+
+@dataclass
+class DNSResult:
+    status: str
+    ips: Tuple[str, ...] = ()
+    cached: bool = False
+
+
+def _ip_literal(host: str) -> bool:
+    for family in (socket.AF_INET, socket.AF_INET6):
+        try:
+            socket.inet_pton(family, host)
+            return True
+        except OSError:
+            continue
+    return False
+
+
+class BatchDNSResolver:
+    """带缓存、限制在途查询数的批量解析器"""
+
+    def __init__(self, max_in_flight: int = DNS_MAX_IN_FLIGHT, timeout: float = DNS_TIMEOUT):
+        self.timeout = timeout
+        self.cache = TTLCache(DNS_CACHE_MAX_SIZE, DNS_DEFAULT_TTL, DNS_NEGATIVE_TTL)
+        self._semaphore = asyncio.Semaphore(max(1, max_in_flight))
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._aiodns = None
+        self.lookups = 0
+        self.nxdomain = 0
+        self.failures = 0
+
+    async def resolve(self, host: str) -> DNSResult:
+        """解析单个主机名（IP 直接返回；并发解析同一主机名时共享同一次查询）"""
+        if _ip_literal(host):
+            return DNSResult(DNS_RESOLVED, (host,))
+        host = host.lower().rstrip(".")
+        cached = self.cache.get(host, MISSING)
+        if cached is not MISSING:
+            return DNSResult(DNS_NXDOMAIN, cached=True) if cached is None else DNSResult(DNS_RESOLVED, cached, True)
+
+        task = self._inflight.get(host)
+        if task is None:
+            task = asyncio.create_task(self._lookup(host))
+            self._inflight[host] = task
+            task.add_done_callback(lambda _: self._inflight.pop(host, None))
+        return await asyncio.shield(task)
+
+    async def resolve_many(self, hosts: Iterable[str]) -> Dict[str, DNSResult]:
+        """并发解析一批主机名（重复的只解析一次），返回 {主机名: 结果}"""
+        distinct = [h for h in dict.fromkeys(hosts) if h]
+        results = await asyncio.gather(*(self.resolve(h) for h in distinct))
+        return dict(zip(distinct, results))
+
+    async def _lookup(self, host: str) -> DNSResult:
+        async with self._semaphore:
+            self.lookups += 1
+            try:
+                if aiodns is not None:
+                    status, ips, ttl = await self._query_aiodns(host)
+                else:
+                    status, ips, ttl = await self._query_getaddrinfo(host)
+            except Exception as e:
+                logger.debug(f"DNS解析异常 {host} - {e}")
+                status, ips, ttl = DNS_FAILED, (), 0
+
+        if status == DNS_RESOLVED:
+            self.cache.set(host, ips, ttl=min(DNS_MAX_TTL, max(DNS_MIN_TTL, ttl)))
+        elif status == DNS_NXDOMAIN:
+            self.nxdomain += 1
+            self.cache.set(host, None)
+        else:
+            self.failures += 1
+        return DNSResult(status, ips)
+
+    async def _query_aiodns(self, host: str) -> Tuple[str, Tuple[str, ...], int]:
+        if self._aiodns is None:
+            self._aiodns = aiodns.DNSResolver(timeout=self.timeout, tries=1)
+        not_found = 0
+        for qtype in ("A", "AAAA"):
+            try:
+                answers = await asyncio.wait_for(self._aiodns.query(host, qtype), self.timeout + 1)
+            except aiodns.error.DNSError as e:
+                code = e.args[0] if e.args else None
+                if code == _ARES_ENOTFOUND:
+                    return DNS_NXDOMAIN, (), 0
+                if code == _ARES_ENODATA:
+                    not_found += 1
+                    continue
+                return DNS_FAILED, (), 0
+            except asyncio.TimeoutError:
+                return DNS_FAILED, (), 0
+            if answers:
+                return DNS_RESOLVED, tuple(a.host for a in answers), min(a.ttl for a in answers)
+            not_found += 1
+        # 域名存在但既没有 A 也没有 AAAA 记录，同样无法连接
+        return (DNS_NXDOMAIN if not_found == 2 else DNS_FAILED), (), 0
+
+    async def _query_getaddrinfo(self, host: str) -> Tuple[str, Tuple[str, ...], int]:
+        loop = asyncio.get_running_loop()
+        try:
+            infos = await asyncio.wait_for(
+                loop.getaddrinfo(host, None, type=socket.SOCK_STREAM), self.timeout
+            )
+        except socket.gaierror as e:
+            return (DNS_NXDOMAIN if e.errno in _GAI_NOT_FOUND else DNS_FAILED), (), 0
+        except asyncio.TimeoutError:
+            return DNS_FAILED, (), 0
+        ips = tuple(dict.fromkeys(info[4][0] for info in infos))
+        return (DNS_RESOLVED, ips, DNS_DEFAULT_TTL) if ips else (DNS_NXDOMAIN, (), 0)
+
+    def stats(self) -> Dict:
+        return {"lookups": self.lookups, "nxdomain": self.nxdomain, "failures": self.failures,
+                "backend": "aiodns" if aiodns is not None else "getaddrinfo", "cache": self.cache.stats()}
+
+    def close(self):
+        for task in self._inflight.values():
+            task.cancel()
+        self._inflight.clear()
+        if self._aiodns is not None:
+            self._aiodns.cancel()
+            self._aiodns = None
+
+
+async def pre_resolve_nodes(nodes: List[Dict], resolver: Optional[BatchDNSResolver] = None
+                            ) -> Tuple[List[Dict], Dict]:
+    """
+    检测前批量解析节点主机名
+
+    解析成功的节点写入 resolved_ips；NXDOMAIN 的节点写入 prefilter_failure 并淘汰；
+    临时错误的节点原样保留
+
+    返回: (保留的节点（保持原顺序）, 统计信息)
+    """
+    start = time.time()
+    resolver = resolver or get_dns_resolver()
+    results = await resolver.resolve_many(node.get('host') for node in nodes)
+
+    survivors = []
+    stats = {"total": len(nodes), "hosts": len(results), "resolved": 0, "nxdomain": 0,
+             "failed": 0, "cached": sum(1 for r in results.values() if r.cached), "elapsed": 0.0}
+    for node in nodes:
+        result = results.get(node.get('host'))
+        if result is None or result.status == DNS_FAILED:
+            if result is not None:
+                stats["failed"] += 1
+            survivors.append(node)
+        elif result.status == DNS_NXDOMAIN:
+            node['prefilter_failure'] = PREFILTER_DNS_FAILED
+            node.pop('resolved_ips', None)
+            stats["nxdomain"] += 1
+        else:
+            node['resolved_ips'] = list(result.ips)
+            survivors.append(node)
+            stats["resolved"] += 1
+    stats["elapsed"] = round(time.time() - start, 2)
+    return survivors, stats
+
+
+_dns_resolver: Optional[BatchDNSResolver] = None
+
+
+def get_dns_resolver() -> BatchDNSResolver:
+    """获取全局批量解析器（缓存跨批次共用）"""
+    global _dns_resolver
+    if _dns_resolver is None:
+        _dns_resolver = BatchDNSResolver()
+    return _dns_resolver
+
+
+def close_dns_resolver():
+    global _dns_resolver
+    if _dns_resolver is not None:
+        _dns_resolver.close()
+        _dns_resolver = None
@@ -0,0 +1,88 @@
+# backend/app/modules/node_hunter/endpoint_groups.py
+"""
+按解析后的服务端点分组探测
+
+节点去重用的是字面上的 host:port，而抓取到的节点大量是同一台服务器换了域名、
+名称或凭据后的不同条目，TCP/TLS 预过滤对它们逐个探测，结果其实完全相同。
+这里把一批节点按 (解析后的 IP, 端口, 协议, 是否 TLS) 分组：
+- 每组只探测一次（取组内第一个节点作为代表），结果写回组内所有成员
+- 组探测失败，组内所有成员一起淘汰（写入相同的 prefilter_failure）
+- 组探测通过，所有成员都进入内核检测——凭据是否有效只能逐个节点验证
+
+依赖 dns_resolver 写入的 resolved_ips；没有预解析结果的节点按原始 host 分组
+"""
+
+import time
+from typing import Dict, List, Tuple
+
+from .real_availability_check import (
+    node_uses_tls,
+    prefilter_nodes,
+    PREFILTER_MAX_CONCURRENT,
+    PREFILTER_TIMEOUT,
+)
+
+EndpointKey = Tuple[str, int, str, bool]
+
+
+def endpoint_key(node: Dict) -> EndpointKey:
+    """节点所在服务端点：(IP 或主机名, 端口, 协议, 是否 TLS)"""
+    host = (node.get('resolved_ips') or [node.get('host') or ''])[0]
+    return (
+        host.lower(),
+        int(node.get('port') or 0),
+        (node.get('protocol') or '').lower(),
+        node_uses_tls(node),
+    )
+
+
+def group_by_endpoint(nodes: List[Dict]) -> Dict[EndpointKey, List[Dict]]:
+    """按服务端点分组（字典保持首次出现的顺序，组内保持原顺序）"""
+    groups: Dict[EndpointKey, List[Dict]] = {}
+    for node in nodes:
+        groups.setdefault(endpoint_key(node), []).append(node)
+    return groups
+
+
+async def prefilter_endpoint_groups(
+    nodes: List[Dict],
+    max_concurrent: int = PREFILTER_MAX_CONCURRENT,
+    timeout: float = PREFILTER_TIMEOUT
+) -> Tuple[List[Dict], Dict]:
+    """
+    按端点分组的批量预过滤，每个端点只探测一次
+
+    返回值与 prefilter_nodes 相同：(存活节点列表（保持原顺序）, 统计信息)，
+    统计信息按节点计数，另外增加 endpoints（探测次数）和 probes_saved（省去的探测次数）
+    """
+    start = time.time()
+    groups = group_by_endpoint(nodes)
+    representatives = [members[0] for members in groups.values()]
+    await prefilter_nodes(representatives, max_concurrent=max_concurrent, timeout=timeout)
+
+    passed_ids = set()
+    stats = {
+        "total": len(nodes),
+        "passed": 0,
+        "tcp_failed": 0,
+        "tls_failed": 0,
+        "endpoints": len(groups),
+        "probes_saved": len(nodes) - len(groups),
+        "elapsed": 0.0,
+    }
+    for representative, members in zip(representatives, groups.values()):
+        reason = representative.get('prefilter_failure')
+        for node in members:
+            if reason:
+                node['prefilter_failure'] = reason
+                node.pop('tcp_latency_ms', None)
+                stats[reason] += 1
+            else:
+                node['tcp_latency_ms'] = representative['tcp_latency_ms']
+                node.pop('prefilter_failure', None)
+                passed_ids.add(id(node))
+                stats["passed"] += 1
+
+    survivors = [node for node in nodes if id(node) in passed_ids]
+    stats["elapsed"] = round(time.time() - start, 2)
+    return survivors, stats
@@ -0,0 +1,233 @@
+# backend/app/modules/node_hunter/fetch_service.py
+"""
+订阅源抓取服务（NodeHunter 与 ChinaHunter 共用）
+
+两者在同一个扫描周期内并行抓取，源列表有不少重叠（Pawdroid、aiboboxx、mfuu、peasoft 等），
+原先各自下载一遍，ChinaHunter 每个周期还重新实例化，源健康状态随之丢失。
+这里统一：
+- 同一周期内同一 URL 只抓取一次：并发请求共享同一个任务（singleflight），结果缓存到周期结束
+- 全局并发上限，两边加起来不超过 SOURCE_FETCH_CONCURRENCY
+- 源健康（连续失败、禁用、条件请求校验值）集中保存，并持久化到文件，重启后不丢
+- 需要完整正文的源（ChinaHunter 要解析 YAML / 纯 IP 列表）在周期开始时登记，抓取时保留正文
+- 每次抓取结果交给 SourceRefreshScheduler，按内容变化和新增链接调整该源的刷新间隔
+"""
+
+import asyncio
+import json
+import logging
+import os
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from ..link_scraper.link_scraper import (
+    LinkScraper, SourceFetchResult, FETCH_OK, FETCH_FAILED, FETCH_NOT_MODIFIED, FETCH_UNCHANGED
+)
+from .source_scheduler import SourceRefreshScheduler
+
+logger = logging.getLogger(__name__)
+
+SOURCE_FETCH_CONCURRENCY = int(os.environ.get("SOURCE_FETCH_CONCURRENCY", "10"))
+SOURCE_HEALTH_FILE = os.environ.get("SOURCE_HEALTH_FILE", "source_health.json")
+
+# 连续失败多少次后禁用，禁用多少个周期后解封
+SOURCE_MAX_FAILS = 3
+SOURCE_DISABLE_CYCLES = 10
+
+# 持久化的源状态字段（节点链接本身不落盘，重启后首次抓取不发条件请求）
+_PERSISTED_FIELDS = (
+    "is_disabled", "disabled_at", "retry_fails", "etag", "last_modified", "sha256",
+    "body_bytes", "unique_links", "exclusive_links",
+    "refresh_interval", "next_due", "last_changed", "change_interval", "last_yield",
+)
+
+
+def _source_name(url: str) -> str:
+    return url.replace("https://", "").replace("http://", "")[:40]
+
+
+class SourceFetchService:
+    """按周期去重的订阅源抓取服务"""
+
+    def __init__(self, link_scraper: LinkScraper, max_concurrent: int = SOURCE_FETCH_CONCURRENCY,
+                 health_file: Optional[str] = SOURCE_HEALTH_FILE,
+                 log: Optional[Callable[[str, str], None]] = None):
+        self.link_scraper = link_scraper
+        self.health_file = health_file
+        self._log = log
+        self._semaphore = asyncio.Semaphore(max(1, max_concurrent))
+        self.source_stats: Dict[str, Dict] = {}
+        # 各源上次提取出的链接（内容未变时直接复用）
+        self.source_links: Dict[str, List[str]] = {}
+        self.scheduler = SourceRefreshScheduler(self.source_stats)
+        self.cycle = 0
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._text_urls: Set[str] = set()
+        self.traffic: Dict[str, int] = {}
+        self._reset_traffic()
+        self._load_health()
+
+    def log(self, message: str, level: str = "INFO"):
+        if self._log:
+            self._log(message, level)
+        else:
+            logger.info(message)
+
+    # ---------- 源健康 ----------
+
+    def _load_health(self):
+        if not self.health_file or not os.path.exists(self.health_file):
+            return
+        try:
+            with open(self.health_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.cycle = int(data.get("cycle", 0))
+            for url, stats in data.get("sources", {}).items():
+                self.stats_for(url).update(stats)
+        except Exception as e:
+            logger.warning(f"⚠️ 源健康状态加载失败: {e}")
+
+    def save_health(self):
+        if not self.health_file:
+            return
+        data = {
+            "cycle": self.cycle,
+            "sources": {
+                url: {k: stats[k] for k in _PERSISTED_FIELDS if k in stats}
+                for url, stats in self.source_stats.items()
+            },
+        }
+        try:
+            tmp = f"{self.health_file}.tmp"
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp, self.health_file)
+        except Exception as e:
+            logger.warning(f"⚠️ 源健康状态保存失败: {e}")
+
+    def stats_for(self, url: str) -> Dict:
+        stats = self.source_stats.get(url)
+        if stats is None:
+            stats = {"is_disabled": False, "disabled_at": 0, "retry_fails": 0}
+            self.source_stats[url] = stats
+        return stats
+
+    def register_sources(self, urls: Iterable[str]):
+        for url in urls:
+            self.stats_for(url)
+
+    def select_targets(self, urls: Iterable[str]) -> List[str]:
+        """过滤掉禁用中的源；禁用满 SOURCE_DISABLE_CYCLES 个周期的源解封后重试"""
+        targets = []
+        for url in urls:
+            stats = self.stats_for(url)
+            if stats["is_disabled"]:
+                if (self.cycle - stats["disabled_at"]) < SOURCE_DISABLE_CYCLES:
+                    continue
+                stats["is_disabled"] = False
+                stats["retry_fails"] = 0
+                self.log(f"🔄 源已解封: {url[:30]}...", "INFO")
+            targets.append(url)
+        return targets
+
+    def _record_success(self, url: str, result: SourceFetchResult):
+        stats = self.stats_for(url)
+        stats["retry_fails"] = 0
+        stats["etag"] = result.etag
+        stats["last_modified"] = result.last_modified
+        stats["sha256"] = result.sha256
+        if result.body_bytes:
+            stats["body_bytes"] = result.body_bytes
+        if result.links:
+            self.source_links[url] = result.links
+
+    def _record_failure(self, url: str):
+        stats = self.stats_for(url)
+        stats["retry_fails"] += 1
+        if stats["retry_fails"] >= SOURCE_MAX_FAILS and not stats["is_disabled"]:
+            stats["is_disabled"] = True
+            stats["disabled_at"] = self.cycle
+            self.log(f"🚫 [{_source_name(url)}] 已禁用(连续失败{SOURCE_MAX_FAILS}次)", "WARNING")
+
+    # ---------- 周期 ----------
+
+    def _reset_traffic(self):
+        self.traffic = {"fetched": 0, "shared": 0, "wire_bytes": 0, "saved_bytes": 0,
+                        "not_modified": 0, "unchanged": 0}
+
+    def new_cycle(self, text_urls: Iterable[str] = (), full: bool = True) -> int:
+        """
+        开始新周期：清空上一周期的结果缓存
+
+        Args:
+            text_urls: 本周期需要保留完整正文的源
+            full: 是否为完整扫描；按源到期的局部刷新不推进周期计数（禁用源按完整周期解封）
+        """
+        if full:
+            self.cycle += 1
+        self._inflight.clear()
+        self._text_urls = set(text_urls)
+        self._reset_traffic()
+        return self.cycle
+
+    def end_cycle(self):
+        """周期结束：释放缓存的结果（含正文）并持久化源健康"""
+        self._inflight.clear()
+        self.save_health()
+
+    # ---------- 抓取 ----------
+
+    async def fetch(self, url: str) -> SourceFetchResult:
+        """
+        抓取源（同一周期内同一 URL 只抓取一次，所有调用方共享结果）
+
+        status 为 FETCH_FAILED 或没有任何内容时计为一次失败
+        """
+        task = self._inflight.get(url)
+        if task is None:
+            task = asyncio.create_task(self._fetch(url))
+            self._inflight[url] = task
+        else:
+            self.traffic["shared"] += 1
+        # shield：某个调用方被取消时不影响其他共享同一结果的调用方
+        return await asyncio.shield(task)
+
+    async def _fetch(self, url: str) -> SourceFetchResult:
+        stats = self.stats_for(url)
+        keep_text = url in self._text_urls
+        prev_sha256 = stats.get('sha256')
+        prev_links = self.source_links.get(url)
+        async with self._semaphore:
+            try:
+                result = await self.link_scraper.fetch_source(
+                    url,
+                    etag=stats.get('etag'),
+                    last_modified=stats.get('last_modified'),
+                    sha256=stats.get('sha256'),
+                    cached_links=self.source_links.get(url),
+                    keep_text=keep_text
+                )
+            except Exception as e:
+                logger.debug(f"抓取异常 {url}: {e}")
+                result = SourceFetchResult(status=FETCH_FAILED)
+
+        self.traffic["fetched"] += 1
+        if result.status == FETCH_FAILED or not (result.links or result.text
+                                                 or result.status in (FETCH_NOT_MODIFIED, FETCH_UNCHANGED)):
+            self._record_failure(url)
+            self.scheduler.record(url, success=False)
+            return result
+
+        self.traffic["wire_bytes"] += result.wire_bytes
+        if result.status == FETCH_NOT_MODIFIED:
+            self.traffic["not_modified"] += 1
+            self.traffic["saved_bytes"] += stats.get('body_bytes', 0)
+        elif result.status == FETCH_UNCHANGED:
+            self.traffic["unchanged"] += 1
+
+        changed = result.status == FETCH_OK and result.sha256 != prev_sha256
+        new_links = 0
+        if changed:
+            previous = set(prev_links) if prev_links else set()
+            new_links = sum(1 for link in result.links if link not in previous)
+        self.scheduler.record(url, success=True, changed=changed, new_links=new_links)
+        self._record_success(url, result)
+        return result
@@ -8,68 +8,40 @@
 """
 
 import asyncio
+import os
+import socket
 import httpx
 from typing import Optional, Dict, List
 from loguru import logger
-import re
-
-# 国家代码到名称的映射
-COUNTRY_CODE_MAP = {
-    "US": ["USA", "AMERICA", "UNITED STATES", "NEW YORK", "LOS ANGELES", "SAN FRANCISCO", "CHICAGO", "DALLAS"],
-    "JP": ["JAPAN", "TOKYO", "OSAKA", "KYOTO", "KOBE"],
-    "GB": ["UNITED KINGDOM", "UK", "LONDON", "MANCHESTER", "LIVERPOOL"],
-    "DE": ["GERMANY", "FRANKFURT", "BERLIN", "MUNICH"],
-    "FR": ["FRANCE", "PARIS", "LYON", "MARSEILLE"],
-    "CA": ["CANADA", "TORONTO", "VANCOUVER", "MONTREAL"],
-    "AU": ["AUSTRALIA", "SYDNEY", "MELBOURNE", "BRISBANE"],
-    "SG": ["SINGAPORE"],
-    "HK": ["HONG KONG", "HONGKONG"],
-    "TW": ["TAIWAN", "TAIPEI"],
-    "KR": ["KOREA", "SEOUL", "BUSAN"],
-    "IN": ["INDIA", "DELHI", "MUMBAI"],
-    "BR": ["BRAZIL", "SÃO PAULO", "RIO"],
-    "RU": ["RUSSIA", "MOSCOW", "SAINT PETERSBURG"],
-    "SE": ["SWEDEN", "STOCKHOLM"],
-    "NO": ["NORWAY", "OSLO"],
-    "NL": ["NETHERLANDS", "AMSTERDAM"],
-    "CH": ["SWITZERLAND", "ZURICH", "GENEVA"],
-    "AT": ["AUSTRIA", "VIENNA"],
-    "BE": ["BELGIUM", "BRUSSELS"],
-    "IT": ["ITALY", "ROME", "MILAN", "VENICE"],
-    "ES": ["SPAIN", "MADRID", "BARCELONA"],
-    "PT": ["PORTUGAL", "LISBON"],
-    "GR": ["GREECE", "ATHENS"],
-    "TR": ["TURKEY", "ISTANBUL"],
-    "MX": ["MEXICO", "MEXICO CITY"],
-    "TH": ["THAILAND", "BANGKOK"],
-    "MY": ["MALAYSIA", "KUALA LUMPUR"],
-    "PH": ["PHILIPPINES", "MANILA"],
-    "VN": ["VIETNAM", "HANOI", "HO CHI MINH"],
-    "ID": ["INDONESIA", "JAKARTA"],
-    "NZ": ["NEW ZEALAND", "AUCKLAND"],
-    "IE": ["IRELAND", "DUBLIN"],
-    "ZA": ["SOUTH AFRICA", "JOHANNESBURG"],
-    "CN": ["CHINA", "中国", "回国", "BEIJING", "SHANGHAI", "SHENZHEN", "GUANGZHOU", "HANGZHOU"],
-}
-
-# 反向映射：关键词 -> 国家代码
-KEYWORD_TO_COUNTRY = {}
-for country_code, keywords in COUNTRY_CODE_MAP.items():
-    for keyword in keywords:
-        KEYWORD_TO_COUNTRY[keyword] = country_code
+
+from .country_matcher import match_country
+from .ip_geo_index import lookup_country
+from .ttl_cache import TTLCache, MISSING
+
+# 本地 IP 国家索引查不到时，是否再请求 ipapi.co / ip-api.com
+IP_GEO_REMOTE_FALLBACK = os.environ.get("IP_GEO_REMOTE_FALLBACK", "false").lower() == "true"
+
+# 查询结果缓存：容量上限、成功结果的 TTL、失败结果（负缓存）的 TTL（秒）
+GEO_CACHE_MAX_SIZE = int(os.environ.get("GEO_CACHE_MAX_SIZE", "20000"))
+GEO_CACHE_TTL = float(os.environ.get("GEO_CACHE_TTL", "86400"))
+GEO_DNS_CACHE_TTL = float(os.environ.get("GEO_DNS_CACHE_TTL", "3600"))
+GEO_CACHE_NEGATIVE_TTL = float(os.environ.get("GEO_CACHE_NEGATIVE_TTL", "600"))
 
 
 class GeolocationHelper:
     """地理位置检测辅助类"""
 
     def __init__(self):
-        self.ip_cache: Dict[str, str] = {}  # IP -> 国家代码缓存
+        self.ip_cache = TTLCache(GEO_CACHE_MAX_SIZE, GEO_CACHE_TTL, GEO_CACHE_NEGATIVE_TTL)  # IP -> 国家代码
+        self.dns_cache = TTLCache(GEO_CACHE_MAX_SIZE, GEO_DNS_CACHE_TTL, GEO_CACHE_NEGATIVE_TTL)  # 域名 -> IP
+        self.domain_cache = TTLCache(GEO_CACHE_MAX_SIZE, GEO_CACHE_TTL, GEO_CACHE_NEGATIVE_TTL)  # 域名 -> 国家代码
 
     async def detect_country_by_ip(self, ip: str, timeout: int = 3) -> Optional[str]:
         """
         通过IP地址检测国家（优先级最高）
 
-        使用多个地理位置服务：
+        先查本地离线索引（ip_geo_index，不发网络请求）；
+        查不到且开启 IP_GEO_REMOTE_FALLBACK 时再使用在线服务：
         1. ipapi.co (免费，快速)
         2. ip-api.com (免费，备选)
 
@@ -80,9 +52,15 @@ class GeolocationHelper:
         Returns:
             国家代码 (如 "US", "CN") 或 None
         """
-        # 检查缓存
-        if ip in self.ip_cache:
-            return self.ip_cache[ip]
+        # 检查缓存（查询失败的 IP 在负缓存有效期内直接返回 None）
+        cached = self.ip_cache.get(ip, MISSING)
+        if cached is not MISSING:
+            return cached
+
+        country_code = lookup_country(ip)
+        if country_code or not IP_GEO_REMOTE_FALLBACK:
+            self.ip_cache.set(ip, country_code)
+            return country_code
 
         try:
             # 方案1: 使用 ipapi.co
@@ -93,7 +71,7 @@ class GeolocationHelper:
                         data = response.json()
                         country_code = data.get("country_code", "").upper()
                         if country_code and len(country_code) == 2:
-                            self.ip_cache[ip] = country_code
+                            self.ip_cache.set(ip, country_code)
                             logger.debug(f"✅ IP查询成功 ({ip}): {country_code}")
                             return country_code
                 except Exception as e:
@@ -107,7 +85,7 @@ class GeolocationHelper:
                         if data.get("status") == "success":
                             country_code = data.get("countryCode", "").upper()
                             if country_code and len(country_code) == 2:
-                                self.ip_cache[ip] = country_code
+                                self.ip_cache.set(ip, country_code)
                                 logger.debug(f"✅ IP查询成功 ({ip}): {country_code}")
                                 return country_code
                 except Exception as e:
@@ -116,13 +94,14 @@ class GeolocationHelper:
         except Exception as e:
             logger.debug(f"❌ IP地址查询异常: {str(e)[:80]}")
 
+        self.ip_cache.set(ip, None)
         return None
 
     def detect_country_by_name(self, name: str) -> Optional[str]:
         """
         通过节点名称检测国家（优先级次高）
 
-        使用精确关键词匹配，避免误匹配
+        使用 country_matcher 的统一关键词表，单次扫描名称
 
         Args:
             name: 节点名称
@@ -130,36 +109,13 @@ class GeolocationHelper:
         Returns:
             国家代码或 None
         """
-        if not name:
-            return None
-
-        upper_name = name.upper()
-
-        # 清理名称，提取有用信息
-        # 移除 Emoji 和特殊符号，保留字母数字和空格
-        cleaned_name = re.sub(r'[^A-Z0-9\s]', ' ', upper_name)
-        cleaned_name = ' ' + cleaned_name + ' '  # 添加前后空格以进行单词匹配
-
-        # 优先匹配精确关键词
-        for keyword, country_code in KEYWORD_TO_COUNTRY.items():
-            # 使用单词边界匹配，避免部分匹配
-            if f' {keyword} ' in cleaned_name:
-                logger.debug(f"✅ 名称匹配: {name} -> {country_code}")
-                return country_code
-
-        # 次级匹配：检查是否包含关键词（不要求单词边界）
-        for keyword, country_code in KEYWORD_TO_COUNTRY.items():
-            if keyword in cleaned_name:
-                logger.debug(f"✅ 部分匹配: {name} -> {country_code}")
-                return country_code
-
-        return None
+        return match_country(name)
 
     async def detect_country_by_domain(self, domain: str, timeout: int = 3) -> Optional[str]:
         """
         通过域名检测国家（优先级最低）
 
-        使用 WHOIS 查询域名顶级域名信息
+        先看国家代码顶级域名，否则解析出 IP 再查本地 IP 国家索引（结果均有缓存）
 
         Args:
             domain: 域名
@@ -170,6 +126,41 @@ class GeolocationHelper:
         if not domain:
             return None
 
+        cached = self.domain_cache.get(domain, MISSING)
+        if cached is not MISSING:
+            return cached
+
+        country = self._detect_country_by_tld(domain)
+        if not country:
+            ip = await self.resolve_domain(domain, timeout)
+            if ip:
+                country = await self.detect_country_by_ip(ip, timeout)
+        self.domain_cache.set(domain, country)
+        return country
+
+    async def resolve_domain(self, domain: str, timeout: float = 3) -> Optional[str]:
+        """解析域名的第一个 IP（带缓存，解析失败也缓存一段时间）"""
+        cached = self.dns_cache.get(domain, MISSING)
+        if cached is not MISSING:
+            return cached
+        ip = None
+        try:
+            infos = await asyncio.wait_for(
+                asyncio.get_running_loop().getaddrinfo(domain, None, proto=socket.IPPROTO_TCP), timeout
+            )
+            if infos:
+                ip = infos[0][4][0]
+        except Exception as e:
+            logger.debug(f"⚠️ 域名解析失败 ({domain}): {str(e)[:50]}")
+        self.dns_cache.set(domain, ip)
+        return ip
+
+    def remember_resolution(self, domain: str, ip: str):
+        """记录外部（批量 DNS 预解析）得到的解析结果，避免按域名识别国家时重复解析"""
+        self.dns_cache.set(domain, ip)
+
+    def _detect_country_by_tld(self, domain: str) -> Optional[str]:
+        """按国家代码顶级域名识别"""
         try:
             # 提取顶级域名 (TLD)
             parts = domain.split('.')
@@ -266,7 +257,17 @@ class GeolocationHelper:
         logger.debug(f"❌ 无法检测国家: name={name[:20] if name else None}, ip={ip}")
         return "UNK"
 
+    def cache_stats(self) -> Dict[str, Dict]:
+        """各缓存的命中 / 淘汰统计"""
+        return {
+            "ip_country": self.ip_cache.stats(),
+            "domain_ip": self.dns_cache.stats(),
+            "domain_country": self.domain_cache.stats(),
+        }
+
     def clear_cache(self):
-        """清除IP缓存"""
+        """清除IP / 域名缓存"""
         self.ip_cache.clear()
+        self.dns_cache.clear()
+        self.domain_cache.clear()
         logger.info("✅ 地理位置缓存已清除")
@@ -0,0 +1,429 @@
+# backend/app/modules/node_hunter/ip_geo_index.py
+"""
+离线 IP -> 国家索引
+
+原先按 IP 查国家要请求 ipapi.co / ip-api.com：NodeHunter 里还是同步 httpx.get（2 秒超时），
+启动加载本地节点和检测完成时在事件循环里逐个节点阻塞。
+这里改为本地查表：
+- 数据源为 CIDR / IP 段 -> 国家的 CSV（"1.0.0.0/24,AU"、"1.0.0.0,1.0.0.255,AU"、
+  ip2location 的整数段格式均可），或安装了 maxminddb 时直接读取 .mmdb
+- CSV 首次加载时编译成二进制索引文件（按起始地址排序的定长数组，相邻同国家的段合并），
+  之后启动直接 mmap，不再解析 CSV；CSV 更新（大小 / 修改时间变化）后自动重建
+- 查询为 bisect 二分查找，不做任何网络请求
+
+数据文件默认为 ip_country.csv（IP_GEO_DB_FILE），不随代码分发：
+服务启动时 ensure_dataset() 发现文件缺失或超过 IP_GEO_DB_MAX_AGE_DAYS 天，
+就从 IP_GEO_DB_URLS 下载（默认为 sapics/ip-location-db 的 geo-whois-asn-country，
+CC0 授权，可自由再分发）并重新编译索引；也可以手动执行
+    python -m app.modules.node_hunter.ip_geo_index --download
+数据文件仍不存在时索引为空，查询一律返回 None（由调用方按名称识别兜底）。
+"""
+
+import asyncio
+import bisect
+import ipaddress
+import logging
+import mmap
+import os
+import socket
+import struct
+import sys
+import time
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import httpx
+
+try:
+    import maxminddb
+except ImportError:
+    maxminddb = None
+
+logger = logging.getLogger(__name__)
+
+IP_GEO_DB_FILE = os.environ.get("IP_GEO_DB_FILE", "ip_country.csv")
+IP_GEO_INDEX_FILE = os.environ.get("IP_GEO_INDEX_FILE", "")  # 为空时为 <数据文件>.idx
+# 数据下载：逗号分隔的 CSV 地址（内容依次拼接），数据文件超过多少天重新下载，是否自动下载
+IP_GEO_DB_URLS = os.environ.get(
+    "IP_GEO_DB_URLS",
+    "https://cdn.jsdelivr.net/npm/@ip-location-db/geo-whois-asn-country/geo-whois-asn-country-ipv4.csv,"
+    "https://cdn.jsdelivr.net/npm/@ip-location-db/geo-whois-asn-country/geo-whois-asn-country-ipv6.csv",
+)
+IP_GEO_DB_MAX_AGE_DAYS = float(os.environ.get("IP_GEO_DB_MAX_AGE_DAYS", "30"))
+IP_GEO_AUTO_DOWNLOAD = os.environ.get("IP_GEO_AUTO_DOWNLOAD", "true").lower() == "true"
+
+# 索引文件头：魔数(8) 国家数 IPv4 段数 IPv6 段数 源文件大小 源文件修改时间(ns)
+# 之后依次为：国家代码表（每个 2 字节，补齐到 4 字节）、IPv4 起始 / 结束（uint32）、IPv4 国家序号（uint8）、
+# IPv6 起始 / 结束（16 字节大端）、IPv6 国家序号（uint8）
+_MAGIC = b"IPGEO2" + (b"LE" if sys.byteorder == "little" else b"BE")
+_HEADER = struct.Struct("=8sIIIqq")
+_V6_WIDTH = 16
+_V4_MAPPED_PREFIX = b"\x00" * 10 + b"\xff\xff"
+
+
+class _V6Keys:
+    """IPv6 段的起始 / 结束地址序列（16 字节大端，字节序比较即数值比较），供 bisect 使用"""
+
+    def __init__(self, view: memoryview):
+        self._view = view
+
+    def __len__(self) -> int:
+        return len(self._view) // _V6_WIDTH
+
+    def __getitem__(self, index: int) -> bytes:
+        offset = index * _V6_WIDTH
+        return self._view[offset:offset + _V6_WIDTH].tobytes()
+
+
+def _parse_address(text: str) -> Optional[ipaddress._BaseAddress]:
+    text = text.strip().strip('"')
+    if text.isdigit():
+        value = int(text)
+        return ipaddress.IPv4Address(value) if value < 2 ** 32 else ipaddress.IPv6Address(value)
+    return ipaddress.ip_address(text)
+
+
+def _parse_csv_ranges(path: str) -> Tuple[List[Tuple[int, int, bytes]], List[Tuple[int, int, bytes]]]:
+    """读取 CSV 范围表，返回 (IPv4 段, IPv6 段)，每段为 (起始, 结束, 国家代码)"""
+    v4, v6 = [], []
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            fields = [field.strip().strip('"') for field in line.split(",")]
+            try:
+                if "/" in fields[0]:
+                    network = ipaddress.ip_network(fields[0], strict=False)
+                    first, last, country = network.network_address, network.broadcast_address, fields[1]
+                else:
+                    first, last, country = _parse_address(fields[0]), _parse_address(fields[1]), fields[2]
+            except (ValueError, IndexError):
+                continue  # 表头或无法识别的行
+            country = country.upper()
+            if len(country) != 2 or not country.isalpha() or country == "ZZ":
+                continue
+            if first.version != last.version:
+                continue
+            # ip2location 把 IPv4 映射到 IPv6 空间（::ffff:0:0/96），按 IPv4 处理
+            if first.version == 6 and first.ipv4_mapped and last.ipv4_mapped:
+                first, last = first.ipv4_mapped, last.ipv4_mapped
+            target = v4 if first.version == 4 else v6
+            target.append((int(first), int(last), country.encode("ascii")))
+    return _merge_ranges(v4), _merge_ranges(v6)
+
+
+def _merge_ranges(ranges: List[Tuple[int, int, bytes]]) -> List[Tuple[int, int, bytes]]:
+    """按起始地址排序，合并相邻且国家相同的段（重叠部分以先出现的段为准）"""
+    ranges.sort()
+    merged: List[Tuple[int, int, bytes]] = []
+    for start, end, country in ranges:
+        if merged:
+            prev_start, prev_end, prev_country = merged[-1]
+            if start <= prev_end:
+                if end <= prev_end:
+                    continue
+                start = prev_end + 1
+            if prev_country == country and start == prev_end + 1:
+                merged[-1] = (prev_start, end, country)
+                continue
+        merged.append((start, end, country))
+    return merged
+
+
+def _code_table_size(count: int) -> int:
+    return (2 * count + 3) // 4 * 4
+
+
+def build_index(source_path: str, index_path: str) -> Tuple[int, int]:
+    """把 CSV 范围表编译成索引文件，返回 (IPv4 段数, IPv6 段数)"""
+    v4, v6 = _parse_csv_ranges(source_path)
+    codes = sorted({country for _, _, country in v4} | {country for _, _, country in v6})
+    code_ids = {code: i for i, code in enumerate(codes)}
+    stat = os.stat(source_path)
+    tmp = f"{index_path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, len(codes), len(v4), len(v6), stat.st_size, stat.st_mtime_ns))
+        f.write(b"".join(codes).ljust(_code_table_size(len(codes)), b"\0"))
+        f.write(array("I", (start for start, _, _ in v4)).tobytes())
+        f.write(array("I", (end for _, end, _ in v4)).tobytes())
+        f.write(bytes(code_ids[country] for _, _, country in v4))
+        f.write(b"".join(start.to_bytes(_V6_WIDTH, "big") for start, _, _ in v6))
+        f.write(b"".join(end.to_bytes(_V6_WIDTH, "big") for _, end, _ in v6))
+        f.write(bytes(code_ids[country] for _, _, country in v6))
+    os.replace(tmp, index_path)
+    return len(v4), len(v6)
+
+
+def _default_index_path(source_path: str) -> str:
+    return IP_GEO_INDEX_FILE or f"{source_path}.idx"
+
+
+async def download_dataset(path: str = IP_GEO_DB_FILE, urls: Optional[List[str]] = None,
+                           timeout: float = 120) -> int:
+    """
+    下载 CIDR / IP 段 -> 国家 CSV（多个地址的内容依次拼接）并原子替换数据文件
+
+    返回写入的字节数；任一地址下载失败时抛出异常，原数据文件保持不变
+    """
+    urls = urls or [url.strip() for url in IP_GEO_DB_URLS.split(",") if url.strip()]
+    parts = []
+    async with httpx.AsyncClient(timeout=timeout, follow_redirects=True) as client:
+        for url in urls:
+            response = await client.get(url)
+            response.raise_for_status()
+            content = response.content
+            parts.append(content if content.endswith(b"\n") else content + b"\n")
+    data = b"".join(parts)
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+    return len(data)
+
+
+def _dataset_is_stale(path: str) -> bool:
+    try:
+        age = time.time() - os.stat(path).st_mtime
+    except OSError:
+        return True
+    return age > IP_GEO_DB_MAX_AGE_DAYS * 86400
+
+
+async def ensure_dataset(path: str = IP_GEO_DB_FILE) -> bool:
+    """
+    数据文件缺失或过期时下载并重新编译索引（编译在线程中进行，不阻塞事件循环）
+
+    返回是否更新了数据；.mmdb 或关闭了自动下载时不做任何事
+    """
+    if path.endswith(".mmdb") or not IP_GEO_AUTO_DOWNLOAD or not _dataset_is_stale(path):
+        return False
+    try:
+        size = await download_dataset(path)
+        loop = asyncio.get_running_loop()
+        v4_count, v6_count = await loop.run_in_executor(None, build_index, path, _default_index_path(path))
+    except Exception as e:
+        logger.warning(f"⚠️ IP 国家数据下载失败 ({e})，继续使用现有数据")
+        return False
+    logger.info(f"🌍 IP 国家数据已更新: {size} 字节, IPv4 {v4_count} 段, IPv6 {v6_count} 段")
+    # 下次查询时重新打开（包括之前因数据缺失而加载失败的情况）
+    reset_ip_geo_index()
+    return True
+
+
+class IPGeoIndex:
+    """mmap 的 IP 段索引（或 maxminddb 读取器）"""
+
+    def __init__(self, source_path: str = IP_GEO_DB_FILE, index_path: Optional[str] = None):
+        self.source_path = source_path
+        self.index_path = index_path or _default_index_path(source_path)
+        self.hits = 0
+        self.misses = 0
+        self._file = None
+        self._mmap = None
+        self._reader = None
+        self._codes: List[str] = []
+        self._v4_starts = self._v4_ends = self._v4_countries = None
+        self._v6_starts = self._v6_ends = self._v6_countries = None
+        self._v4_count = self._v6_count = 0
+
+        if source_path.endswith(".mmdb"):
+            self._open_mmdb()
+        else:
+            self._open_index()
+
+    # ---------- 加载 ----------
+
+    def _open_mmdb(self):
+        if maxminddb is None:
+            logger.warning("⚠️ 未安装 maxminddb，无法读取 .mmdb，IP 国家索引为空")
+            return
+        if not os.path.exists(self.source_path):
+            logger.warning(f"⚠️ IP 国家数据 {self.source_path} 不存在，IP 国家索引为空")
+            return
+        self._reader = maxminddb.open_database(self.source_path, maxminddb.MODE_MMAP)
+
+    def _index_is_fresh(self) -> bool:
+        try:
+            with open(self.index_path, "rb") as f:
+                magic, _, _, _, size, mtime_ns = _HEADER.unpack(f.read(_HEADER.size))
+        except (OSError, struct.error):
+            return False
+        if magic != _MAGIC:
+            return False
+        if not os.path.exists(self.source_path):
+            return True  # 只分发了索引文件
+        stat = os.stat(self.source_path)
+        return stat.st_size == size and stat.st_mtime_ns == mtime_ns
+
+    def _open_index(self):
+        if not self._index_is_fresh():
+            if not os.path.exists(self.source_path):
+                logger.warning(f"⚠️ IP 国家数据 {self.source_path} 不存在，IP 国家索引为空")
+                return
+            v4_count, v6_count = build_index(self.source_path, self.index_path)
+            logger.info(f"🌍 IP 国家索引已编译: IPv4 {v4_count} 段, IPv6 {v6_count} 段 -> {self.index_path}")
+
+        self._file = open(self.index_path, "rb")
+        if os.fstat(self._file.fileno()).st_size <= _HEADER.size:
+            return
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+        _, n_codes, n4, n6, _, _ = _HEADER.unpack_from(view)
+        offset = _HEADER.size
+        table = view[offset:offset + 2 * n_codes].tobytes().decode("ascii")
+        self._codes = [table[i:i + 2] for i in range(0, len(table), 2)]
+        offset += _code_table_size(n_codes)
+        self._v4_starts = view[offset:offset + 4 * n4].cast("I")
+        offset += 4 * n4
+        self._v4_ends = view[offset:offset + 4 * n4].cast("I")
+        offset += 4 * n4
+        self._v4_countries = view[offset:offset + n4]
+        offset += n4
+        self._v6_starts = _V6Keys(view[offset:offset + _V6_WIDTH * n6])
+        offset += _V6_WIDTH * n6
+        self._v6_ends = _V6Keys(view[offset:offset + _V6_WIDTH * n6])
+        offset += _V6_WIDTH * n6
+        self._v6_countries = view[offset:offset + n6]
+        self._v4_count, self._v6_count = n4, n6
+
+    def __len__(self) -> int:
+        return self._v4_count + self._v6_count
+
+    @property
+    def available(self) -> bool:
+        return self._reader is not None or len(self) > 0
+
+    # ---------- 查询 ----------
+
+    def _lookup_mmdb(self, address: ipaddress._BaseAddress) -> Optional[str]:
+        record = self._reader.get(address)
+        if not isinstance(record, dict):
+            return None
+        country = record.get("country") or record.get("registered_country") or {}
+        code = country.get("iso_code") if isinstance(country, dict) else None
+        return code or record.get("country_code")
+
+    def lookup(self, ip: str) -> Optional[str]:
+        """查询 IP 所属国家代码；不是 IP（例如域名）或不在任何段内时返回 None"""
+        if self._reader is not None:
+            try:
+                country = self._lookup_mmdb(ipaddress.ip_address(ip))
+            except ValueError:
+                return None
+        else:
+            # inet_pton 比 ipaddress 快一个数量级，且只接受规范写法
+            try:
+                country = self._lookup_v4(int.from_bytes(socket.inet_pton(socket.AF_INET, ip), "big"))
+            except OSError:
+                try:
+                    packed = socket.inet_pton(socket.AF_INET6, ip)
+                except OSError:
+                    return None
+                if packed[:12] == _V4_MAPPED_PREFIX:
+                    country = self._lookup_v4(int.from_bytes(packed[12:], "big"))
+                else:
+                    country = self._lookup_v6(packed)
+        if country:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return country
+
+    def _lookup_v4(self, value: int) -> Optional[str]:
+        if not self._v4_count:
+            return None
+        i = bisect.bisect_right(self._v4_starts, value) - 1
+        if i < 0 or value > self._v4_ends[i]:
+            return None
+        return self._codes[self._v4_countries[i]]
+
+    def _lookup_v6(self, packed: bytes) -> Optional[str]:
+        if not self._v6_count:
+            return None
+        i = bisect.bisect_right(self._v6_starts, packed) - 1
+        if i < 0 or packed > self._v6_ends[i]:
+            return None
+        return self._codes[self._v6_countries[i]]
+
+    def lookup_many(self, ips: Iterable[str]) -> List[Optional[str]]:
+        """批量查询，结果与 ips 一一对应（重复的 IP 只查一次）"""
+        memo: Dict[str, Optional[str]] = {}
+        results = []
+        for ip in ips:
+            if ip not in memo:
+                memo[ip] = self.lookup(ip)
+            results.append(memo[ip])
+        return results
+
+    def stats(self) -> Dict[str, int]:
+        return {"ipv4_ranges": self._v4_count, "ipv6_ranges": self._v6_count,
+                "hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        # memoryview 切片引用着 mmap，先释放再关闭
+        self._v4_starts = self._v4_ends = self._v4_countries = None
+        self._v6_starts = self._v6_ends = self._v6_countries = None
+        self._v4_count = self._v6_count = 0
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                pass  # 仍有外部引用时交给垃圾回收
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+
+
+_ip_geo_index: Optional[IPGeoIndex] = None
+_ip_geo_index_failed = False
+
+
+def get_ip_geo_index() -> Optional[IPGeoIndex]:
+    """获取全局 IP 国家索引；加载失败时返回 None（调用方按名称识别兜底）"""
+    global _ip_geo_index, _ip_geo_index_failed
+    if _ip_geo_index is None and not _ip_geo_index_failed:
+        try:
+            _ip_geo_index = IPGeoIndex()
+        except Exception as e:
+            _ip_geo_index_failed = True
+            logger.warning(f"⚠️ IP 国家索引不可用 ({e})")
+    return _ip_geo_index
+
+
+def lookup_country(ip: str) -> Optional[str]:
+    """本地查询 IP 所属国家代码（不发网络请求）"""
+    index = get_ip_geo_index()
+    return index.lookup(ip) if index is not None else None
+
+
+def close_ip_geo_index():
+    global _ip_geo_index
+    if _ip_geo_index is not None:
+        _ip_geo_index.close()
+        _ip_geo_index = None
+
+
+def reset_ip_geo_index():
+    """关闭当前索引并清除加载失败标记，下次查询时重新加载（数据文件更新后调用）"""
+    global _ip_geo_index_failed
+    close_ip_geo_index()
+    _ip_geo_index_failed = False
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="IP -> 国家离线索引")
+    parser.add_argument("--download", action="store_true", help="下载数据文件（忽略过期时间）")
+    parser.add_argument("--path", default=IP_GEO_DB_FILE, help="数据文件路径")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    if args.download:
+        print(f"下载完成: {asyncio.run(download_dataset(args.path))} 字节 -> {args.path}")
+    v4, v6 = build_index(args.path, _default_index_path(args.path))
+    print(f"索引已编译: IPv4 {v4} 段, IPv6 {v6} 段 -> {_default_index_path(args.path)}")
@@ -0,0 +1,100 @@
+# backend/app/modules/node_hunter/link_dedup.py
+"""
+跨源链接去重
+
+很多订阅源互为镜像或超集，原先在所有源抓取完后才 list(set(...)) 一次性去重。
+这里在每个源的链接到达时立即去重：
+- 链接先归一化（去空白、协议名小写、去掉 # 后的备注名），同一节点换了名字也能识别
+- 只保存归一化链接的 64 位摘要（int），比保存链接字符串省得多
+- 统计每个源的「新增贡献」（到达时此前未见过的链接数）和「独占贡献」
+  （本周期只有该源提供的链接数），用来找出完全没有贡献的源
+"""
+
+import hashlib
+from typing import Dict, Iterable, List, Tuple
+
+# 摘要值：首次提供该链接的源序号；被多个源提供时记为 SHARED
+SHARED = -1
+
+
+def normalize_link(link: str) -> str:
+    """归一化节点链接（vmess 的备注在 Base64 JSON 内，只去空白和统一协议名）"""
+    link = link.strip()
+    scheme, sep, rest = link.partition("://")
+    if not sep:
+        return link
+    scheme = scheme.lower()
+    if scheme != "vmess":
+        rest = rest.split("#", 1)[0]
+    return f"{scheme}://{rest.rstrip('/')}"
+
+
+def link_fingerprint(link: str) -> int:
+    """归一化链接的 64 位摘要"""
+    digest = hashlib.blake2b(normalize_link(link).encode("utf-8", "surrogatepass"), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+class LinkDeduplicator:
+    """一个爬虫周期内的流式去重器"""
+
+    def __init__(self):
+        self._owners: Dict[int, int] = {}
+        self._sources: List[str] = []
+        self._source_index: Dict[str, int] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._owners)
+
+    def _index_of(self, source: str) -> int:
+        index = self._source_index.get(source)
+        if index is None:
+            index = len(self._sources)
+            self._sources.append(source)
+            self._source_index[source] = index
+            self._stats[source] = {"total": 0, "unique": 0, "duplicates": 0}
+        return index
+
+    def add(self, source: str, links: Iterable[str]) -> List[str]:
+        """
+        加入一个源的链接
+
+        Returns:
+            本周期首次出现的链接（保持原顺序，源内重复也会去掉）
+        """
+        index = self._index_of(source)
+        stats = self._stats[source]
+        owners = self._owners
+        fresh = []
+        for link in links:
+            stats["total"] += 1
+            fp = link_fingerprint(link)
+            owner = owners.get(fp)
+            if owner is None:
+                owners[fp] = index
+                fresh.append(link)
+            elif owner != index and owner != SHARED:
+                owners[fp] = SHARED
+        stats["unique"] += len(fresh)
+        stats["duplicates"] = stats["total"] - stats["unique"]
+        return fresh
+
+    def source_stats(self) -> Dict[str, Dict[str, int]]:
+        """每个源的 {total, unique, duplicates, exclusive}"""
+        exclusive = [0] * len(self._sources)
+        for owner in self._owners.values():
+            if owner != SHARED:
+                exclusive[owner] += 1
+        return {
+            source: {**self._stats[source], "exclusive": exclusive[i]}
+            for i, source in enumerate(self._sources)
+        }
+
+    def redundant_sources(self) -> List[Tuple[str, int]]:
+        """本周期没有独占链接的源: [(source, total)]"""
+        return [
+            (source, stats["total"])
+            for source, stats in self.source_stats().items()
+            if stats["total"] and not stats["exclusive"]
+        ]
@@ -15,17 +15,20 @@ import qrcode
 from io import BytesIO
 import json
 import base64
+from collections import deque
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 import ipapi
 
-from ..link_scraper.link_scraper import LinkScraper
-from .parsers import parse_node_url
+from ..link_scraper.link_scraper import LinkScraper, FETCH_OK, FETCH_FAILED
+from .parsers import parse_many_async, shutdown_parse_pool
+from .parse_cache import close_parse_cache
 from .validators import test_node_network, NodeTestResult
 from .config_generator import generate_node_share_link, generate_subscription_content, generate_clash_config
 from .advanced_speed_test import run_advanced_speed_test
 from .supabase_helper import upload_to_supabase, check_supabase_connection
 from .clash_basic_check import (
     check_nodes_clash,
+    close_mihomo_pool,
     ClashCheckResult,
     ClashBasicChecker,
 )
@@ -38,8 +41,22 @@ from .simple_availability_check import (
     AvailabilityResult,
 )
 from .real_speed_test import RealSpeedTester
-from .geolocation_helper import GeolocationHelper
+from .geolocation_helper import GeolocationHelper, GEO_CACHE_MAX_SIZE, GEO_CACHE_TTL, GEO_CACHE_NEGATIVE_TTL
+from .country_matcher import match_country, match_countries
+from .ip_geo_index import lookup_country, close_ip_geo_index, ensure_dataset as ensure_ip_geo_dataset
+from .ttl_cache import TTLCache, MISSING
 from .persistence_helper import get_persistence
+from .adaptive_concurrency import AdaptiveConcurrencyController
+from .real_availability_check import prefilter_nodes
+from .dns_resolver import pre_resolve_nodes, close_dns_resolver
+from .endpoint_groups import prefilter_endpoint_groups
+from .node_queue import PendingNodeQueue, PRIORITY_NEW, PRIORITY_RETRY, PRIORITY_REVALIDATE
+from .node_store import NodeCollection
+from .node_record import NodeRecord
+from .link_dedup import LinkDeduplicator
+from .fetch_service import SourceFetchService
+from .scan_diff import ScanDiffer
+from .china_hunter import ChinaHunter
 
 try:
     from ..proxy.proxy_engine import manager as pool_manager
@@ -64,74 +81,24 @@ CF_WORKER_URL = os.environ.get("CF_WORKER_URL", "")
 # 是否启用云端检测
 CLOUD_DETECTION_ENABLED = os.environ.get("CLOUD_DETECTION_ENABLED", "false").lower() == "true"  # 🔥 改为默认false，避免节点被过度过滤
 
-NAME_TO_CODE = {
-    # 亚洲
-    "CN": "CN", "CHINA": "CN", "中国": "CN", "回国": "CN", "BEIJING": "CN", "SHANGHAI": "CN", "SHENZHEN": "CN",
-    "🇨🇳": "CN",
-    "HK": "HK", "HONG KONG": "HK", "HONGKONG": "HK", "🇭🇰": "HK",
-    "TW": "TW", "TAIWAN": "TW", "TAIPEI": "TW", "🇹🇼": "TW",
-    "MO": "MO", "MACAO": "MO", "MACAU": "MO", "🇲🇴": "MO",
-    "JP": "JP", "JAPAN": "JP", "TOKYO": "JP", "OSAKA": "JP", "🇯🇵": "JP",
-    "SG": "SG", "SINGAPORE": "SG", "🇸🇬": "SG",
-    "KR": "KR", "KOREA": "KR", "SEOUL": "KR", "🇰🇷": "KR",
-    "TH": "TH", "THAILAND": "TH", "BANGKOK": "TH", "🇹🇭": "TH",
-    "MY": "MY", "MALAYSIA": "MY", "KUALA LUMPUR": "MY", "🇲🇾": "MY",
-    "PH": "PH", "PHILIPPINES": "PH", "MANILA": "PH", "🇵🇭": "PH",
-    "VN": "VN", "VIETNAM": "VN", "HANOI": "VN", "HO CHI MINH": "VN", "🇻🇳": "VN",
-    "ID": "ID", "INDONESIA": "ID", "JAKARTA": "ID", "🇮🇩": "ID",
-    "IN": "IN", "INDIA": "IN", "DELHI": "IN", "MUMBAI": "IN", "🇮🇳": "IN",
-    "PK": "PK", "PAKISTAN": "PK", "ISLAMABAD": "PK", "🇵🇰": "PK",
-    "BD": "BD", "BANGLADESH": "BD", "DHAKA": "BD", "🇧🇩": "BD",
-    "LK": "LK", "SRI LANKA": "LK", "COLOMBO": "LK", "🇱🇰": "LK",
-    # 中东
-    "TR": "TR", "TURKEY": "TR", "ISTANBUL": "TR", "ANKARA": "TR", "🇹🇷": "TR",
-    "AE": "AE", "UAE": "AE", "UNITED ARAB EMIRATES": "AE", "DUBAI": "AE", "🇦🇪": "AE",
-    "SA": "SA", "SAUDI ARABIA": "SA", "RIYADH": "SA", "🇸🇦": "SA",
-    "IL": "IL", "ISRAEL": "IL", "TEL AVIV": "IL", "🇮🇱": "IL",
-    "JO": "JO", "JORDAN": "JO", "AMMAN": "JO", "🇯🇴": "JO",
-    # 欧洲
-    "GB": "GB", "UK": "GB", "UNITED KINGDOM": "GB", "LONDON": "GB", "🇬🇧": "GB",
-    "DE": "DE", "GERMANY": "DE", "FRANKFURT": "DE", "BERLIN": "DE", "🇩🇪": "DE",
-    "FR": "FR", "FRANCE": "FR", "PARIS": "FR", "LYON": "FR", "🇫🇷": "FR",
-    "NL": "NL", "NETHERLANDS": "NL", "AMSTERDAM": "NL", "ROTTERDAM": "NL", "🇳🇱": "NL",
-    "BE": "BE", "BELGIUM": "BE", "BRUSSELS": "BE", "🇧🇪": "BE",
-    "IT": "IT", "ITALY": "IT", "MILAN": "IT", "ROME": "IT", "🇮🇹": "IT",
-    "ES": "ES", "SPAIN": "ES", "MADRID": "ES", "BARCELONA": "ES", "🇪🇸": "ES",
-    "PT": "PT", "PORTUGAL": "PT", "LISBON": "PT", "🇵🇹": "PT",
-    "PL": "PL", "POLAND": "PL", "WARSAW": "PL", "🇵🇱": "PL",
-    "SE": "SE", "SWEDEN": "SE", "STOCKHOLM": "SE", "🇸🇪": "SE",
-    "NO": "NO", "NORWAY": "NO", "OSLO": "NO", "🇳🇴": "NO",
-    "DK": "DK", "DENMARK": "DK", "COPENHAGEN": "DK", "🇩🇰": "DK",
-    "FI": "FI", "FINLAND": "FI", "HELSINKI": "FI", "🇫🇮": "FI",
-    "CH": "CH", "SWITZERLAND": "CH", "ZURICH": "CH", "GENEVA": "CH", "🇨🇭": "CH",
-    "AT": "AT", "AUSTRIA": "AT", "VIENNA": "AT", "🇦🇹": "AT",
-    "CZ": "CZ", "CZECH": "CZ", "PRAGUE": "CZ", "🇨🇿": "CZ",
-    "HU": "HU", "HUNGARY": "HU", "BUDAPEST": "HU", "🇭🇺": "HU",
-    "RO": "RO", "ROMANIA": "RO", "BUCHAREST": "RO", "🇷🇴": "RO",
-    "GR": "GR", "GREECE": "GR", "ATHENS": "GR", "🇬🇷": "GR",
-    "RU": "RU", "RUSSIA": "RU", "MOSCOW": "RU", "ST PETERSBURG": "RU", "SIBERIA": "RU", "🇷🇺": "RU",
-    "UA": "UA", "UKRAINE": "UA", "KYIV": "UA", "🇺🇦": "UA",
-    "BG": "BG", "BULGARIA": "BG", "SOFIA": "BG", "🇧🇬": "BG",
-    # 北美
-    "US": "US", "USA": "US", "AMERICA": "US", "UNITED STATES": "US", "LOS ANGELES": "US", "SAN FRANCISCO": "US",
-    "NEW YORK": "US", "CHICAGO": "US", "DALLAS": "US", "SEATTLE": "US", "MIAMI": "US", "🇺🇸": "US",
-    "CA": "CA", "CANADA": "CA", "TORONTO": "CA", "VANCOUVER": "CA", "MONTREAL": "CA", "🇨🇦": "CA",
-    "MX": "MX", "MEXICO": "MX", "MEXICO CITY": "MX", "🇲🇽": "MX",
-    # 南美
-    "BR": "BR", "BRAZIL": "BR", "SAO PAULO": "BR", "RIO DE JANEIRO": "BR", "🇧🇷": "BR",
-    "AR": "AR", "ARGENTINA": "AR", "BUENOS AIRES": "AR", "🇦🇷": "AR",
-    "CL": "CL", "CHILE": "CL", "SANTIAGO": "CL", "🇨🇱": "CL",
-    "CO": "CO", "COLOMBIA": "CO", "BOGOTA": "CO", "🇨🇴": "CO",
-    "PE": "PE", "PERU": "PE", "LIMA": "PE", "🇵🇪": "PE",
-    "VE": "VE", "VENEZUELA": "VE", "CARACAS": "VE", "🇻🇪": "VE",
-    # 大洋洲
-    "AU": "AU", "AUSTRALIA": "AU", "SYDNEY": "AU", "MELBOURNE": "AU", "BRISBANE": "AU", "🇦🇺": "AU",
-    "NZ": "NZ", "NEW ZEALAND": "NZ", "AUCKLAND": "NZ", "WELLINGTON": "NZ", "🇳🇿": "NZ",
-    # 非洲
-    "ZA": "ZA", "SOUTH AFRICA": "ZA", "JOHANNESBURG": "ZA", "CAPE TOWN": "ZA", "🇿🇦": "ZA",
-    "EG": "EG", "EGYPT": "EG", "CAIRO": "EG", "🇪🇬": "EG",
-    "NG": "NG", "NIGERIA": "NG", "LAGOS": "NG", "🇳🇬": "NG",
-}
+# 内核检测前的 TCP/TLS 预过滤（淘汰明显不可达的节点，减少内核启动次数）
+PREFILTER_ENABLED = os.environ.get("NODE_PREFILTER_ENABLED", "true").lower() == "true"
+PREFILTER_MAX_CONCURRENT = int(os.environ.get("NODE_PREFILTER_CONCURRENCY", "300"))
+PREFILTER_TIMEOUT = float(os.environ.get("NODE_PREFILTER_TIMEOUT", "3"))
+# 检测前批量 DNS 预解析（同一域名只解析一次，NXDOMAIN 节点直接淘汰）
+DNS_PRERESOLVE_ENABLED = os.environ.get("NODE_DNS_PRERESOLVE_ENABLED", "true").lower() == "true"
+# 预过滤按解析后的端点 (IP, 端口, 协议) 分组，同一台服务器只探测一次
+ENDPOINT_GROUPING_ENABLED = os.environ.get("NODE_ENDPOINT_GROUPING_ENABLED", "true").lower() == "true"
+
+# 检测失败节点的重试：首次失败后等待的秒数（之后每次翻倍），以及每次扫描最多重新入队的数量
+RETRY_BASE_DELAY = float(os.environ.get("NODE_RETRY_BASE_DELAY", "3600"))
+RETRY_MAX_PER_SCAN = int(os.environ.get("NODE_RETRY_MAX_PER_SCAN", "200"))
+
+# 源贡献日志保留的条数（按源刷新每分钟都可能追加）
+SOURCE_LOG_MAX_ENTRIES = int(os.environ.get("NODE_SOURCE_LOG_MAX_ENTRIES", "200"))
+
+# 流式合并时订阅内容 / 节点文件的去抖刷新间隔（秒）
+ARTIFACT_REFRESH_DEBOUNCE = float(os.environ.get("NODE_ARTIFACT_DEBOUNCE", "5"))
 
 
 class StatsResponse(BaseModel):
@@ -140,6 +107,9 @@ class StatsResponse(BaseModel):
     logs: List[str]
     nodes: List[dict]
     next_scan_time: Optional[float] = None  # 🔥 新增：下次扫描时间戳
+    concurrency: Optional[Dict[str, Any]] = None  # 自适应并发窗口
+    pending_queue: Optional[Dict[str, Any]] = None  # 待检测队列大小及各优先级数量
+    caches: Optional[Dict[str, Any]] = None  # IP / 域名查询缓存的命中、淘汰统计
 
 
 class NodeTarget(BaseModel):
@@ -153,7 +123,7 @@ class SourceRequest(BaseModel):
 
 class NodeHunter:
     def __init__(self):
-        self.nodes: List[dict] = []
+        self._nodes = NodeCollection()  # 带 host:port / 国家 / 协议 / 可用性索引
         self.is_scanning = False
         self.logs: List[str] = []
         self.subscription_base64: Optional[str] = None
@@ -162,30 +132,57 @@ class NodeHunter:
         self.user_sources = self._load_user_sources()
         self.sources = self._get_default_sources() + self.user_sources
         self.scheduler = AsyncIOScheduler()
+        # IP -> 国家代码（本地离线索引的查询结果，查不到的记为负缓存）
+        self.ip_country_cache = TTLCache(GEO_CACHE_MAX_SIZE, GEO_CACHE_TTL, GEO_CACHE_NEGATIVE_TTL)
         
         # 🔥 初始化持久化管理器
         self.persistence_helper = get_persistence()
         
         self._load_nodes_from_file()
 
-        self.source_stats: Dict[str, Dict] = {}
-        self.scan_cycle_count = 0
-        for src in self.sources:
-            self.source_stats[src] = {"is_disabled": False, "disabled_at": 0, "retry_fails": 0}
+        # 🔥 与 ChinaHunter 共用的抓取服务（同 URL 每周期只抓一次，源健康跨周期持久化）
+        self.fetch_service = SourceFetchService(self.link_scraper, log=self.add_log)
+        self.fetch_service.register_sources(self.sources)
+        self.source_stats: Dict[str, Dict] = self.fetch_service.source_stats
+        self.source_links: Dict[str, List[str]] = self.fetch_service.source_links
+        self.china_hunter = ChinaHunter(fetch_service=self.fetch_service)
+        # 上一代扫描结果，用于只把新增 / 配置变化的节点入队
+        self.scan_differ = ScanDiffer()
+        self._vanished_recheck_task: Optional[asyncio.Task] = None
+        self._vanished_pending: set = set()  # 复查进行中时新消失的节点，当前复查结束后接着处理
+        self.scan_cycle_count = 0  # 完整扫描（全部源）的次数，按源刷新不计入
+        self.source_contribution_log: deque = deque(maxlen=SOURCE_LOG_MAX_ENTRIES)
+        # 启动后的首次扫描（缓存加载或完整爬取）是否已完成；完成前不做按源刷新
+        self.initial_scan_done = False
 
         # 🔥 初始化真实速度测试和地理位置助手
         self.speed_tester = RealSpeedTester()
         self.geolocation_helper = GeolocationHelper()
         
         # 🔥 P3优化: 待检测节点队列系统 (分批处理大规模节点)
-        self.pending_nodes_queue: Dict[str, dict] = {}  # 待检测节点队列 {node_key: {node_data, retry_count, priority}}
+        self.pending_nodes_queue = PendingNodeQueue()  # 待检测节点队列 {node_key: {NodeRecord, retry_count, priority}}
         self.is_batch_testing = False  # 批量检测进行中标志
+        self._testing_keys: set = set()  # 本批正在检测的节点（不重复入队）
         self.last_batch_test_time = 0  # 上次批量检测时间
         self.batch_test_interval = 3600  # 1小时检测一次 (秒)
-        self.batch_size = 50   # 每次检测50个节点 (🔥 改小到50加快反馈速度，约3-4分钟完成一轮)
+        self.batch_size = 50   # 初始批大小，运行中由自适应并发控制器调整
         self.max_retries = 3  # 失败重试3次
+        # 检测失败的节点: host:port -> (已失败次数, 下次允许重试的时间)；有上限，长期不出现的条目自动过期
+        self.failed_nodes = TTLCache(100000, RETRY_BASE_DELAY * 2 ** (self.max_retries + 1))
         self.last_sync_time = 0  # 上次同步时间
         self.sync_interval = 3600  # 1小时同步一次 (秒)
+
+        # 流式合并：检测通过的节点立即并入 self.nodes，订阅和文件去抖刷新
+        self._artifact_refresh_task: Optional[asyncio.Task] = None
+
+        # 最近一批的 DNS 预解析 / 预过滤统计
+        self.last_dns_stats: Optional[Dict[str, Any]] = None
+        self.last_prefilter_stats: Optional[Dict[str, Any]] = None
+
+        # 🔥 自适应并发控制 (AIMD)：替代手工调低的固定并发/批大小
+        self.concurrency = AdaptiveConcurrencyController(
+            clash_concurrency=5, xray_concurrency=3, batch_size=self.batch_size
+        )
         
         # 🔥 新增：测速队列进度追踪（来自持久化）
         self.testing_queue_tasks: List[Dict] = []  # 测速任务队列
@@ -197,8 +194,11 @@ class NodeHunter:
 
     def start_scheduler(self):
         if not self.scheduler.running:
-            # 爬虫: 每6小时自动扫描一次
-            self.scheduler.add_job(self.scan_cycle, 'interval', minutes=360, id='node_scan_refresh')
+            # 爬虫: 每6小时扫描一次（到期的源 + CN 猎手）
+            self.scheduler.add_job(self._scheduled_scan, 'interval', minutes=360, id='node_scan_refresh')
+
+            # 🔥 按源自适应刷新: 每分钟检查一次，只抓取到期的源
+            self.scheduler.add_job(self._refresh_due_sources, 'interval', minutes=1, id='source_refresh')
             
             # 🔥 P3: 独立的批量检测定时任务 (每1小时执行一次，从队列取1000个节点检测)
             # initial_delay=65秒 确保爬虫完成后立即开始检测
@@ -240,7 +240,7 @@ class NodeHunter:
             )
             
             self.scheduler.start()
-            self.add_log("✅ [System] 节点猎手自动巡航已启动 (6h/爬虫, 1h/检测, 1h/同步, 3min/Supabase, 每日3:00清理缓存)", "SUCCESS")
+            self.add_log("✅ [System] 节点猎手自动巡航已启动 (6h/爬虫, 按源自适应刷新, 1h/检测, 1h/同步, 3min/Supabase, 每日3:00清理缓存)", "SUCCESS")
             
             # 🔥 改进：Persistence 初始化和爬虫启动都改为后台任务，不阻塞 FastAPI 启动
             async def init_persistence_background():
@@ -249,6 +249,7 @@ class NodeHunter:
                     await asyncio.sleep(2)  # 等待 FastAPI 完全启动（2秒）
                     await self.persistence_helper.init_persistence_tables()
                     self.add_log("✅ 持久化表初始化完成", "SUCCESS")
+                    await self._refresh_ip_geo_dataset()
                     
                     # 🔥 延长到 5 分钟后再启动爬虫，避免启动时 pending 问题
                     await asyncio.sleep(298)  # 5分钟 - 2秒 = 298秒
@@ -278,13 +279,38 @@ class NodeHunter:
             task = asyncio.create_task(init_persistence_background())
             task.add_done_callback(lambda t: logger.exception(t.exception()) if t.exception() else None)
 
+    async def shutdown(self):
+        """服务退出时释放常驻资源（调度器、抓取会话、mihomo 进程池、解析进程池、缓存、IP 国家索引和 DNS 解析器）"""
+        if self.scheduler.running:
+            self.scheduler.shutdown(wait=False)
+        self.fetch_service.save_health()
+        await self.link_scraper.close()
+        await close_mihomo_pool()
+        shutdown_parse_pool()
+        close_parse_cache()
+        close_ip_geo_index()
+        close_dns_resolver()
+
+    @property
+    def nodes(self) -> NodeCollection:
+        return self._nodes
+
+    @nodes.setter
+    def nodes(self, nodes):
+        # 兼容 self.nodes = [...] 的整体赋值写法，索引随之重建
+        self._nodes.replace_all(nodes)
+
+    def cache_stats(self) -> Dict[str, Dict]:
+        """IP / 域名查询缓存统计"""
+        return {"node_ip_country": self.ip_country_cache.stats(), **self.geolocation_helper.cache_stats()}
+
     def get_alive_nodes(self) -> List[Dict[str, Any]]:
-        return [node for node in self.nodes if node.get('alive')]
+        return self.nodes.alive()
 
     def get_socks5_nodes(self) -> List[Dict[str, Any]]:
         return [
-            node for node in self.nodes
-            if node.get('alive') and node.get('protocol') in ['socks5', 'socks']
+            node for node in self.nodes.alive()
+            if node.get('protocol') in ['socks5', 'socks']
         ]
 
     def _load_user_sources(self) -> List[str]:
@@ -562,83 +588,77 @@ class NodeHunter:
 
         self.user_sources.append(url)
         self.sources.append(url)
-        self.source_stats[url] = {"is_disabled": False, "disabled_at": 0, "retry_fails": 0}
+        self.fetch_service.stats_for(url)
         self._save_user_sources()
         self.add_log(f"➕ 添加新源: {url[:30]}...", "SUCCESS")
         return True, "添加成功"
 
-    async def _fetch_all_subscriptions(self) -> tuple:
+    async def _fetch_all_subscriptions(self, sources: Optional[List[str]] = None) -> tuple:
         """
-        返回: (所有节点链接列表, 源贡献字典)
+        返回: (去重后的节点链接列表, 链接 -> 来源订阅源 URL 字典, 成功抓取到内容的源集合)
+
+        各源的链接到达时即去重，同一链接出现在多个源时归属于先抓取完成的那个
+
+        Args:
+            sources: 只抓取这些源，None 表示全部源
         """
-        all_nodes = []
-        self.scan_cycle_count += 1
-        target_urls = []
-        for url in self.sources:
-            stats = self.source_stats.get(url, {"is_disabled": False, "disabled_at": 0, "retry_fails": 0})
-            if stats["is_disabled"]:
-                if (self.scan_cycle_count - stats["disabled_at"]) >= 10:
-                    stats["is_disabled"] = False
-                    stats["retry_fails"] = 0
-                    target_urls.append(url)
-                    self.add_log(f"🔄 源已解封: {url[:30]}...", "INFO")
-            else:
-                target_urls.append(url)
+        if sources is None:
+            self.scan_cycle_count += 1
+        target_urls = self.fetch_service.select_targets(self.sources if sources is None else sources)
 
         if not target_urls: 
-            return [], {}
+            return [], {}, set()
 
         # 用于追踪每个源的贡献 + 节点映射
         source_nodes_map = {}
         source_node_mapping = {}  # 新增：记录节点属于哪个源
+        # 链接到达时即跨源去重：链接 -> 首个提供它的源
+        dedup = LinkDeduplicator()
+        link_sources: Dict[str, str] = {}
 
         async def fetch_source(url):
-            try:
-                content = await self.link_scraper.scrape_links_from_url(url)
-                if content:
-                    source_name = url.replace("https://", "").replace("http://", "")[:40]
-                    self.add_log(f"✅ [{source_name}] 抓取 {len(content)} 个节点", "SUCCESS")
-                    if url in self.source_stats: self.source_stats[url]['retry_fails'] = 0
-                    source_nodes_map[url] = len(content)
-                    source_node_mapping[url] = content  # 保存节点-源映射
-                    return content
-                else:
-                    raise Exception("Empty")
-            except Exception as e:
-                source_name = url.replace("https://", "").replace("http://", "")[:40]
-                self.add_log(f"❌ [{source_name}] 抓取失败: {str(e)[:30]}", "WARNING")
-                if url in self.source_stats:
-                    stats = self.source_stats[url]
-                    stats['retry_fails'] += 1
-                    if stats['retry_fails'] >= 3:
-                        stats['is_disabled'] = True
-                        stats['disabled_at'] = self.scan_cycle_count
-                        self.add_log(f"🚫 [{source_name}] 已禁用(连续失败3次)", "WARNING")
-            return []
-
-        # 🔥 添加 Semaphore 限流，最多同时 10 个并发源请求，防止连接耗尽
-        semaphore = asyncio.Semaphore(10)
-        
-        async def fetch_source_with_limit(url):
-            async with semaphore:
-                return await fetch_source(url)
-        
-        tasks = [fetch_source_with_limit(src) for src in target_urls]
-        results = await asyncio.gather(*tasks)
-        for i, res in enumerate(results):
-            all_nodes.extend(res)
-        
+            source_name = url.replace("https://", "").replace("http://", "")[:40]
+            # 抓取服务负责并发限制、同 URL 合并、条件请求和源健康（连续失败禁用）
+            result = await self.fetch_service.fetch(url)
+            content = result.links
+            if result.status == FETCH_FAILED or not content:
+                self.add_log(f"❌ [{source_name}] 抓取失败: {'Empty' if result.status != FETCH_FAILED else 'All routes failed'}", "WARNING")
+                return
+            fresh = dedup.add(url, content)
+            for link in fresh:
+                link_sources[link] = url
+            if result.status == FETCH_OK:
+                self.add_log(f"✅ [{source_name}] 抓取 {len(content)} 个节点 (新增 {len(fresh)})", "SUCCESS")
+            else:
+                self.add_log(f"♻️ [{source_name}] 内容未变化，复用 {len(content)} 个节点 (新增 {len(fresh)})", "INFO")
+            source_nodes_map[url] = len(content)
+            source_node_mapping[url] = content  # 保存节点-源映射
+
+        await asyncio.gather(*[fetch_source(src) for src in target_urls])
+
+        # 各源贡献：新增 = 到达时此前未见过的链接，独占 = 本周期只有该源提供的链接
+        contribution = dedup.source_stats()
+        for url, contrib in contribution.items():
+            if url in self.source_stats:
+                self.source_stats[url]['unique_links'] = contrib['unique']
+                self.source_stats[url]['exclusive_links'] = contrib['exclusive']
+
         # 记录源统计总结
         total_from_sources = sum(source_nodes_map.values())
-        self.add_log(f"📊 本次爬虫周期: 从 {len(source_nodes_map)}/{len(target_urls)} 个源获取 {total_from_sources} 个节点", "INFO")
+        self.add_log(f"📊 本次爬虫周期: 从 {len(source_nodes_map)}/{len(target_urls)} 个源获取 {total_from_sources} 个节点, 去重后 {len(link_sources)} 个", "INFO")
+        redundant = dedup.redundant_sources()
+        if redundant:
+            names = ", ".join(url.replace("https://", "").replace("http://", "")[:30] for url, _ in redundant[:5])
+            self.add_log(f"🪞 {len(redundant)} 个源没有独占节点(均被其他源覆盖): {names}", "INFO")
         
-        # 保存源贡献日志
-        if not hasattr(self, 'source_contribution_log'):
-            self.source_contribution_log = []
+        # 保存源贡献日志（只保留最近 SOURCE_LOG_MAX_ENTRIES 条）
         self.source_contribution_log.append({
             'cycle': self.scan_cycle_count,
+            'partial': sources is not None,
             'timestamp': datetime.now().isoformat(),
             'sources': source_nodes_map,
+            'unique': {url: contrib['unique'] for url, contrib in contribution.items()},
+            'exclusive': {url: contrib['exclusive'] for url, contrib in contribution.items()},
             'total_nodes': total_from_sources
         })
         
@@ -649,13 +669,12 @@ class NodeHunter:
         except Exception as e:
             self.add_log(f"⚠️ 源缓存保存失败: {e}", "WARNING")
         
-        return list(set(all_nodes)), source_node_mapping
+        return list(link_sources), link_sources, set(source_nodes_map)
 
     async def _fetch_china_nodes(self) -> List[Dict]:
         nodes = []
         try:
-            from .china_hunter import ChinaHunter
-            hunter = ChinaHunter()
+            hunter = self.china_hunter
             self.add_log(f"🇨🇳 [CN猎手] 正在从 {len(hunter.sources)} 个源抓取...", "INFO")
             nodes = await hunter.fetch_all()
             if nodes:
@@ -665,41 +684,20 @@ class NodeHunter:
         return nodes
 
     def _get_country_code_from_ip(self, ip: str) -> str:
-        """通过IP地址查询国家代码（异步执行，使用缓存）"""
-        try:
-            # 首先检查缓存
-            if hasattr(self, 'ip_country_cache') and ip in self.ip_country_cache:
-                return self.ip_country_cache[ip]
-            
-            # 使用同步HTTP请求查询（3秒超时）
-            import httpx
-            import socket
-            
-            # 快速DNS检查：如果域名有国家代码线索，直接返回
-            try:
-                # 不做实际DNS查询，避免耗时
-                pass
-            except:
-                pass
-            
-            try:
-                response = httpx.get(f"https://ipapi.co/{ip}/json/", timeout=2)
-                if response.status_code == 200:
-                    data = response.json()
-                    country_code = data.get('country_code', 'UNK')
-                    if country_code and country_code != 'UNK':
-                        country_code = country_code.upper()
-                        # 缓存结果
-                        if not hasattr(self, 'ip_country_cache'):
-                            self.ip_country_cache = {}
-                        self.ip_country_cache[ip] = country_code
-                        return country_code
-            except Exception as e:
-                # 忽略错误，快速返回UNK
-                pass
-        except:
-            pass
-        return 'UNK'
+        """
+        通过IP地址查询国家代码（本地离线索引，不发网络请求，使用缓存）
+
+        供启动时同步加载节点使用；异步检测路径走 GeolocationHelper.detect_country_by_ip，
+        本地查不到时可按 IP_GEO_REMOTE_FALLBACK 使用在线服务兜底
+        """
+        if not ip:
+            return 'UNK'
+        cached = self.ip_country_cache.get(ip, MISSING)
+        if cached is not MISSING:
+            return cached or 'UNK'
+        country = lookup_country(ip)
+        self.ip_country_cache.set(ip, country)
+        return country or 'UNK'
 
     def _normalize_country(self, raw_country: str) -> str:
         if not raw_country: return 'UNK'
@@ -709,185 +707,149 @@ class NodeHunter:
         if len(upper_raw) == 2 and upper_raw.isalpha():
             return upper_raw
         
-        # 🔥 然后进行子串匹配（直接查找，不强制单词边界）
-        for name, code in NAME_TO_CODE.items():
-            if name in upper_raw or upper_raw in name:
-                return code
-        
-        return 'UNK'
+        # 🔥 然后按国家关键词表匹配（国名、城市、中文名称等）
+        return match_country(upper_raw) or 'UNK'
 
     def _guess_country_from_name(self, name: str) -> str:
         """从节点名称中猜测国家（备用，IP查询失败时使用）"""
-        if not name: return 'UNK'
-        upper_name = name.upper()
-        
-        # 🔥 扩展版本的国家关键词匹配表（包含城市、别名、中文等）
-        country_patterns = [
-            # 亚洲
-            ('CN', ['CN', 'CHINA', '中国', '回国', 'BEIJING', 'SHANGHAI', 'SHENZHEN', 'CHONGQING', 'HANGZHOU', 'WUHAN', 'CHENG', 'XIAN', 'SICHUAN', 'JIANGSU', 'GUANGDONG']),
-            ('HK', ['HK', 'HONG KONG', 'HONGKONG', '香港', 'HKG']),
-            ('TW', ['TW', 'TAIWAN', 'TAIPEI', '台湾', 'TPE']),
-            ('JP', ['JP', 'JAPAN', '日本', 'TOKYO', 'OSAKA', 'YOKOHAMA', 'KOBE', 'TYO', 'NRT', 'KIX']),
-            ('SG', ['SG', 'SINGAPORE', '新加坡', 'SIN']),
-            ('KR', ['KR', 'KOREA', '韩国', 'SEOUL', 'BUSAN', 'ICN', 'PUS']),
-            ('TH', ['TH', 'THAILAND', '泰国', 'BANGKOK', 'BKK']),
-            ('MY', ['MY', 'MALAYSIA', '马来西亚', 'KUALA LUMPUR', 'KUL']),
-            ('PH', ['PH', 'PHILIPPINES', '菲律宾', 'MANILA', 'MNL']),
-            ('VN', ['VN', 'VIETNAM', '越南', 'HANOI', 'HO CHI MINH', 'HAN', 'SGN']),
-            ('ID', ['ID', 'INDONESIA', '印尼', 'JAKARTA', 'CGK']),
-            ('IN', ['IN', 'INDIA', '印度', 'DELHI', 'BOMBAY', 'MUMBAI', 'BANGALORE', 'DEL', 'BOM']),
-            ('PK', ['PK', 'PAKISTAN', '巴基斯坦', 'ISLAMABAD', 'KARACHI']),
-            ('BD', ['BD', 'BANGLADESH', '孟加拉', 'DHAKA']),
-            ('LK', ['LK', 'SRI LANKA', '斯里兰卡', 'COLOMBO', 'CMB']),
-            # 中东
-            ('TR', ['TR', 'TURKEY', '土耳其', 'ISTANBUL', 'ANKARA', 'IST']),
-            ('AE', ['AE', 'UAE', 'UNITED ARAB EMIRATES', '阿联酋', 'DUBAI', 'ABU DHABI', 'DXB']),
-            ('SA', ['SA', 'SAUDI ARABIA', '沙特', 'RIYADH', 'JEDDAH', 'RUH']),
-            ('IL', ['IL', 'ISRAEL', '以色列', 'TEL AVIV', 'JERUSALEM', 'TLV']),
-            ('JO', ['JO', 'JORDAN', '约旦', 'AMMAN', 'AMM']),
-            # 欧洲
-            ('GB', ['GB', 'UK', 'UNITED KINGDOM', '英国', 'LONDON', 'MANCHESTER', 'EDINBURGH', 'LHR', 'LGW']),
-            ('DE', ['DE', 'GERMANY', '德国', 'FRANKFURT', 'BERLIN', 'MUNICH', 'HAMBURG', 'FRA', 'BER']),
-            ('FR', ['FR', 'FRANCE', '法国', 'PARIS', 'LYON', 'MARSEILLE', 'CDG', 'ORY']),
-            ('IT', ['IT', 'ITALY', '意大利', 'MILAN', 'ROME', 'VENICE', 'MXP', 'FCO']),
-            ('ES', ['ES', 'SPAIN', '西班牙', 'MADRID', 'BARCELONA', 'VALENCIA', 'MAD', 'BCN']),
-            ('NL', ['NL', 'NETHERLANDS', '荷兰', 'AMSTERDAM', 'ROTTERDAM', 'AMS']),
-            ('BE', ['BE', 'BELGIUM', '比利时', 'BRUSSELS', 'ANTWERP', 'BRU']),
-            ('PT', ['PT', 'PORTUGAL', '葡萄牙', 'LISBON', 'PORTO', 'LIS']),
-            ('PL', ['PL', 'POLAND', '波兰', 'WARSAW', 'KRAKOW', 'WAW']),
-            ('SE', ['SE', 'SWEDEN', '瑞典', 'STOCKHOLM', 'STOCKHOLM', 'ARN']),
-            ('NO', ['NO', 'NORWAY', '挪威', 'OSLO', 'OSLO', 'OSL']),
-            ('DK', ['DK', 'DENMARK', '丹麦', 'COPENHAGEN', 'CPH']),
-            ('FI', ['FI', 'FINLAND', '芬兰', 'HELSINKI', 'HEL']),
-            ('CH', ['CH', 'SWITZERLAND', '瑞士', 'ZURICH', 'GENEVA', 'ZRH']),
-            ('AT', ['AT', 'AUSTRIA', '奥地利', 'VIENNA', 'VIENNA', 'VIE']),
-            ('CZ', ['CZ', 'CZECH', 'CZECHOSLOVAKIA', '捷克', 'PRAGUE', 'PRG']),
-            ('HU', ['HU', 'HUNGARY', '匈牙利', 'BUDAPEST', 'BUD']),
-            ('RO', ['RO', 'ROMANIA', '罗马尼亚', 'BUCHAREST', 'BUH']),
-            ('GR', ['GR', 'GREECE', '希腊', 'ATHENS', 'THESSALONIKI', 'ATH']),
-            ('RU', ['RU', 'RUSSIA', '俄罗斯', 'MOSCOW', 'ST PETERSBURG', 'VLADIVOSTOK', 'SVO', 'LED']),
-            ('UA', ['UA', 'UKRAINE', '乌克兰', 'KYIV', 'KHARKIV', 'KBP']),
-            ('BG', ['BG', 'BULGARIA', '保加利亚', 'SOFIA', 'SOF']),
-            # 北美
-            ('US', ['US', 'USA', 'AMERICA', 'UNITED STATES', '美国', 'NEW YORK', 'LOS ANGELES', 'CHICAGO', 'DALLAS', 'SEATTLE', 'MIAMI', 'DENVER', 'SFO', 'LAX', 'JFK', 'ORD', 'DFW']),
-            ('CA', ['CA', 'CANADA', '加拿大', 'TORONTO', 'VANCOUVER', 'MONTREAL', 'CALGARY', 'YYZ', 'YVR']),
-            ('MX', ['MX', 'MEXICO', '墨西哥', 'MEXICO CITY', 'MEX']),
-            # 南美
-            ('BR', ['BR', 'BRAZIL', '巴西', 'SAO PAULO', 'RIO DE JANEIRO', 'GIG', 'GRU']),
-            ('AR', ['AR', 'ARGENTINA', '阿根廷', 'BUENOS AIRES', 'AEP']),
-            ('CL', ['CL', 'CHILE', '智利', 'SANTIAGO', 'SCL']),
-            ('CO', ['CO', 'COLOMBIA', '哥伦比亚', 'BOGOTA', 'BOG']),
-            ('PE', ['PE', 'PERU', '秘鲁', 'LIMA', 'LIM']),
-            ('VE', ['VE', 'VENEZUELA', '委内瑞拉', 'CARACAS', 'CCS']),
-            # 大洋洲
-            ('AU', ['AU', 'AUSTRALIA', '澳洲', 'SYDNEY', 'MELBOURNE', 'BRISBANE', 'SYD', 'MEL']),
-            ('NZ', ['NZ', 'NEW ZEALAND', '新西兰', 'AUCKLAND', 'WELLINGTON', 'AKL']),
-            # 非洲
-            ('ZA', ['ZA', 'SOUTH AFRICA', '南非', 'JOHANNESBURG', 'CAPE TOWN', 'JNB']),
-            ('EG', ['EG', 'EGYPT', '埃及', 'CAIRO', 'ALEXANDRIA', 'CAI']),
-            ('NG', ['NG', 'NIGERIA', '尼日利亚', 'LAGOS', 'LOS']),
-        ]
-        
-        # 🔥 改进的匹配逻辑：不要求单词边界，只要匹配就行
-        for country, keywords in country_patterns:
-            for keyword in keywords:
-                if keyword in upper_name:
-                    return country
-        
-        # 最后备用：直接检查是否包含 2 字母国家代码（如 TR、IT 等）
-        if len(upper_name) >= 2:
-            # 从后往前扫，寻找类似 (TR)、-TR-、TR: 的模式
-            import re
-            codes_match = re.findall(r'[(\-\s]([A-Z]{2})[\)\-\s\:]', f'-{upper_name}-')
-            if codes_match:
-                potential_code = codes_match[0]
-                # 检查这是否是有效的国家代码
-                for name, code in NAME_TO_CODE.items():
-                    if code == potential_code:
-                        return potential_code
-        
-        # 默认返回未知
-        return 'UNK'
+        return match_country(name) or 'UNK'
 
-    async def scan_cycle(self):
+    async def _scheduled_scan(self):
+        """6 小时定时扫描：CN 猎手 + 已到期的订阅源（未到期的源不抓取），并合并刷新已解析节点缓存"""
+        await self.scan_cycle(
+            sources=self.fetch_service.scheduler.due_sources(self.sources), save_cache=True
+        )
+
+    async def _refresh_due_sources(self):
+        """每分钟检查：只抓取已到期的订阅源（首次完整扫描完成前不执行）"""
+        if self.is_scanning or not self.initial_scan_done:
+            return
+        due = self.fetch_service.scheduler.due_sources(self.sources)
+        if due:
+            await self.scan_cycle(sources=due, include_china=False)
+
+    async def scan_cycle(self, sources: Optional[List[str]] = None, include_china: bool = True,
+                         save_cache: bool = False):
         """
         🔥 P3优化: 爬虫改为仅负责爬取和入队，不进行检测
         新节点入队到待检测队列，由独立的批量检测任务处理
         优先从缓存加载，避免重复扫描
+
+        Args:
+            sources: 只抓取这些订阅源（按源刷新）；None 表示全部源
+            include_china: 是否同时运行 CN 猎手
+            save_cache: 按源刷新时也把本次结果合并进已解析节点缓存（完整扫描总是覆盖保存）
         """
         if self.is_scanning: 
             self.add_log("⚠️ 爬虫已在运行中，跳过本次执行", "WARNING")
             return
         
         self.is_scanning = True
+        partial = sources is not None
         
-        # 🔥 优先尝试从缓存加载已解析的节点，避免重复扫描
+        # 🔥 优先尝试从缓存加载已解析的节点，避免重复扫描（按源刷新时不走缓存）
         try:
-            cached_nodes = await self.persistence_helper.load_parsed_nodes()
+            cached_nodes = None if partial else await self.persistence_helper.load_parsed_nodes()
             if cached_nodes and len(cached_nodes) > 1000:  # 如果缓存有足够的节点（>1000）
                 self.add_log(f"✅ 从缓存加载 {len(cached_nodes)} 个已解析节点，跳过爬虫扫描", "SUCCESS")
-                new_added = self._add_nodes_to_queue(cached_nodes)
+                # 缓存不代表本次抓取结果，只入队新增 / 配置变化的节点，不判断消失
+                diff = self.scan_differ.diff(cached_nodes)
+                new_added = self._add_nodes_to_queue(diff.new) + self._add_nodes_to_queue(diff.changed, requeue=True)
                 self.add_log(
                     f"📥 缓存加载模式: {new_added} 个新节点已入队，"
                     f"当前队列待检测: {len(self.pending_nodes_queue)} 个",
                     "SUCCESS"
                 )
+                self.initial_scan_done = True
                 self.is_scanning = False
                 return  # 不再执行爬虫，直接返回
         except Exception as e:
             self.add_log(f"⚠️ 缓存加载失败: {e}，改用爬虫扫描", "WARNING")
         
         # 缓存无效或加载失败，进行完整扫描
-        self.add_log("🚀 开始全网节点爬虫（仅爬取，不检测）...", "INFO")
+        if partial:
+            self.add_log(f"🔁 按计划刷新 {len(sources)} 个到期源（仅爬取，不检测）...", "INFO")
+        else:
+            self.add_log("🚀 开始全网节点爬虫（仅爬取，不检测）...", "INFO")
         
         try:
-            # 🔥 仅执行爬取，不进行检测
-            fetch_task = asyncio.create_task(self._fetch_all_subscriptions())
-            china_task = asyncio.create_task(self._fetch_china_nodes())
+            # 🔥 仅执行爬取，不进行检测（两边共用抓取服务，重叠的源只下载一次）
+            self.fetch_service.new_cycle(
+                text_urls=self.china_hunter.sources if include_china else (), full=include_china
+            )
+            fetch_task = asyncio.create_task(self._fetch_all_subscriptions(sources))
+            china_task = asyncio.create_task(self._fetch_china_nodes()) if include_china else None
             
             # 并行获取结果
-            result = await fetch_task
-            cn_nodes = await china_task
-            
-            # 处理返回的节点链接和源映射
-            if isinstance(result, tuple):
-                raw_nodes, source_node_mapping = result
-            else:
-                raw_nodes = result
-                source_node_mapping = {}
+            try:
+                result = await fetch_task
+                cn_nodes = await china_task if china_task else []
+            finally:
+                self.fetch_service.end_cycle()
+            self._log_fetch_traffic()
             
-            parsed_nodes = [parse_node_url(url) for url in raw_nodes]
-            valid_parsed_nodes = [n for n in parsed_nodes if n]
+            # 处理返回的节点链接、链接->源 映射和成功抓取的源
+            raw_nodes, link_sources, fetched_sources = result
             
-            # 🔥 新增：为节点标记源信息
-            for node in valid_parsed_nodes:
-                node_link = node.get('share_link', '')
-                for source_url, node_links in source_node_mapping.items():
-                    if node_link in node_links:
-                        node['source_url'] = source_url
-                        break
+            # 🔥 在进程池中批量解析，不阻塞事件循环
+            parsed_nodes, parse_stats = await parse_many_async(raw_nodes)
+            self.add_log(
+                f"🧩 链接解析: {parse_stats['parsed']}/{parse_stats['total']} 成功 "
+                f"(缓存命中 {parse_stats['cache_hits']})"
+                + (f"，失败分布 {parse_stats['errors']}" if parse_stats['failed'] else ""),
+                "INFO"
+            )
+
+            # 标记源信息（按原始链接 O(1) 查找）
+            valid_parsed_nodes = []
+            for url, node in zip(raw_nodes, parsed_nodes):
+                if not node:
+                    continue
+                source_url = link_sources.get(url)
+                if source_url:
+                    node['source_url'] = source_url
+                valid_parsed_nodes.append(node)
 
             all_nodes = cn_nodes + valid_parsed_nodes
 
             unique_nodes = list({f"{n['host']}:{n['port']}": n for n in all_nodes if n}.values())
             self.add_log(f"🔍 爬虫解析成功 {len(unique_nodes)} 个唯一节点", "INFO")
             
-            # � 保存已解析节点缓存到Supabase
-            try:
-                await self.persistence_helper.save_parsed_nodes(unique_nodes)
-                self.add_log(f"💾 已解析节点缓存已保存到Supabase ({len(unique_nodes)} 个)", "SUCCESS")
-            except Exception as e:
-                self.add_log(f"⚠️ 节点缓存保存失败: {e}", "WARNING")
+            scope = set(fetched_sources)
+            if cn_nodes:
+                scope.add("")  # CN 猎手的节点没有 source_url
+
+            # � 保存已解析节点缓存到Supabase（按源刷新只有部分节点，合并进原缓存而不是覆盖）
+            if not partial or save_cache:
+                try:
+                    cache_nodes = unique_nodes if not partial else await self._merge_parsed_cache(unique_nodes, scope)
+                    await self.persistence_helper.save_parsed_nodes(cache_nodes)
+                    self.add_log(f"💾 已解析节点缓存已保存到Supabase ({len(cache_nodes)} 个)", "SUCCESS")
+                except Exception as e:
+                    self.add_log(f"⚠️ 节点缓存保存失败: {e}", "WARNING")
             
+            # 🧮 与上一代扫描对比：只入队新增 / 配置变化的节点，消失的节点做存活复查
+            diff = self.scan_differ.diff(unique_nodes, scope)
+            self.add_log(
+                f"🧮 扫描差异: 新增 {len(diff.new)}, 配置变化 {len(diff.changed)}, "
+                f"未变化 {len(diff.unchanged)}, 消失 {len(diff.vanished)}",
+                "INFO"
+            )
+            if diff.vanished:
+                self._schedule_vanished_recheck(diff.vanished)
+
             # �🔥 P3: 将新节点入队而不是直接检测
-            new_added = self._add_nodes_to_queue(unique_nodes)
+            new_added = self._add_nodes_to_queue(diff.new) + self._add_nodes_to_queue(diff.changed, requeue=True)
+            retried = self._requeue_failed(diff.unchanged)
             
             self.add_log(
-                f"📥 P3优化: {new_added} 个新节点已入队，"
+                f"📥 P3优化: {new_added} 个新节点已入队，{retried} 个失败节点到期重试，"
                 f"当前队列待检测: {len(self.pending_nodes_queue)} 个，"
                 f"将由批量检测任务逐步处理",
                 "SUCCESS"
             )
+            if not partial:
+                self.initial_scan_done = True
 
         except Exception as e:
             self.add_log(f"💥 爬虫错误: {e}", "ERROR")
@@ -895,46 +857,171 @@ class NodeHunter:
         finally:
             self.is_scanning = False
     
-    def _add_nodes_to_queue(self, nodes: List[Dict]) -> int:
+    def _schedule_vanished_recheck(self, keys: List[str]):
+        """登记待复查的消失节点；已有复查在运行时只合并进待处理集合，不并发启动第二个"""
+        self._vanished_pending.update(keys)
+        task = self._vanished_recheck_task
+        if task is None or task.done():
+            self._vanished_recheck_task = asyncio.create_task(self._drain_vanished_rechecks())
+
+    async def _drain_vanished_rechecks(self):
+        while self._vanished_pending:
+            keys = list(self._vanished_pending)
+            self._vanished_pending.clear()
+            await self._recheck_vanished_nodes(keys)
+
+    async def _merge_parsed_cache(self, nodes: List[Dict], scope: set) -> List[Dict]:
+        """按源刷新的结果合并进已解析节点缓存：本次抓取到的源整体替换，其余源保留原缓存"""
+        merged = {
+            f"{n.get('host')}:{n.get('port')}": n
+            for n in (await self.persistence_helper.load_parsed_nodes() or [])
+            if (n.get('source_url') or "") not in scope
+        }
+        merged.update((f"{n.get('host')}:{n.get('port')}", n) for n in nodes)
+        return list(merged.values())
+
+    async def _recheck_vanished_nodes(self, keys: List[str]):
+        """
+        源里消失的已验证节点做一次 TCP/TLS 存活复查（比内核检测便宜得多）
+
+        复查不通过的从节点列表移除，通过的保留到下次定时快速重验
+        """
+        nodes = [n.copy() for n in (self.nodes.get_by_key(k) for k in keys) if n and n.get('alive')]
+        if not nodes:
+            return
+        try:
+            # 域名已不存在的直接判为失联，其余再做 TCP/TLS 探测
+            candidates = (await self._pre_resolve_nodes(nodes))[0] if DNS_PRERESOLVE_ENABLED else nodes
+            survivors, stats = await self._prefilter(candidates)
+        except Exception as e:
+            self.add_log(f"⚠️ 消失节点复查异常: {e}", "WARNING")
+            return
+        alive_keys = {f"{n.get('host')}:{n.get('port')}" for n in survivors}
+        removed = 0
+        for node in nodes:
+            key = f"{node.get('host')}:{node.get('port')}"
+            if key not in alive_keys and self.nodes.remove(key) is not None:
+                removed += 1
+        self.add_log(f"👻 消失节点复查: {len(nodes)} 个已验证节点中 {removed} 个已失联并移除", "INFO")
+        if removed:
+            self._schedule_artifact_refresh()
+
+    async def _pre_resolve_nodes(self, nodes: List[Dict]):
+        """
+        批量 DNS 预解析：NXDOMAIN 的节点被淘汰，其余节点带上 resolved_ips
+
+        解析结果同时交给 GeolocationHelper，按域名识别国家时不再重复解析。
+        返回 (保留的节点, 统计信息)，由调用方决定是否记录统计
+        """
+        survivors, stats = await pre_resolve_nodes(nodes)
+        for node in survivors:
+            resolved_ips = node.get('resolved_ips')
+            if resolved_ips and resolved_ips[0] != node.get('host'):
+                self.geolocation_helper.remember_resolution(node['host'], resolved_ips[0])
+        return survivors, stats
+
+    async def _prefilter(self, nodes: List[Dict]):
+        """TCP/TLS 预过滤（默认按端点分组，每个端点只探测一次）"""
+        if ENDPOINT_GROUPING_ENABLED:
+            return await prefilter_endpoint_groups(nodes, PREFILTER_MAX_CONCURRENT, PREFILTER_TIMEOUT)
+        return await prefilter_nodes(nodes, PREFILTER_MAX_CONCURRENT, PREFILTER_TIMEOUT)
+
+    def _log_fetch_traffic(self):
+        """本周期抓取流量统计（共享抓取、条件请求节省）"""
+        traffic = self.fetch_service.traffic
+        skipped_sources = traffic["not_modified"] + traffic["unchanged"]
+        self.add_log(
+            f"🌐 本周期抓取 {traffic['fetched']} 个源 (与 CN 猎手共享 {traffic['shared']} 次), "
+            f"下载 {traffic['wire_bytes'] / 1024:.0f}KB"
+            + (f", 内容未变化 {skipped_sources} 个源 (304: {traffic['not_modified']}, "
+               f"哈希相同: {traffic['unchanged']}), 节省 {traffic['saved_bytes'] / 1024:.0f}KB"
+               if skipped_sources else ""),
+            "INFO"
+        )
+
+    def _add_nodes_to_queue(self, nodes: List[Dict], requeue: bool = False,
+                            priority: Optional[int] = None) -> int:
         """
         将节点添加到待检测队列
         智能优先级: 新节点(优先) > 失败节点(重试) > 待重验 > 已检测
+
+        Args:
+            requeue: 节点配置已变化，替换队列中的旧配置并按新节点优先检测
+            priority: 指定入队优先级（默认按是否已检测过自动判断）
         """
         added_count = 0
         
+        # 添加国家信息（缺失的节点整批识别一次）
+        missing = [node for node in nodes if not node.get('country')]
+        for node, country in zip(missing, match_countries(n.get('name', '') for n in missing)):
+            node['country'] = country or 'UNK'
+        
         for node in nodes:
             node_key = f"{node.get('host')}:{node.get('port')}"
             
+            if requeue:
+                self.pending_nodes_queue.remove(node_key)
             # 如果已经在队列中，跳过
-            if node_key in self.pending_nodes_queue:
+            elif node_key in self.pending_nodes_queue:
                 continue
             
             # 如果已经在已检测列表中，降低优先级
-            existing = next((n for n in self.nodes if f"{n.get('host')}:{n.get('port')}" == node_key), None)
+            existing = self.nodes.get_by_key(node_key)
             
-            if existing:
-                priority = 2  # 待重验：已检测过的节点
+            if priority is not None:
+                node_priority = priority
+            elif existing and not requeue:
+                node_priority = PRIORITY_REVALIDATE  # 待重验：已检测过的节点
             else:
-                priority = 0  # 新节点：最高优先级
-            
-            # 添加国家信息
-            if not node.get('country'):
-                country = self.geolocation_helper.detect_country_by_name(node.get('name', ''))
-                if not country:
-                    country = 'UNK'
-                node['country'] = country
+                node_priority = PRIORITY_NEW  # 新节点：最高优先级
             
-            # 入队
-            self.pending_nodes_queue[node_key] = {
-                'node': node,
-                'retry_count': 0,
-                'priority': priority,
-                'added_time': time.time()
-            }
-            added_count += 1
+            # 入队（以紧凑的 NodeRecord 常驻队列，出队时再转回字典）
+            if self.pending_nodes_queue.push(node_key, NodeRecord.from_dict(node), node_priority):
+                added_count += 1
         
         return added_count
     
+    def _requeue_failed(self, nodes: List[Dict]) -> int:
+        """
+        配置未变化、上次检测失败的节点按指数退避重新入队
+
+        只有退避时间已到、失败次数未超过 max_retries、且不在队列 / 检测中的节点才入队，
+        每次扫描最多 RETRY_MAX_PER_SCAN 个，避免大量失效节点挤占待重验节点
+        """
+        now = time.time()
+        retry, retry_counts = [], []
+        for node in nodes:
+            if len(retry) >= RETRY_MAX_PER_SCAN:
+                break
+            key = f"{node.get('host')}:{node.get('port')}"
+            failure = self.failed_nodes.get(key)
+            if failure is None or failure[0] > self.max_retries or failure[1] > now:
+                continue
+            if key in self.pending_nodes_queue or key in self._testing_keys:
+                continue
+            retry.append(node)
+            retry_counts.append((key, failure[0]))
+        if not retry:
+            return 0
+        added = self._add_nodes_to_queue(retry, priority=PRIORITY_RETRY)
+        for key, count in retry_counts:
+            entry = self.pending_nodes_queue.get(key)
+            if entry is not None:
+                entry['retry_count'] = count
+        return added
+
+    def _record_test_outcomes(self, nodes: List[Dict]):
+        """记录本批检测结果：通过的清除失败记录，失败的累计次数并计算下次重试时间"""
+        now = time.time()
+        for node in nodes:
+            key = f"{node.get('host')}:{node.get('port')}"
+            if node.get('alive'):
+                self.failed_nodes.pop(key)
+                continue
+            failure = self.failed_nodes.get(key)
+            count = (failure[0] if failure else 0) + 1
+            self.failed_nodes.set(key, (count, now + RETRY_BASE_DELAY * 2 ** (count - 1)))
+
     async def _batch_test_pending_nodes(self):
         """
         🔥 P3: 独立的批量检测任务 (每1小时执行一次)
@@ -950,10 +1037,12 @@ class NodeHunter:
         
         self.is_batch_testing = True
         start_time = time.time()
+        nodes_to_test = []
         
         try:
             # 从队列取出待检测节点（按优先级排序）
-            nodes_to_test = self._pop_nodes_from_queue(self.batch_size)
+            nodes_to_test = self._pop_nodes_from_queue(self.concurrency.batch_size)
+            self._testing_keys = {f"{n.get('host')}:{n.get('port')}" for n in nodes_to_test}
             
             if not nodes_to_test:
                 self.add_log("📭 无可用的待检测节点", "DEBUG")
@@ -969,7 +1058,8 @@ class NodeHunter:
                 "INFO"
             )
             self.add_log(
-                f"   队列剩余: {len(self.pending_nodes_queue)} 个节点待处理",
+                f"   队列剩余: {len(self.pending_nodes_queue)} 个节点待处理 "
+                f"{self.pending_nodes_queue.priority_counts()}",
                 "INFO"
             )
             self.add_log(
@@ -986,6 +1076,8 @@ class NodeHunter:
             )
             
             # 执行检测
+            self.last_dns_stats = None
+            self.last_prefilter_stats = None
             await self._test_nodes_with_new_system(nodes_to_test)
             
             # 计算统计
@@ -994,6 +1086,16 @@ class NodeHunter:
             
             # 🔥 新增：源级别成功率分析
             source_success = self._analyze_source_success(nodes_to_test)
+
+            # 根据本轮探测信号调整并发窗口
+            decision = self.concurrency.end_round()
+            window = self.concurrency.snapshot()
+            self.add_log(
+                f"🎚️ 并发窗口{'↓' if decision['action'] == 'decrease' else '↑'} "
+                f"Clash:{window['clash_concurrency']} Xray:{window['xray_concurrency']} 批大小:{window['batch_size']}"
+                + (f" ({', '.join(decision['reasons'])})" if decision['reasons'] else ""),
+                "INFO"
+            )
             
             self.add_log(
                 f"═══════════════════════════════════════════════════════════",
@@ -1011,6 +1113,22 @@ class NodeHunter:
                 f"   队列剩余: {len(self.pending_nodes_queue)}个节点待处理",
                 "SUCCESS"
             )
+            if self.last_dns_stats:
+                dns = self.last_dns_stats
+                self.add_log(
+                    f"   DNS预解析: {dns['hosts']} 个主机名 (缓存 {dns['cached']}) | "
+                    f"淘汰 NXDOMAIN {dns['nxdomain']} 个节点",
+                    "SUCCESS"
+                )
+            if self.last_prefilter_stats:
+                prefilter = self.last_prefilter_stats
+                self.add_log(
+                    f"   预过滤: 通过 {prefilter['passed']} / 淘汰 {prefilter['total'] - prefilter['passed']} "
+                    f"(TCP {prefilter['tcp_failed']} | TLS {prefilter['tls_failed']})"
+                    + (f" | 端点 {prefilter['endpoints']} 个，省去 {prefilter['probes_saved']} 次探测"
+                       if 'endpoints' in prefilter else ""),
+                    "SUCCESS"
+                )
             
             # 显示源级别成功率 Top 5
             if source_success:
@@ -1034,7 +1152,9 @@ class NodeHunter:
             self.add_log(f"❌ 批量检测异常: {e}", "ERROR")
             logger.exception("批量检测异常")
         finally:
+            self._record_test_outcomes(nodes_to_test)
             self.is_batch_testing = False
+            self._testing_keys = set()
     
     def _analyze_source_success(self, nodes_to_test: List[Dict]) -> List[tuple]:
         """
@@ -1085,7 +1205,7 @@ class NodeHunter:
         success_rate = available / len(nodes_to_test) * 100 if nodes_to_test else 0
         
         # 获取当前可用节点的国家分布
-        alive_nodes = [n for n in self.nodes if n.get('alive')]
+        alive_nodes = self.nodes.alive()
         if alive_nodes:
             countries = set(n.get('country', 'UNK') for n in alive_nodes)
         else:
@@ -1145,35 +1265,14 @@ class NodeHunter:
         从队列按优先级取出节点
         优先级: 新节点(0) > 失败待重试(1) > 待重验(2) > 已检测(3)
         """
-        if not self.pending_nodes_queue:
-            return []
-        
-        # 按优先级排序
-        sorted_items = sorted(
-            self.pending_nodes_queue.items(),
-            key=lambda x: (x[1]['priority'], x[1]['added_time'])
-        )
-        
-        # 取出前 count 个
-        popped_nodes = []
-        keys_to_remove = []
-        
-        for node_key, node_info in sorted_items[:count]:
-            popped_nodes.append(node_info['node'])
-            keys_to_remove.append(node_key)
-        
-        # 从队列删除已取出的节点
-        for key in keys_to_remove:
-            del self.pending_nodes_queue[key]
-        
-        return popped_nodes
+        return [record.to_dict() for record in self.pending_nodes_queue.pop(count)]
     
     async def _sync_nodes_to_storage(self):
         """
         🔥 P3: 独立的同步任务 (每1小时执行一次)
         将可用节点同步到 viper-node-store
         """
-        alive_nodes = [n for n in self.nodes if n.get('alive')]
+        alive_nodes = self.nodes.alive()
         
         if not alive_nodes:
             self.add_log("📭 无可用节点，跳过同步", "DEBUG")
@@ -1275,11 +1374,11 @@ class NodeHunter:
         """高级双地区测速的异步包装器，独立运行不阻塞主流程"""
         try:
             self.add_log("🌍 开始执行高级双地区测速...", "INFO")
-            tested_nodes = await run_advanced_speed_test(self.nodes)
+            tested_nodes = await run_advanced_speed_test(self.nodes.copy())
             self.nodes = tested_nodes
             
             # 高级测速完成后再次上传更新结果
-            alive_nodes = [n for n in self.nodes if n.get('alive')]
+            alive_nodes = self.nodes.alive()
             if alive_nodes:
                 self.add_log(f"📤 高级测速完成，上传更新结果到 viper-node-store ({len(alive_nodes)} 个节点)...", "INFO")
                 success = await upload_to_supabase(alive_nodes)
@@ -1303,7 +1402,7 @@ class NodeHunter:
         5. 网络故障时自动降级（使用内存缓存）
         """
         try:
-            alive_nodes = [n for n in self.nodes if n.get('alive')]
+            alive_nodes = self.nodes.alive()
             
             if not alive_nodes:
                 self.add_log("📭 无活跃节点，跳过 Supabase 同步", "DEBUG")
@@ -1353,12 +1452,19 @@ class NodeHunter:
             logger.exception("Supabase 同步异常")
             # 异常时也保存到内存缓存，确保数据不丢失
             try:
-                alive_nodes = [n for n in self.nodes if n.get('alive')]
+                alive_nodes = self.nodes.alive()
                 if alive_nodes:
                     await self.persistence_helper.save_parsed_nodes(alive_nodes)
             except:
                 pass
 
+    async def _refresh_ip_geo_dataset(self):
+        """IP 国家数据缺失或过期时下载并重建索引（失败时继续使用现有数据）"""
+        if await ensure_ip_geo_dataset():
+            self.ip_country_cache.clear()
+            self.geolocation_helper.ip_cache.clear()
+            self.add_log("🌍 IP 国家数据已更新", "SUCCESS")
+
     async def _cleanup_expired_cache_task(self):
         """
         🔥 新增：定期清理过期缓存 - 每日凌晨 3 点执行
@@ -1367,7 +1473,9 @@ class NodeHunter:
         1. 删除 7 天前的已完成任务
         2. 删除过期的源缓存 (> 24小时)
         3. 删除过期的节点缓存 (> 6小时)
+        4. 更新过期的 IP 国家数据
         """
+        await self._refresh_ip_geo_dataset()
         try:
             self.add_log("🧹 开始清理过期缓存...", "INFO")
             success = await self.persistence_helper.cleanup_expired_cache()
@@ -1417,28 +1525,32 @@ class NodeHunter:
         
         self.add_log(f"🧪 [新系统] 开始可用性检测 {len(nodes_to_test)} 个节点...", "INFO")
 
+        # 第0层：批量 DNS 预解析 - 域名已失效的节点不再进入后续各层
+        if DNS_PRERESOLVE_ENABLED and nodes_to_test:
+            nodes_to_test, dns_stats = await self._pre_resolve_nodes(nodes_to_test)
+            self.last_dns_stats = dns_stats
+            self.add_log(
+                f"🧭 [DNS预解析] {dns_stats['hosts']} 个主机名 (缓存命中 {dns_stats['cached']}) → "
+                f"淘汰 NXDOMAIN {dns_stats['nxdomain']} 个节点 | 临时失败 {dns_stats['failed']} | "
+                f"耗时 {dns_stats['elapsed']:.1f}s",
+                "INFO"
+            )
+
         # 🔥 为节点添加国家信息 - 使用本地名称检测+异步域名检测（无重要网络延迟）
-        for node in nodes_to_test:
-            if not node.get('country'):
-                # 优先用名称识别（最快，本地操作，90%+准确）
-                country = self.geolocation_helper.detect_country_by_name(
-                    node.get('name', '')
-                )
-                
-                # 再用域名识别（次快，异步）
-                if not country:
-                    try:
-                        country = await self.geolocation_helper.detect_country_by_domain(
-                            node.get('domain', '')
-                        )
-                    except:
-                        country = None
-                
-                # 最后使用备选值
-                if not country:
-                    country = 'UNK'
-                
-                node['country'] = country
+        # 优先用名称识别（最快，本地操作，整批一次完成）
+        missing = [node for node in nodes_to_test if not node.get('country')]
+        for node, country in zip(missing, match_countries(n.get('name', '') for n in missing)):
+            # 再用域名识别（次快，异步）
+            if not country:
+                try:
+                    country = await self.geolocation_helper.detect_country_by_domain(
+                        node.get('domain') or node.get('host', '')
+                    )
+                except:
+                    country = None
+            
+            # 最后使用备选值
+            node['country'] = country or 'UNK'
 
         cloud_results = []
 
@@ -1477,6 +1589,24 @@ class NodeHunter:
             except Exception as e:
                 self.add_log(f"❌ [云端] 云端检测异常 {e}，跳过预过滤，全量进行本地检测", "WARNING")
 
+        # 第1.5层：TCP/TLS 预过滤 - 只有存活者才启动内核检测
+        core_candidates = nodes_to_test
+        if PREFILTER_ENABLED and nodes_to_test:
+            core_candidates, prefilter_stats = await self._prefilter(nodes_to_test)
+            self.last_prefilter_stats = prefilter_stats
+            self.add_log(
+                f"🚪 [预过滤] {prefilter_stats['total']} → {prefilter_stats['passed']} 个节点进入内核检测 "
+                f"(TCP失败 {prefilter_stats['tcp_failed']} | TLS失败 {prefilter_stats['tls_failed']} | "
+                f"耗时 {prefilter_stats['elapsed']:.1f}s)",
+                "INFO"
+            )
+            if 'endpoints' in prefilter_stats:
+                self.add_log(
+                    f"🔗 [端点分组] {prefilter_stats['total']} 个节点归并为 {prefilter_stats['endpoints']} 个端点，"
+                    f"省去 {prefilter_stats['probes_saved']} 次探测",
+                    "INFO"
+                )
+
         # 第2层：分离两条检测路线 (Clash vs Xray)
         # 🔥 修复：正确分离节点，避免重复检测或遗漏
         
@@ -1491,7 +1621,7 @@ class NodeHunter:
         xray_nodes_for_test = []   # 仅用Xray检测
         both_protocol_nodes = {}   # 协议同时支持Clash和Xray的节点
         
-        for node in nodes_to_test:
+        for node in core_candidates:
             protocol = node.get('protocol', '').lower()
             
             clash_support = protocol in clash_compatible_protocols
@@ -1522,8 +1652,21 @@ class NodeHunter:
             self.add_log(f"📊 执行 Clash 内核节点检测 ({len(clash_nodes_for_test)} 个)...", "INFO")
             try:
                 only_clash_nodes = [cn for _, cn in clash_nodes_for_test]
-                # 🔥 修复：降低并发数从20→5，避免Clash检测器过载导致502
-                clash_results = await check_nodes_clash(only_clash_nodes, max_concurrent=5)
+
+                def on_clash_result(idx: int, result: ClashCheckResult):
+                    # 🔥 流式合并：检测通过立即上线，不等整批结束
+                    if result.is_available:
+                        self._stream_verified_node(
+                            clash_nodes_for_test[idx][0], result, valid_nodes,
+                            f"Clash✓ [{idx+1}/{len(clash_nodes_for_test)}]"
+                        )
+
+                # 并发由自适应控制器决定（过载时自动回退）
+                clash_results = await check_nodes_clash(
+                    only_clash_nodes, max_concurrent=self.concurrency.limit('clash'),
+                    on_result=on_clash_result
+                )
+                self.concurrency.record_results('clash', clash_results)
                 
                 # 统计检测结果
                 total = len(clash_results)
@@ -1532,71 +1675,18 @@ class NodeHunter:
                 
                 self.add_log(f"📈 Clash 检测完成 - 总计: {total}, 可用: {available}, 不可用: {total - available}, 平均延迟: {avg_latency:.0f}ms", "INFO")
                 
-                # 关联原始节点和检测结果
+                # 可用节点已在 on_clash_result 中实时并入，这里只输出失败诊断
                 for idx, ((orig_node, _), result) in enumerate(zip(clash_nodes_for_test, clash_results)):
                     if result.is_available:
-                        # 节点可用，合并测试结果
-                        orig_node['alive'] = True
-                        orig_node['availability_level'] = 'VERIFIED'
-                        orig_node['latency'] = result.latency_ms or 0
-                        orig_node['protocol'] = result.protocol or orig_node.get('protocol', 'unknown')
-                        
-                        # 基于延迟计算健康评分
-                        latency = orig_node['latency']
-                        if latency <= 50:
-                            orig_node['health_score'] = 100
-                        elif latency <= 100:
-                            orig_node['health_score'] = 90
-                        elif latency <= 200:
-                            orig_node['health_score'] = 75
-                        elif latency <= 500:
-                            orig_node['health_score'] = 60
-                        else:
-                            orig_node['health_score'] = 40
-
-                        # 基于延迟的简单速度估算
-                        if latency <= 30:
-                            orig_node['speed'] = 90.0
-                        elif latency <= 60:
-                            orig_node['speed'] = 70.0
-                        elif latency <= 100:
-                            orig_node['speed'] = 50.0
-                        elif latency <= 200:
-                            orig_node['speed'] = 30.0
-                        elif latency <= 500:
-                            orig_node['speed'] = 15.0
-                        else:
-                            orig_node['speed'] = 5.0
-
-                        # 🔥 添加地区测试分数（用于Supabase同步）
-                        orig_node['mainland_score'] = int(orig_node.get('speed', 0))
-                        orig_node['mainland_latency'] = latency
-                        orig_node['overseas_score'] = int(orig_node.get('speed', 0))
-                        orig_node['overseas_latency'] = latency
-
-                        # 🔥 添加 share_link（用于viper-node-store显示QR码）
-                        if not orig_node.get('share_link'):
-                            try:
-                                orig_node['share_link'] = generate_node_share_link(orig_node)
-                            except Exception as e:
-                                logger.debug(f"生成share_link失败: {e}")
-
-                        # 🔥 优化：每检测到1个可用节点就输出，让用户看到实时反馈
+                        continue
+                    # 🔥 诊断：增加失败详情，帮助排查问题
+                    error_msg = result.error_message if result else "检测失败"
+                    if idx < 5 or (idx % 100 == 0):  # 前5个失败+每100个采样一个
                         self.add_log(
-                            f"✅ Clash✓ [{idx+1}/{total}] {orig_node.get('host')}:{orig_node.get('port')} "
-                            f"({orig_node.get('protocol')} | 延迟{latency}ms | 队列剩余{len(self.pending_nodes_queue)})",
-                            "SUCCESS"
+                            f"❌ Clash✗ [{idx+1}/{total}] {orig_node.get('host')}:{orig_node.get('port')} "
+                            f"({orig_node.get('protocol')}) - {error_msg}",
+                            "WARNING"
                         )
-                        valid_nodes.append(orig_node)
-                    else:
-                        # 🔥 诊断：增加失败详情，帮助排查问题
-                        error_msg = result.error_message if result else "检测失败"
-                        if idx < 5 or (idx % 100 == 0):  # 前5个失败+每100个采样一个
-                            self.add_log(
-                                f"❌ Clash✗ [{idx+1}/{total}] {orig_node.get('host')}:{orig_node.get('port')} "
-                                f"({orig_node.get('protocol')}) - {error_msg}",
-                                "WARNING"
-                            )
             except Exception as e:
                 self.add_log(f"❌ Clash 检测异常: {e}", "WARNING")
                 import traceback
@@ -1642,78 +1732,36 @@ class NodeHunter:
                     node_copy['server'] = node.get('host', '')  # 转换 host -> server
                     xray_nodes_converted.append(node_copy)
                 
-                # 使用 Xray 检测 (🔥 降低并发从10→3，避免过载)
-                xray_results = await check_nodes_v2ray(xray_nodes_converted, max_concurrent=3)
+                def on_xray_result(idx: int, result: V2RayCheckResult):
+                    if result.is_available:
+                        self._stream_verified_node(
+                            final_xray_nodes[idx], result, valid_nodes,
+                            f"Xray✓ [{idx+1}/{len(final_xray_nodes)}]"
+                        )
+
+                # 使用 Xray 检测（同时运行的内核进程数由自适应控制器决定）
+                xray_results = await check_nodes_v2ray(
+                    xray_nodes_converted, max_concurrent=self.concurrency.limit('xray'),
+                    on_result=on_xray_result
+                )
+                self.concurrency.record_results('xray', xray_results)
                 
                 # 统计检测结果
                 xray_available = sum(1 for r in xray_results if r.is_available)
                 self.add_log(f"🎯 Xray 检测完成 - 总计: {len(xray_results)}, 可用: {xray_available}", "INFO")
                 
-                # 处理 Xray 检测结果
+                # 可用节点已在 on_xray_result 中实时并入，这里只输出失败诊断
                 for idx, (node, result) in enumerate(zip(final_xray_nodes, xray_results)):
                     if result.is_available:
-                        # 节点可用
-                        node['alive'] = True
-                        node['availability_level'] = 'VERIFIED'
-                        node['latency'] = result.latency_ms or 0
-                        node['protocol'] = result.protocol or node.get('protocol', 'unknown')
-                        
-                        # 基于延迟计算健康评分
-                        latency = node['latency']
-                        if latency <= 50:
-                            node['health_score'] = 100
-                        elif latency <= 100:
-                            node['health_score'] = 90
-                        elif latency <= 200:
-                            node['health_score'] = 75
-                        elif latency <= 500:
-                            node['health_score'] = 60
-                        else:
-                            node['health_score'] = 40
-                        
-                        # 基于延迟的速度估算
-                        if latency <= 30:
-                            node['speed'] = 90.0
-                        elif latency <= 60:
-                            node['speed'] = 70.0
-                        elif latency <= 100:
-                            node['speed'] = 50.0
-                        elif latency <= 200:
-                            node['speed'] = 30.0
-                        elif latency <= 500:
-                            node['speed'] = 15.0
-                        else:
-                            node['speed'] = 5.0
-                        
-                        # 🔥 添加地区测试分数
-                        node['mainland_score'] = int(node.get('speed', 0))
-                        node['mainland_latency'] = latency
-                        node['overseas_score'] = int(node.get('speed', 0))
-                        node['overseas_latency'] = latency
-                        
-                        # 🔥 添加 share_link（用于viper-node-store显示QR码）
-                        if not node.get('share_link'):
-                            try:
-                                node['share_link'] = generate_node_share_link(node)
-                            except Exception as e:
-                                logger.debug(f"生成share_link失败: {e}")
-                        
-                        # 🔥 优化：每检测到1个可用节点就输出，让用户看到实时反馈
+                        continue
+                    # 🔥 诊断失败原因
+                    error_msg = result.error_message if result else "检测失败"
+                    if idx < 5 or (idx % 100 == 0):  # 前5个失败+每100个采样一个
                         self.add_log(
-                            f"✅ Xray✓ [{idx+1}/{len(xray_results)}] {node.get('host')}:{node.get('port')} "
-                            f"({node.get('protocol')} | 延迟{latency}ms | 队列剩余{len(self.pending_nodes_queue)})",
-                            "SUCCESS"
+                            f"❌ Xray✗ [{idx+1}/{len(xray_results)}] {node.get('host')}:{node.get('port')} "
+                            f"({node.get('protocol')}) - {error_msg}",
+                            "WARNING"
                         )
-                        valid_nodes.append(node)
-                    else:
-                        # 🔥 诊断失败原因
-                        error_msg = result.error_message if result else "检测失败"
-                        if idx < 5 or (idx % 100 == 0):  # 前5个失败+每100个采样一个
-                            self.add_log(
-                                f"❌ Xray✗ [{idx+1}/{len(xray_results)}] {node.get('host')}:{node.get('port')} "
-                                f"({node.get('protocol')}) - {error_msg}",
-                                "WARNING"
-                            )
             except Exception as e:
                 self.add_log(f"❌ Xray 检测异常: {e}", "WARNING")
                 import traceback
@@ -1725,7 +1773,10 @@ class NodeHunter:
         # 解决: 保留旧节点(alive=True)，添加新检测的节点
         
         # 1. 保留之前检测出的可用节点（那些已经alive=True的）
-        existing_alive = [n for n in self.nodes if n.get('alive') and n not in valid_nodes]
+        valid_keys = {f"{n.get('host')}:{n.get('port')}" for n in valid_nodes}
+        existing_alive = [
+            n for n in self.nodes.alive() if f"{n.get('host')}:{n.get('port')}" not in valid_keys
+        ]
         
         # 2. 合并: 已确认可用的 + 新检测出的可用
         merged_nodes = existing_alive + valid_nodes
@@ -1741,7 +1792,7 @@ class NodeHunter:
         self.nodes = sorted(unique_nodes.values(), key=lambda x: x.get('health_score', 0), reverse=True)
         
         self.add_log(
-            f"🎉 节点检测完成！可用节点: {len([n for n in self.nodes if n.get('alive')])}/{len(nodes_to_test)} "
+            f"🎉 节点检测完成！可用节点: {len(self.nodes.alive())}/{len(nodes_to_test)} "
             f"(包含 {len(existing_alive)} 个已保留节点)",
             "SUCCESS"
         )
@@ -1770,10 +1821,104 @@ class NodeHunter:
                 percentage = (available / total * 100) if total > 0 else 0
                 self.add_log(f"   • {proto:12s}: {total:3d} 个 ({available:2d}✅ {percentage:5.1f}%)", "INFO")
         
+        # 整批结束后立即刷新一次，取消尚未触发的去抖刷新
+        self._cancel_artifact_refresh()
         if self.nodes:
             self.subscription_base64 = generate_subscription_content(self.nodes)
             self._save_nodes_to_file()
 
+    def _apply_verified_result(self, node: Dict, result):
+        """把内核检测通过的结果（ClashCheckResult / V2RayCheckResult）写入节点"""
+        node['alive'] = True
+        node['availability_level'] = 'VERIFIED'
+        node['latency'] = result.latency_ms or 0
+        node['protocol'] = result.protocol or node.get('protocol', 'unknown')
+
+        # 基于延迟计算健康评分
+        latency = node['latency']
+        if latency <= 50:
+            node['health_score'] = 100
+        elif latency <= 100:
+            node['health_score'] = 90
+        elif latency <= 200:
+            node['health_score'] = 75
+        elif latency <= 500:
+            node['health_score'] = 60
+        else:
+            node['health_score'] = 40
+
+        # 基于延迟的简单速度估算
+        if latency <= 30:
+            node['speed'] = 90.0
+        elif latency <= 60:
+            node['speed'] = 70.0
+        elif latency <= 100:
+            node['speed'] = 50.0
+        elif latency <= 200:
+            node['speed'] = 30.0
+        elif latency <= 500:
+            node['speed'] = 15.0
+        else:
+            node['speed'] = 5.0
+
+        # 🔥 添加地区测试分数（用于Supabase同步）
+        node['mainland_score'] = int(node.get('speed', 0))
+        node['mainland_latency'] = latency
+        node['overseas_score'] = int(node.get('speed', 0))
+        node['overseas_latency'] = latency
+
+        # 🔥 添加 share_link（用于viper-node-store显示QR码）
+        if not node.get('share_link'):
+            try:
+                node['share_link'] = generate_node_share_link(node)
+            except Exception as e:
+                logger.debug(f"生成share_link失败: {e}")
+
+    def _stream_verified_node(self, node: Dict, result, valid_nodes: List[Dict], label: str):
+        """
+        流式结果回调的公共部分：标记可用、立即并入 self.nodes、去抖刷新订阅
+
+        在检测器内部被调用，异常必须就地吞掉，否则会中断整批检测
+        """
+        try:
+            self._apply_verified_result(node, result)
+            # 🔥 优化：每检测到1个可用节点就输出，让用户看到实时反馈
+            self.add_log(
+                f"✅ {label} {node.get('host')}:{node.get('port')} "
+                f"({node.get('protocol')} | 延迟{node['latency']}ms | 队列剩余{len(self.pending_nodes_queue)})",
+                "SUCCESS"
+            )
+            valid_nodes.append(node)
+            self._upsert_live_node(node)
+        except Exception as e:
+            logger.warning(f"流式合并节点失败 {node.get('host')}:{node.get('port')}: {e}")
+
+    def _upsert_live_node(self, node: Dict):
+        """把检测通过的节点并入 self.nodes（按 host:port 覆盖旧记录），并安排去抖刷新"""
+        self.nodes.upsert(node)
+        self._schedule_artifact_refresh()
+
+    def _schedule_artifact_refresh(self):
+        """去抖：窗口期内的多次上线只触发一次订阅/文件刷新"""
+        if self._artifact_refresh_task and not self._artifact_refresh_task.done():
+            return
+        self._artifact_refresh_task = asyncio.create_task(self._refresh_artifacts_later())
+
+    def _cancel_artifact_refresh(self):
+        if self._artifact_refresh_task and not self._artifact_refresh_task.done():
+            self._artifact_refresh_task.cancel()
+        self._artifact_refresh_task = None
+
+    async def _refresh_artifacts_later(self):
+        await asyncio.sleep(ARTIFACT_REFRESH_DEBOUNCE)
+        try:
+            alive_nodes = self.get_alive_nodes()
+            if alive_nodes:
+                self.subscription_base64 = generate_subscription_content(alive_nodes)
+                self._save_nodes_to_file()
+        except Exception as e:
+            logger.warning(f"去抖刷新订阅失败: {e}")
+
     async def test_and_update_nodes(self, nodes_to_test: List[Dict]):
         self.add_log(f"🧪 开始测试 {len(nodes_to_test)} 个节点...", "INFO")
         tasks = [test_node_network(node) for node in nodes_to_test]
@@ -1784,8 +1929,8 @@ class NodeHunter:
             if results[i].total_score > 0:
                 node.update(alive=True, delay=results[i].tcp_ping_ms, test_results=results[i].__dict__)
 
-                country = self._get_country_code_from_ip(node['host'])
-                if country == 'UNK' or country is None:
+                country = await self.geolocation_helper.detect_country_by_ip(node['host']) or 'UNK'
+                if country == 'UNK':
                     country = self._guess_country_from_name(node.get('name', ''))
 
                 node['country'] = country
@@ -1876,7 +2021,10 @@ async def get_stats():
         "running": hunter.is_scanning,
         "logs": hunter.logs,
         "nodes": groups,
-        "next_scan_time": next_run  # 🔥 返回时间戳
+        "next_scan_time": next_run,  # 🔥 返回时间戳
+        "concurrency": hunter.concurrency.snapshot(),
+        "pending_queue": hunter.pending_nodes_queue.stats(),
+        "caches": hunter.cache_stats()
     }
 
 
@@ -1955,11 +2103,7 @@ async def test_all_nodes(background_tasks: BackgroundTasks):
 
 @router.post("/test_single")
 async def test_single_node(target: NodeTarget):
-    found_node = None
-    for node in hunter.nodes:
-        if node['host'] == target.host and node['port'] == target.port:
-            found_node = node
-            break
+    found_node = hunter.nodes.get(target.host, target.port)
 
     if found_node:
         hunter.add_log(f"🧪 手动测试节点: {found_node.get('name', 'Unknown')}", "INFO")
@@ -2003,8 +2147,8 @@ async def test_single_node(target: NodeTarget):
                     speed = 0.1
                 hunter.add_log(f"⚠️ 降级为简单计算速度: {speed} MB/s", "INFO")
 
-            # 3. 更新内存中的节点数据
-            found_node.update({
+            # 3. 更新内存中的节点数据（同步刷新索引）
+            hunter.nodes.update(f"{target.host}:{target.port}", {
                 "alive": True,
                 "delay": tcp_delay,
                 "speed": speed,
@@ -2021,9 +2165,11 @@ async def test_single_node(target: NodeTarget):
                 "delay": tcp_delay  # 返回延迟
             }
         else:
-            found_node['alive'] = False
-            found_node['speed'] = 0.0
-            found_node['delay'] = -1
+            hunter.nodes.update(f"{target.host}:{target.port}", {
+                "alive": False,
+                "speed": 0.0,
+                "delay": -1,
+            })
             hunter.add_log(f"❌ 节点已失效 (无法连接)", "ERROR")
             return {"status": "fail", "message": "Node unreachable"}
 
@@ -2055,16 +2201,12 @@ async def cache_test_result(req: CacheTestResult):
         speed: 速度（MB/s）
     """
     try:
-        # 在内存节点列表中查找并更新
-        found_node = None
-        for node in hunter.nodes:
-            if node['host'] == req.host and node['port'] == req.port:
-                found_node = node
-                break
+        # 在内存节点索引中查找并更新
+        found_node = hunter.nodes.get(req.host, req.port)
         
         if found_node:
             # 更新测试结果
-            found_node.update({
+            hunter.nodes.update(f"{req.host}:{req.port}", {
                 "delay": req.delay,
                 "speed": req.speed,
                 "alive": True,
@@ -2101,11 +2243,7 @@ async def cache_test_result(req: CacheTestResult):
 
 @router.get("/qrcode")
 async def get_node_qrcode(host: str, port: int):
-    found_node = None
-    for node in hunter.nodes:
-        if node['host'] == host and str(node['port']) == str(port):
-            found_node = node
-            break
+    found_node = hunter.nodes.get(host, port)
 
     if found_node:
         share_link = generate_node_share_link(found_node)
@@ -2127,6 +2265,12 @@ async def add_source(req: SourceRequest, background_tasks: BackgroundTasks):
     return {"status": "ok" if success else "error", "message": msg}
 
 
+@router.get("/source_schedule")
+async def get_source_schedule():
+    """各订阅源的自适应刷新计划（间隔、观测到的变化间隔、距下次抓取秒数）"""
+    return {"sources": hunter.fetch_service.scheduler.snapshot(hunter.sources)}
+
+
 @router.get("/subscription")
 async def get_subscription():
     if hunter.subscription_base64:
@@ -2136,7 +2280,7 @@ async def get_subscription():
 
 @router.get("/clash/config")
 async def get_clash_config(request: Request):
-    config_str = generate_clash_config(hunter.nodes)
+    config_str = generate_clash_config(hunter.nodes.copy())
     if config_str:
         return {"filename": f"clash_config_{int(time.time())}.yaml", "content": config_str}
     return {"error": "Error"}
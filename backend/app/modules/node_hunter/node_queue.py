@@ -0,0 +1,156 @@
+# backend/app/modules/node_hunter/node_queue.py
+"""
+待检测节点优先级队列
+
+替代 NodeHunter 里每次取节点都整体排序的 pending_nodes_queue 字典：
+- 字典索引 node_key -> 条目，成员判断 O(1)
+- 小顶堆按 (priority, added_time) 出队，push / pop O(log n)
+- 修改优先级、删除节点都采用惰性删除（旧堆项出队时丢弃）
+- 维护各优先级计数，统计信息 O(1) 获得
+"""
+
+import heapq
+import itertools
+import time
+from collections import Counter
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# 优先级（数值越小越先检测）
+PRIORITY_NEW = 0          # 新节点
+PRIORITY_RETRY = 1        # 失败待重试
+PRIORITY_REVALIDATE = 2   # 待重验（已检测过）
+PRIORITY_TESTED = 3       # 已检测
+
+PRIORITY_NAMES = {
+    PRIORITY_NEW: "new",
+    PRIORITY_RETRY: "retry",
+    PRIORITY_REVALIDATE: "revalidate",
+    PRIORITY_TESTED: "tested",
+}
+
+
+class PendingNodeQueue:
+    """
+    待检测节点队列
+
+    条目结构与原字典保持一致: {'node', 'retry_count', 'priority', 'added_time'}
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, dict] = {}
+        # 堆项: (priority, added_time, seq, node_key)；seq 与 _seq[node_key] 不一致即为失效项
+        self._heap: List[Tuple[int, float, int, str]] = []
+        self._seq: Dict[str, int] = {}
+        self._counter = itertools.count()
+        self._priority_counts: Counter = Counter()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __bool__(self) -> bool:
+        return bool(self._entries)
+
+    def __contains__(self, node_key: str) -> bool:
+        return node_key in self._entries
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._entries)
+
+    def get(self, node_key: str) -> Optional[dict]:
+        return self._entries.get(node_key)
+
+    def _push_heap(self, node_key: str, entry: dict):
+        seq = next(self._counter)
+        self._seq[node_key] = seq
+        heapq.heappush(self._heap, (entry['priority'], entry['added_time'], seq, node_key))
+        # 失效堆项过多时重建，避免频繁改优先级导致堆无限膨胀
+        if len(self._heap) > 2 * len(self._entries) + 1024:
+            self._compact()
+
+    def _compact(self):
+        self._heap = [item for item in self._heap if self._seq.get(item[3]) == item[2]]
+        heapq.heapify(self._heap)
+
+    def push(self, node_key: str, node: Dict, priority: int = PRIORITY_NEW,
+             retry_count: int = 0, added_time: Optional[float] = None) -> bool:
+        """
+        入队
+
+        已在队列中的节点不会重复入队；若新优先级更高（数值更小）则提升其优先级。
+
+        Returns:
+            是否为新入队节点
+        """
+        existing = self._entries.get(node_key)
+        if existing is not None:
+            if priority < existing['priority']:
+                self.update_priority(node_key, priority)
+            return False
+
+        entry = {
+            'node': node,
+            'retry_count': retry_count,
+            'priority': priority,
+            'added_time': time.time() if added_time is None else added_time,
+        }
+        self._entries[node_key] = entry
+        self._priority_counts[priority] += 1
+        self._push_heap(node_key, entry)
+        return True
+
+    def update_priority(self, node_key: str, priority: int) -> bool:
+        """修改已入队节点的优先级（保留原入队时间）"""
+        entry = self._entries.get(node_key)
+        if entry is None:
+            return False
+        if entry['priority'] == priority:
+            return True
+        self._priority_counts[entry['priority']] -= 1
+        self._priority_counts[priority] += 1
+        entry['priority'] = priority
+        self._push_heap(node_key, entry)
+        return True
+
+    def remove(self, node_key: str) -> Optional[dict]:
+        """删除节点（堆项惰性清理）"""
+        entry = self._entries.pop(node_key, None)
+        if entry is not None:
+            self._seq.pop(node_key, None)
+            self._priority_counts[entry['priority']] -= 1
+        return entry
+
+    def pop_entries(self, count: int) -> List[dict]:
+        """按 (priority, added_time) 取出最多 count 个条目"""
+        popped = []
+        while self._heap and len(popped) < count:
+            _, _, seq, node_key = heapq.heappop(self._heap)
+            if self._seq.get(node_key) != seq:
+                continue
+            popped.append(self.remove(node_key))
+        return popped
+
+    def pop(self, count: int) -> List[Dict]:
+        """按优先级取出最多 count 个节点"""
+        return [entry['node'] for entry in self.pop_entries(count)]
+
+    def clear(self):
+        self._entries.clear()
+        self._heap.clear()
+        self._seq.clear()
+        self._priority_counts.clear()
+
+    def priority_counts(self) -> Dict[str, int]:
+        """各优先级的待检测节点数"""
+        return {
+            PRIORITY_NAMES.get(priority, str(priority)): count
+            for priority, count in sorted(self._priority_counts.items())
+            if count > 0
+        }
+
+    def stats(self) -> Dict:
+        """队列统计（用于 /nodes/stats）"""
+        return {
+            "size": len(self._entries),
+            "priorities": self.priority_counts(),
+            "heap_size": len(self._heap),
+        }
@@ -0,0 +1,99 @@
+# backend/app/modules/node_hunter/node_record.py
+"""
+紧凑节点记录
+
+解析出的节点原本以 20 多个字符串键的字典在系统中流转，待检测队列里常驻数万个。
+NodeRecord 使用 __slots__ 存储常用字段，协议、国家等取值有限的字段做字符串驻留
+（相同取值共享同一个对象），其余不常见字段放入 extra。
+
+只在边界处与旧的字典结构互转：入队时 from_dict，出队交给检测流程时 to_dict。
+"""
+
+import sys
+from dataclasses import dataclass, fields
+from typing import Any, Dict, Optional
+
+# 取值有限、适合驻留的字段
+_INTERNED_FIELDS = ("protocol", "country", "network", "type", "security", "tls", "method")
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+@dataclass(slots=True)
+class NodeRecord:
+    """
+    节点记录
+
+    None 表示原字典中没有该键，to_dict 时不会输出
+    """
+    host: str
+    port: int
+    protocol: str = "unknown"
+    name: Optional[str] = None
+    country: Optional[str] = None
+    id: Optional[str] = None
+    # 认证
+    uuid: Optional[str] = None
+    password: Optional[str] = None
+    username: Optional[str] = None
+    method: Optional[str] = None
+    alterId: Optional[int] = None
+    # 传输层
+    network: Optional[str] = None
+    type: Optional[str] = None
+    security: Optional[str] = None
+    tls: Optional[str] = None
+    sni: Optional[str] = None
+    path: Optional[str] = None
+    host_header: Optional[str] = None
+    # 来源
+    source_url: Optional[str] = None
+    share_link: Optional[str] = None
+    # 其余字段（检测结果等）
+    extra: Optional[Dict[str, Any]] = None
+
+    @property
+    def key(self) -> str:
+        return f"{self.host}:{self.port}"
+
+    @classmethod
+    def from_dict(cls, node: Dict[str, Any]) -> "NodeRecord":
+        kwargs = {}
+        extra = None
+        for k, v in node.items():
+            if k in _FIELD_NAMES:
+                kwargs[k] = _intern(v) if k in _INTERNED_FIELDS else v
+            else:
+                if extra is None:
+                    extra = {}
+                extra[k] = v
+        # 主机名在不同协议 / 源之间大量重复，一并驻留
+        kwargs["host"] = _intern(kwargs.get("host") or "")
+        kwargs.setdefault("port", 0)
+        if extra:
+            kwargs["extra"] = extra
+        return cls(**kwargs)
+
+    def to_dict(self) -> Dict[str, Any]:
+        node = {}
+        for name in _FIELD_NAMES:
+            value = getattr(self, name)
+            if value is not None:
+                node[name] = value
+        if self.extra:
+            node.update(self.extra)
+        return node
+
+    def get(self, key: str, default=None):
+        """兼容字典式读取"""
+        if key in _FIELD_NAMES:
+            value = getattr(self, key)
+            return default if value is None else value
+        if self.extra:
+            return self.extra.get(key, default)
+        return default
+
+
+_FIELD_NAMES = tuple(f.name for f in fields(NodeRecord) if f.name != "extra")
@@ -0,0 +1,193 @@
+# backend/app/modules/node_hunter/node_store.py
+"""
+已检测节点集合
+
+替代 NodeHunter.nodes 这个普通列表，避免按 host:port 查找节点时的线性扫描：
+- 主索引 host:port -> 节点（保持插入 / 排序顺序）
+- 二级索引：国家、协议、是否可用
+- 所有插入、更新、删除都同步维护索引
+
+对外仍表现得像列表（可迭代、len、下标、copy），原有遍历代码无需修改。
+节点字典被原地修改 alive / country / protocol 后，需调用 update() 或 reindex() 刷新索引。
+"""
+
+import itertools
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+
+def node_key(node: Dict) -> str:
+    """节点主键 host:port"""
+    return f"{node.get('host')}:{node.get('port')}"
+
+
+class NodeCollection:
+    """带索引的节点集合"""
+
+    def __init__(self, nodes: Optional[Iterable[Dict]] = None):
+        self._by_key: Dict[str, Dict] = {}
+        self._position: Dict[str, int] = {}
+        self._counter = itertools.count()
+        # 每个节点当前登记在二级索引中的 (country, protocol, alive)
+        self._indexed: Dict[str, Tuple[str, str, bool]] = {}
+        self._by_country: Dict[str, Set[str]] = {}
+        self._by_protocol: Dict[str, Set[str]] = {}
+        self._alive: Set[str] = set()
+        if nodes:
+            self.replace_all(nodes)
+
+    # ---------- 列表兼容接口 ----------
+
+    def __iter__(self) -> Iterator[Dict]:
+        return iter(list(self._by_key.values()))
+
+    def __len__(self) -> int:
+        return len(self._by_key)
+
+    def __bool__(self) -> bool:
+        return bool(self._by_key)
+
+    def __contains__(self, item) -> bool:
+        key = item if isinstance(item, str) else node_key(item)
+        return key in self._by_key
+
+    def __getitem__(self, index):
+        return list(self._by_key.values())[index]
+
+    def copy(self) -> List[Dict]:
+        return list(self._by_key.values())
+
+    def append(self, node: Dict):
+        self.upsert(node)
+
+    def sort(self, key=None, reverse: bool = False):
+        self.replace_all(sorted(self._by_key.values(), key=key, reverse=reverse))
+
+    # ---------- 索引维护 ----------
+
+    @staticmethod
+    def _index_fields(node: Dict) -> Tuple[str, str, bool]:
+        return (
+            node.get('country') or 'UNK',
+            (node.get('protocol') or 'unknown').lower(),
+            bool(node.get('alive')),
+        )
+
+    def _unindex(self, key: str):
+        fields = self._indexed.pop(key, None)
+        if fields is None:
+            return
+        country, protocol, alive = fields
+        bucket = self._by_country.get(country)
+        if bucket is not None:
+            bucket.discard(key)
+            if not bucket:
+                del self._by_country[country]
+        bucket = self._by_protocol.get(protocol)
+        if bucket is not None:
+            bucket.discard(key)
+            if not bucket:
+                del self._by_protocol[protocol]
+        if alive:
+            self._alive.discard(key)
+
+    def _index(self, key: str, node: Dict):
+        fields = self._index_fields(node)
+        if self._indexed.get(key) == fields:
+            return
+        self._unindex(key)
+        country, protocol, alive = fields
+        self._indexed[key] = fields
+        self._by_country.setdefault(country, set()).add(key)
+        self._by_protocol.setdefault(protocol, set()).add(key)
+        if alive:
+            self._alive.add(key)
+
+    def _ordered(self, keys: Iterable[str]) -> List[Dict]:
+        """按集合顺序返回节点"""
+        return [self._by_key[k] for k in sorted(keys, key=self._position.__getitem__)]
+
+    # ---------- 增删改 ----------
+
+    def replace_all(self, nodes: Iterable[Dict]):
+        """整体替换（后出现的同 host:port 节点覆盖先出现的，位置取第一次出现）"""
+        nodes = list(nodes)
+        self.clear()
+        for node in nodes:
+            self.upsert(node)
+
+    def upsert(self, node: Dict) -> bool:
+        """
+        插入或覆盖节点（同 host:port 覆盖时保留原位置）
+
+        Returns:
+            是否为新插入
+        """
+        key = node_key(node)
+        is_new = key not in self._by_key
+        self._by_key[key] = node
+        if is_new:
+            self._position[key] = next(self._counter)
+        self._index(key, node)
+        return is_new
+
+    def update(self, key: str, fields: Dict[str, Any]) -> Optional[Dict]:
+        """更新节点字段并刷新索引"""
+        node = self._by_key.get(key)
+        if node is None:
+            return None
+        node.update(fields)
+        self._index(key, node)
+        return node
+
+    def reindex(self, node: Dict):
+        """节点被原地修改后刷新其索引"""
+        key = node_key(node)
+        if key in self._by_key:
+            self._index(key, self._by_key[key])
+
+    def remove(self, key: str) -> Optional[Dict]:
+        node = self._by_key.pop(key, None)
+        if node is not None:
+            self._position.pop(key, None)
+            self._unindex(key)
+        return node
+
+    def clear(self):
+        self._by_key.clear()
+        self._position.clear()
+        self._indexed.clear()
+        self._by_country.clear()
+        self._by_protocol.clear()
+        self._alive.clear()
+
+    # ---------- 查询 ----------
+
+    def get(self, host: str, port) -> Optional[Dict]:
+        """按 host:port 查找节点，O(1)"""
+        return self._by_key.get(f"{host}:{port}")
+
+    def get_by_key(self, key: str) -> Optional[Dict]:
+        return self._by_key.get(key)
+
+    def alive(self) -> List[Dict]:
+        """可用节点（保持集合顺序）"""
+        return self._ordered(self._alive)
+
+    def by_country(self, country: str) -> List[Dict]:
+        return self._ordered(self._by_country.get(country, ()))
+
+    def by_protocol(self, protocol: str) -> List[Dict]:
+        return self._ordered(self._by_protocol.get(protocol.lower(), ()))
+
+    def alive_count(self) -> int:
+        return len(self._alive)
+
+    def country_counts(self, alive_only: bool = False) -> Dict[str, int]:
+        if not alive_only:
+            return {c: len(keys) for c, keys in self._by_country.items()}
+        return {
+            c: n for c, n in ((c, len(keys & self._alive)) for c, keys in self._by_country.items()) if n
+        }
+
+    def protocol_counts(self) -> Dict[str, int]:
+        return {p: len(keys) for p, keys in self._by_protocol.items()}
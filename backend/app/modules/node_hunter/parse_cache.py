@@ -0,0 +1,172 @@
+# backend/app/modules/node_hunter/parse_cache.py
+"""
+节点链接解析缓存（SQLite）
+
+同一条 vmess/vless/trojan 链接会在多个源、每个爬虫周期反复出现，
+缓存以链接摘要为键保存解析结果：
+- 解析成功：保存节点字典（marshal 序列化，读取比 JSON 快得多）
+- 解析失败：保存墓碑（node 为 NULL），不再反复重试
+- 条目数超过上限时按最近使用时间淘汰
+"""
+
+import hashlib
+import logging
+import marshal
+import os
+import sqlite3
+import sys
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PARSE_CACHE_ENABLED = os.environ.get("PARSE_CACHE_ENABLED", "true").lower() == "true"
+PARSE_CACHE_FILE = os.environ.get("PARSE_CACHE_FILE", "parse_cache.db")
+PARSE_CACHE_MAX_ENTRIES = int(os.environ.get("PARSE_CACHE_MAX_ENTRIES", "300000"))
+
+# 解析器输出结构变化时递增，旧缓存自动失效（marshal 格式与 Python 版本相关，一并计入）
+PARSE_CACHE_VERSION = f"3-py{sys.version_info[0]}{sys.version_info[1]}"
+
+# last_used 的刷新粒度（秒）：命中时只刷新超过该时长未更新的条目，避免每次命中都写库
+LAST_USED_RESOLUTION = 3600
+
+# 墓碑：已知无法解析的链接
+TOMBSTONE = object()
+
+# SQLite 单条语句的参数上限较低，批量查询分块进行
+_SQL_CHUNK = 500
+
+
+def link_digest(link: str) -> bytes:
+    """链接摘要（16 字节）"""
+    return hashlib.blake2b(f"{PARSE_CACHE_VERSION}:{link}".encode("utf-8", "surrogatepass"),
+                           digest_size=16).digest()
+
+
+class ParseCache:
+    """链接摘要 -> 解析结果 / 墓碑"""
+
+    def __init__(self, path: str = PARSE_CACHE_FILE, max_entries: int = PARSE_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max(1000, max_entries)
+        # 解析可能在线程池中进行，连接跨线程共享，用锁串行化
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS parse_cache ("
+            "digest BLOB PRIMARY KEY, node BLOB, last_used INTEGER NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_parse_cache_last_used ON parse_cache(last_used)")
+        self._conn.commit()
+        # 条目数估计值（INSERT OR REPLACE 覆盖时会偏大），超过上限时才真正 COUNT
+        self._approx_count = self._conn.execute("SELECT COUNT(*) FROM parse_cache").fetchone()[0]
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, digests: List[bytes]) -> Dict[bytes, Any]:
+        """
+        批量查询
+
+        Returns:
+            digest -> 节点字典（每次返回新对象）或 TOMBSTONE；未命中的不在结果中
+        """
+        found: Dict[bytes, Any] = {}
+        unique = list(dict.fromkeys(digests))
+        now = int(time.time())
+        stale = []
+        with self._lock:
+            for i in range(0, len(unique), _SQL_CHUNK):
+                chunk = unique[i:i + _SQL_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT digest, node, last_used FROM parse_cache WHERE digest IN ({placeholders})", chunk
+                ).fetchall()
+                for digest, node, last_used in rows:
+                    found[digest] = node
+                    if now - last_used >= LAST_USED_RESOLUTION:
+                        stale.append(digest)
+            for i in range(0, len(stale), _SQL_CHUNK):
+                chunk = stale[i:i + _SQL_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                self._conn.execute(
+                    f"UPDATE parse_cache SET last_used = ? WHERE digest IN ({placeholders})", [now, *chunk]
+                )
+            if stale:
+                self._conn.commit()
+        self.hits += len(found)
+        self.misses += len(unique) - len(found)
+        return {d: TOMBSTONE if v is None else marshal.loads(v) for d, v in found.items()}
+
+    def get(self, link: str) -> Any:
+        """单条查询，未命中返回 None"""
+        digest = link_digest(link)
+        return self.get_many([digest]).get(digest)
+
+    def put_many(self, items: Iterable[Tuple[bytes, Optional[Dict[str, Any]]]]):
+        """批量写入（node 为 None 表示写入墓碑）"""
+        now = int(time.time())
+        rows = [(d, None if node is None else marshal.dumps(node), now) for d, node in items]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO parse_cache (digest, node, last_used) VALUES (?, ?, ?)", rows
+            )
+            self._conn.commit()
+            self._approx_count += len(rows)
+            if self._approx_count > self.max_entries:
+                self._evict_locked()
+
+    def put(self, link: str, node: Optional[Dict[str, Any]]):
+        self.put_many([(link_digest(link), node)])
+
+    def _evict_locked(self):
+        """超过上限时淘汰最久未使用的条目（一次淘汰到上限的 90%，避免频繁触发）"""
+        count = self._conn.execute("SELECT COUNT(*) FROM parse_cache").fetchone()[0]
+        self._approx_count = count
+        if count <= self.max_entries:
+            return
+        excess = count - int(self.max_entries * 0.9)
+        self._conn.execute(
+            "DELETE FROM parse_cache WHERE digest IN ("
+            "SELECT digest FROM parse_cache ORDER BY last_used LIMIT ?)",
+            (excess,)
+        )
+        self._conn.commit()
+        self._approx_count = count - excess
+        logger.info(f"🧹 解析缓存淘汰 {excess} 条")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            count = self._conn.execute("SELECT COUNT(*) FROM parse_cache").fetchone()[0]
+        return {"entries": count, "hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_parse_cache: Optional[ParseCache] = None
+_parse_cache_failed = False
+
+
+def get_parse_cache() -> Optional[ParseCache]:
+    """获取全局解析缓存；禁用或无法打开数据库时返回 None（调用方直接解析）"""
+    global _parse_cache, _parse_cache_failed
+    if _parse_cache is None and PARSE_CACHE_ENABLED and not _parse_cache_failed:
+        try:
+            _parse_cache = ParseCache()
+        except Exception as e:
+            _parse_cache_failed = True
+            logger.warning(f"⚠️ 解析缓存不可用 ({e})，改为直接解析")
+    return _parse_cache
+
+
+def close_parse_cache():
+    global _parse_cache
+    if _parse_cache is not None:
+        _parse_cache.close()
+        _parse_cache = None
@@ -1,17 +1,20 @@
 # backend/app/modules/node_hunter/parsers.py
+import asyncio
 import base64
 import json
+import logging
+import multiprocessing
+import os
 import re
-from typing import Optional, Dict, Any
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Dict, Any, List, Tuple
 from urllib.parse import urlparse, parse_qs
 from urllib.parse import unquote
 
-# 🔥 修复：使用国家代码而不是中文名字，以保证前端能正确显示国旗
-COUNTRY_CODES = {"CN": "CN", "US": "US", "JP": "JP", "SG": "SG", "TW": "TW", "HK": "HK", "KR": "KR",
-                 "DE": "DE", "FR": "FR", "GB": "GB", "CA": "CA", "AU": "AU", "RU": "RU",
-                 "IN": "IN", "BR": "BR", "TR": "TR", "NL": "NL", "SE": "SE", "NO": "NO", "FI": "FI",
-                 "DK": "DK", "CH": "CH", "AT": "AT", "BE": "BE"}
+from .country_matcher import match_country
+from .parse_cache import TOMBSTONE, get_parse_cache, link_digest
 
+logger = logging.getLogger(__name__)
 
 def clean_base64(b64_str: str) -> str:
     """Cleans a base64 string by removing invalid characters and adding padding."""
@@ -50,47 +53,8 @@ def parse_vmess_link(url: str) -> Optional[Dict[str, Any]]:
 
 
 def _extract_country_from_name(name: str) -> str:
-    """从节点名称中提取国家代码"""
-    if not name:
-        return "UNK"
-    
-    upper_name = name.upper()
-    
-    # 精确匹配：整个单词匹配
-    exact_matches = {
-        "CA": ["CANADA"],
-        "US": ["USA", "UNITED STATES", "AMERICA"],
-        "JP": ["JAPAN", "TOKYO", "OSAKA"],
-        "GB": ["UNITED KINGDOM", "LONDON"],
-        "DE": ["GERMANY", "FRANKFURT"],
-        "FR": ["FRANCE", "PARIS"],
-        "SG": ["SINGAPORE"],
-        "HK": ["HONG KONG", "HONGKONG"],
-        "TW": ["TAIWAN", "TAIPEI"],
-        "IN": ["INDIA"],
-        "BR": ["BRAZIL"],
-        "RU": ["RUSSIA", "MOSCOW"],
-        "KR": ["KOREA", "SEOUL"],
-        "AU": ["AUSTRALIA", "SYDNEY"],
-        "NL": ["NETHERLANDS"],
-        "SE": ["SWEDEN"],
-        "CH": ["SWITZERLAND", "ZURICH"],
-        "FI": ["FINLAND"],
-        "NO": ["NORWAY"],
-        "TR": ["TURKEY"],
-    }
-    
-    for country_code, keywords in exact_matches.items():
-        for keyword in keywords:
-            # 检查关键词是否作为独立单词出现
-            if keyword in upper_name:
-                return country_code
-    
-    # 检查中文国家名称
-    if any(cn_name in name for cn_name in ["中国", "回国", "CN", "CHINA"]):
-        return "CN"
-    
-    return "UNK"
+    """从节点名称中提取国家代码（使用国家代码而不是中文名字，以保证前端能正确显示国旗）"""
+    return match_country(name) or "UNK"
 
 
 def parse_vless_link(url: str) -> Optional[Dict[str, Any]]:
@@ -208,17 +172,201 @@ def parse_standard_proxy_link(url: str) -> Optional[Dict[str, Any]]:
         return None
 
 
+# scheme -> 解析函数（一次字典查找完成分发，不再逐个前缀比较）
+SCHEME_PARSERS = {
+    'vmess': parse_vmess_link,
+    'vless': parse_vless_link,
+    'trojan': parse_trojan_link,
+    'ss': parse_ss_link,
+    'socks5': parse_standard_proxy_link,
+    'http': parse_standard_proxy_link,
+    'https': parse_standard_proxy_link,
+}
+
+
+def _split_scheme(url: str) -> str:
+    scheme, sep, _ = url.partition('://')
+    return scheme if sep else ''
+
+
+def _parse_uncached(url: str) -> Optional[Dict[str, Any]]:
+    parser = SCHEME_PARSERS.get(_split_scheme(url))
+    return parser(url) if parser else None
+
+
 def parse_node_url(url: str) -> Optional[Dict[str, Any]]:
+    """解析单条链接（先查解析缓存，已知无法解析的链接直接返回 None）"""
     url = url.strip()
-    if url.startswith('vmess://'):
-        return parse_vmess_link(url)
-    elif url.startswith('vless://'):
-        return parse_vless_link(url)
-    elif url.startswith('trojan://'):
-        return parse_trojan_link(url)
-    elif url.startswith('ss://'):
-        return parse_ss_link(url)
-    # 优先解析标准代理协议
-    elif url.startswith('socks5://') or url.startswith('http://') or url.startswith('https://'):
-        return parse_standard_proxy_link(url)
-    return None
\ No newline at end of file
+    cache = get_parse_cache()
+    if cache is not None:
+        try:
+            cached = cache.get(url)
+            if cached is TOMBSTONE:
+                return None
+            if cached is not None:
+                return cached
+        except Exception as e:
+            logger.debug(f"解析缓存读取失败: {e}")
+
+    node = _parse_uncached(url)
+    if cache is not None:
+        try:
+            cache.put(url, node)
+        except Exception as e:
+            logger.debug(f"解析缓存写入失败: {e}")
+    return node
+
+
+# ==================== 批量并行解析 ====================
+
+# 少于该数量的链接直接在当前进程解析（进程间传输的开销比解析本身还大）
+PARSE_POOL_MIN_LINKS = int(os.environ.get("PARSE_POOL_MIN_LINKS", "5000"))
+PARSE_CHUNK_SIZE = int(os.environ.get("PARSE_CHUNK_SIZE", "2000"))
+PARSE_WORKERS = int(os.environ.get("PARSE_WORKERS", "0")) or (os.cpu_count() or 1)
+
+_parse_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _parse_chunk(links: List[str]) -> Tuple[List[Optional[Dict[str, Any]]], Dict[str, int], Dict[str, int]]:
+    """
+    解析一组链接（在工作进程中执行，必须是模块级函数才能被 pickle；不访问解析缓存）
+
+    Returns:
+        (与输入顺序一致的结果, 各协议成功数, 各协议失败数)
+    """
+    results = []
+    parsed: Dict[str, int] = {}
+    errors: Dict[str, int] = {}
+    for url in links:
+        scheme = _split_scheme(url)
+        parser = SCHEME_PARSERS.get(scheme)
+        node = parser(url) if parser else None
+        results.append(node)
+        key = scheme if parser else 'unknown'
+        if node:
+            parsed[key] = parsed.get(key, 0) + 1
+        else:
+            errors[key] = errors.get(key, 0) + 1
+    return results, parsed, errors
+
+
+def _get_parse_pool() -> ProcessPoolExecutor:
+    global _parse_pool
+    if _parse_pool is None:
+        # spawn：不继承主进程的事件循环 / 线程锁状态
+        _parse_pool = ProcessPoolExecutor(
+            max_workers=PARSE_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _parse_pool
+
+
+def shutdown_parse_pool():
+    """关闭解析进程池（服务退出时调用）"""
+    global _parse_pool
+    if _parse_pool is not None:
+        _parse_pool.shutdown(wait=False, cancel_futures=True)
+        _parse_pool = None
+
+
+def parse_many(links: List[str], chunk_size: int = PARSE_CHUNK_SIZE, use_pool: Optional[bool] = None,
+               use_cache: bool = True) -> Tuple[List[Optional[Dict[str, Any]]], Dict[str, Any]]:
+    """
+    批量解析节点链接
+
+    先批量查询解析缓存，未命中的链接大批量时按 chunk_size 分块交给进程池并行解析，
+    解析结果（含失败墓碑）写回缓存。结果顺序与输入一致。
+
+    Args:
+        links: 节点链接列表
+        chunk_size: 每个任务块的链接数
+        use_pool: 是否使用进程池（默认按未命中链接数量自动决定）
+        use_cache: 是否使用解析缓存
+
+    Returns:
+        (解析结果列表（失败为 None）,
+         统计 {'total', 'parsed', 'failed', 'cache_hits', 'by_protocol', 'errors'})
+    """
+    links = [url.strip() for url in links]
+    results: List[Optional[Dict[str, Any]]] = [None] * len(links)
+    by_protocol: Dict[str, int] = {}
+    errors: Dict[str, int] = {}
+
+    # 1. 查询缓存
+    pending = list(range(len(links)))
+    cache = get_parse_cache() if use_cache else None
+    digests: List[bytes] = []
+    if cache is not None:
+        try:
+            digests = [link_digest(url) for url in links]
+            found = cache.get_many(digests)
+        except Exception as e:
+            logger.debug(f"解析缓存读取失败: {e}")
+            cache, found = None, {}
+        pending = []
+        used = set()
+        for i, digest in enumerate(digests):
+            cached = found.get(digest)
+            if cached is None:
+                pending.append(i)
+                continue
+            scheme = _split_scheme(links[i])
+            key = scheme if scheme in SCHEME_PARSERS else 'unknown'
+            if cached is TOMBSTONE:
+                errors[key] = errors.get(key, 0) + 1
+            else:
+                # 同一链接重复出现时各自持有独立的字典
+                results[i] = dict(cached) if digest in used else cached
+                used.add(digest)
+                by_protocol[key] = by_protocol.get(key, 0) + 1
+
+    # 2. 解析未命中的链接
+    miss_links = [links[i] for i in pending]
+    if use_pool is None:
+        use_pool = PARSE_WORKERS > 1 and len(miss_links) >= PARSE_POOL_MIN_LINKS
+
+    chunks = [miss_links[i:i + chunk_size] for i in range(0, len(miss_links), chunk_size)]
+    chunk_results = None
+    if use_pool and len(chunks) > 1:
+        try:
+            chunk_results = list(_get_parse_pool().map(_parse_chunk, chunks))
+        except Exception as e:
+            # 进程池损坏时重建，本次退回当前进程解析
+            logger.warning(f"⚠️ 并行解析失败 ({e})，退回单进程解析")
+            shutdown_parse_pool()
+    if chunk_results is None:
+        chunk_results = [_parse_chunk(chunk) for chunk in chunks]
+
+    parsed_nodes: List[Optional[Dict[str, Any]]] = []
+    for chunk_nodes, parsed, failed in chunk_results:
+        parsed_nodes.extend(chunk_nodes)
+        for proto, count in parsed.items():
+            by_protocol[proto] = by_protocol.get(proto, 0) + count
+        for proto, count in failed.items():
+            errors[proto] = errors.get(proto, 0) + count
+    for i, node in zip(pending, parsed_nodes):
+        results[i] = node
+
+    # 3. 写回缓存（失败的链接写入墓碑）
+    if cache is not None and pending:
+        try:
+            cache.put_many((digests[i], results[i]) for i in pending)
+        except Exception as e:
+            logger.debug(f"解析缓存写入失败: {e}")
+
+    parsed_total = sum(by_protocol.values())
+    stats = {
+        "total": len(links),
+        "parsed": parsed_total,
+        "failed": len(links) - parsed_total,
+        "cache_hits": len(links) - len(pending),
+        "by_protocol": by_protocol,
+        "errors": errors,
+    }
+    return results, stats
+
+
+async def parse_many_async(links: List[str], **kwargs) -> Tuple[List[Optional[Dict[str, Any]]], Dict[str, Any]]:
+    """parse_many 的异步包装：在线程中调度，不阻塞事件循环"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, lambda: parse_many(links, **kwargs))
\ No newline at end of file
@@ -7,6 +7,7 @@
 import asyncio
 import aiohttp
 import socket
+import ssl
 import time
 import logging
 from typing import Dict, List, Tuple, Optional
@@ -304,10 +305,11 @@ async def check_node_basic_availability(
         host = node.get('host')
         port = node.get('port')
         protocol = node.get('protocol', 'unknown').lower()
+        resolved_ips = node.get('resolved_ips')
         
-        # 第1层：TCP 连接测试
-        result.tcp_ok, result.tcp_latency_ms = await check_tcp_connectivity(
-            host, port, timeout=timeout_tcp
+        # 第1层：TCP 连接测试（已预解析的节点直接连 IP，逐个地址尝试）
+        result.tcp_ok, result.tcp_latency_ms = await check_any_address(
+            check_tcp_connectivity, resolved_ips or [host], port, timeout=timeout_tcp
         )
         
         if not result.tcp_ok:
@@ -315,8 +317,10 @@ async def check_node_basic_availability(
             result.level = AvailabilityLevel.DEAD
             return result
         
-        # 第2层：DNS 测试（仅对域名格式的主机）
-        if not _is_ip_address(host):
+        # 第2层：DNS 测试（仅对域名格式的主机；已预解析的不再查询）
+        if resolved_ips:
+            result.dns_ok = True
+        elif not _is_ip_address(host):
             result.dns_ok, result.dns_latency_ms = await check_dns_resolution(
                 host, timeout=timeout_tcp
             )
@@ -438,6 +442,152 @@ async def check_nodes_batch(
     return results
 
 
+# ==================== 预过滤：TCP / TLS 快速探测 ====================
+# 在启动 Clash / Xray 内核之前用大并发、短超时的 TCP 连接（TLS 节点再加一次
+# ClientHello）淘汰明显不可达的节点，只把存活者交给内核检测
+
+PREFILTER_MAX_CONCURRENT = 300
+PREFILTER_TIMEOUT = 3
+MAX_ADDRESS_ATTEMPTS = 3  # 预解析出多个地址时最多尝试的个数
+
+# 预过滤失败原因
+PREFILTER_TCP_FAILED = "tcp_failed"
+PREFILTER_TLS_FAILED = "tls_failed"
+PREFILTER_DNS_FAILED = "dns_failed"  # 批量 DNS 预解析得到 NXDOMAIN（dns_resolver）
+
+_PREFILTER_SSL_CONTEXT = ssl.create_default_context()
+_PREFILTER_SSL_CONTEXT.check_hostname = False
+_PREFILTER_SSL_CONTEXT.verify_mode = ssl.CERT_NONE
+
+
+def node_uses_tls(node: Dict) -> bool:
+    """节点的传输层是否为 TLS（vmess tls / vless tls、reality / trojan / https）"""
+    protocol = (node.get('protocol') or '').lower()
+    if protocol in ('trojan', 'https'):
+        return True
+    if protocol == 'vmess':
+        return (node.get('tls') or '').lower() == 'tls'
+    if protocol == 'vless':
+        return (node.get('security') or '').lower() in ('tls', 'reality')
+    return False
+
+
+async def check_tls_handshake(host: str, port: int, sni: Optional[str] = None,
+                              timeout: float = PREFILTER_TIMEOUT) -> Tuple[bool, int]:
+    """
+    TLS 握手测试（不校验证书）
+    服务器回应了 ClientHello（即使是 TLS 告警）就认为端口上有 TLS 服务；
+    超时、连接被重置或握手阶段直接断开视为失败
+    返回: (握手成功, 延迟ms)
+    """
+    start = time.time()
+    try:
+        _, writer = await asyncio.wait_for(
+            asyncio.open_connection(host, port, ssl=_PREFILTER_SSL_CONTEXT,
+                                    server_hostname=sni or host),
+            timeout=timeout
+        )
+    except ssl.SSLEOFError:
+        return False, 0
+    except ssl.SSLError:
+        # 收到了 TLS 告警（例如 SNI 不匹配），说明对端存活
+        return True, int((time.time() - start) * 1000)
+    except asyncio.TimeoutError:
+        return False, int(timeout * 1000)
+    except Exception as e:
+        logger.debug(f"TLS握手失败 {host}:{port} - {e}")
+        return False, 0
+
+    latency = int((time.time() - start) * 1000)
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except Exception:
+        pass
+    return True, latency
+
+
+async def check_any_address(check, addresses: List[str], port: int, **kwargs) -> Tuple[bool, int]:
+    """
+    依次对每个地址执行 check(地址, 端口, **kwargs)，第一个成功即返回
+
+    与 open_connection(域名) 逐个尝试解析结果的行为一致；最多尝试 MAX_ADDRESS_ATTEMPTS 个地址
+    """
+    ok, latency = False, 0
+    for address in addresses[:MAX_ADDRESS_ATTEMPTS]:
+        ok, latency = await check(address, port, **kwargs)
+        if ok:
+            break
+    return ok, latency
+
+
+async def prefilter_node(node: Dict, timeout: float = PREFILTER_TIMEOUT) -> Tuple[bool, int, Optional[str]]:
+    """
+    单个节点预过滤
+    返回: (通过, 延迟ms, 失败原因)
+    """
+    host = node.get('host')
+    port = node.get('port')
+    if not host or not port:
+        return False, 0, PREFILTER_TCP_FAILED
+    # 已批量预解析过的节点直接连 IP，不再重复解析（多个地址逐个尝试）
+    targets = node.get('resolved_ips') or [host]
+
+    if node_uses_tls(node):
+        sni = node.get('sni') or node.get('host_header') or host
+        ok, latency = await check_any_address(check_tls_handshake, targets, port, sni=sni, timeout=timeout)
+        return ok, latency, None if ok else PREFILTER_TLS_FAILED
+
+    ok, latency = await check_any_address(check_tcp_connectivity, targets, port, timeout=timeout)
+    return ok, latency, None if ok else PREFILTER_TCP_FAILED
+
+
+async def prefilter_nodes(
+    nodes: List[Dict],
+    max_concurrent: int = PREFILTER_MAX_CONCURRENT,
+    timeout: float = PREFILTER_TIMEOUT
+) -> Tuple[List[Dict], Dict]:
+    """
+    批量预过滤
+
+    通过的节点写入 tcp_latency_ms，失败的节点写入 prefilter_failure
+
+    返回: (存活节点列表（保持原顺序）, 统计信息)
+    """
+    start = time.time()
+    semaphore = asyncio.Semaphore(max_concurrent)
+
+    async def check_with_semaphore(node):
+        async with semaphore:
+            try:
+                return await prefilter_node(node, timeout=timeout)
+            except Exception as e:
+                logger.debug(f"预过滤异常 {node.get('host')}:{node.get('port')} - {e}")
+                return False, 0, PREFILTER_TCP_FAILED
+
+    results = await asyncio.gather(*[check_with_semaphore(node) for node in nodes])
+
+    survivors = []
+    stats = {
+        "total": len(nodes),
+        "passed": 0,
+        "tcp_failed": 0,
+        "tls_failed": 0,
+        "elapsed": 0.0,
+    }
+    for node, (ok, latency, reason) in zip(nodes, results):
+        if ok:
+            node['tcp_latency_ms'] = latency
+            node.pop('prefilter_failure', None)
+            survivors.append(node)
+            stats["passed"] += 1
+        else:
+            node['prefilter_failure'] = reason
+            stats[reason] += 1
+    stats["elapsed"] = round(time.time() - start, 2)
+    return survivors, stats
+
+
 # ==================== 工具函数 ====================
 
 def _is_ip_address(host: str) -> bool:
@@ -0,0 +1,103 @@
+# backend/app/modules/node_hunter/scan_diff.py
+"""
+扫描差异对比
+
+原先每个爬虫周期都把全部唯一节点送进 _add_nodes_to_queue，已检测过的节点每次都以
+「待重验」优先级重新入队，队列的变动量与节点总数成正比。
+这里保存上一代扫描结果（host:port -> 配置指纹 + 来源），与新一代对比：
+- new       上一代没有的节点 -> 入队
+- changed   同 host:port 但协议 / 凭据 / 传输配置变了 -> 重新入队（旧配置的检测结果作废）
+- unchanged 完全相同 -> 已在线或已在队列中的不再入队（已验证节点由定时快速重验负责），
+            其余（上次检测失败 / 已被移除）由调用方按重试优先级重新入队
+- vanished  本次成功抓取的源里不再出现 -> 交给轻量的 TCP/TLS 存活复查
+
+按源刷新时只抓取了部分源，只有来源属于本次成功抓取范围（scope）的节点才可能被判为消失。
+"""
+
+import hashlib
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .node_store import node_key
+
+# 参与指纹计算的字段（名称等展示字段变化不算配置变化）
+FINGERPRINT_FIELDS = (
+    "protocol", "host", "port", "uuid", "password", "username", "method", "alterId",
+    "network", "type", "security", "tls", "sni", "path", "host_header",
+)
+
+
+def node_fingerprint(node: Dict) -> int:
+    """节点配置指纹（64 位）"""
+    raw = "\x1f".join(str(node.get(f, "")) for f in FINGERPRINT_FIELDS)
+    return int.from_bytes(hashlib.blake2b(raw.encode("utf-8", "surrogatepass"), digest_size=8).digest(), "big")
+
+
+@dataclass
+class ScanDiff:
+    new: List[Dict] = field(default_factory=list)
+    changed: List[Dict] = field(default_factory=list)
+    unchanged: List[Dict] = field(default_factory=list)
+    vanished: List[str] = field(default_factory=list)
+
+    def summary(self) -> Dict[str, int]:
+        return {"new": len(self.new), "changed": len(self.changed),
+                "unchanged": len(self.unchanged), "vanished": len(self.vanished)}
+
+
+class ScanDiffer:
+    """保存上一代扫描结果并计算差异"""
+
+    def __init__(self):
+        # host:port -> (指纹, 来源序号)
+        self._generation: Dict[str, Tuple[int, int]] = {}
+        self._sources: List[str] = []
+        self._source_index: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._generation)
+
+    def _index_of(self, source: str) -> int:
+        index = self._source_index.get(source)
+        if index is None:
+            index = len(self._sources)
+            self._sources.append(source)
+            self._source_index[source] = index
+        return index
+
+    def diff(self, nodes: Iterable[Dict], scope: Optional[Set[str]] = None) -> ScanDiff:
+        """
+        对比并把新一代写入为当前代
+
+        Args:
+            nodes: 本次扫描得到的唯一节点
+            scope: 本次成功抓取的来源（node['source_url']，无来源的节点记为 ""）；
+                   None 表示不判断消失（例如从缓存加载）
+        """
+        result = ScanDiff()
+        generation = self._generation
+        seen = set()
+        for node in nodes:
+            key = node_key(node)
+            if key in seen:
+                continue
+            seen.add(key)
+            fingerprint = node_fingerprint(node)
+            previous = generation.get(key)
+            if previous is None:
+                result.new.append(node)
+            elif previous[0] != fingerprint:
+                result.changed.append(node)
+            else:
+                result.unchanged.append(node)
+            generation[key] = (fingerprint, self._index_of(node.get("source_url") or ""))
+
+        if scope is not None:
+            scope_ids = {self._source_index[s] for s in scope if s in self._source_index}
+            result.vanished = [
+                key for key, (_, source) in generation.items()
+                if source in scope_ids and key not in seen
+            ]
+            for key in result.vanished:
+                del generation[key]
+        return result
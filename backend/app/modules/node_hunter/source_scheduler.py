@@ -0,0 +1,101 @@
+# backend/app/modules/node_hunter/source_scheduler.py
+"""
+订阅源自适应刷新间隔
+
+原先所有源都随 6 小时一次的 node_scan_refresh 统一抓取，而各源实际更新频率差别很大
+（Epodonios 5 分钟、ebrasha 30 分钟、mahdibland 12 小时）。
+这里为每个源单独维护刷新间隔，按每次抓取的结果乘性调整：
+- 内容变化且带来新链接：间隔减半（更新快的源很快收敛到分钟级）
+- 内容变化但没有新链接：间隔略增
+- 内容未变化：间隔 ×1.5
+- 抓取失败：间隔翻倍
+间隔限制在 [SOURCE_REFRESH_MIN, SOURCE_REFRESH_MAX] 内，并加少量抖动避免各源同时到期。
+同时记录观测到的内容变化间隔（EMA），便于查看。
+
+状态直接存放在 SourceFetchService.source_stats 中，随源健康一起持久化。
+"""
+
+import os
+import random
+import time
+from typing import Dict, Iterable, List, Optional
+
+SOURCE_REFRESH_DEFAULT = int(os.environ.get("SOURCE_REFRESH_DEFAULT", "3600"))
+SOURCE_REFRESH_MIN = int(os.environ.get("SOURCE_REFRESH_MIN", "300"))
+SOURCE_REFRESH_MAX = int(os.environ.get("SOURCE_REFRESH_MAX", "86400"))
+
+SHRINK_FACTOR = 0.5        # 有新链接
+LOW_YIELD_FACTOR = 1.25    # 内容变了但没有新链接
+STATIC_FACTOR = 1.5        # 内容未变化
+FAILURE_FACTOR = 2.0       # 抓取失败
+JITTER = 0.1
+CHANGE_EMA_ALPHA = 0.3
+
+
+class SourceRefreshScheduler:
+    """按源计算下次抓取时间"""
+
+    def __init__(self, source_stats: Dict[str, Dict]):
+        self.source_stats = source_stats
+
+    def _stats(self, url: str) -> Dict:
+        return self.source_stats.setdefault(url, {"is_disabled": False, "disabled_at": 0, "retry_fails": 0})
+
+    def interval(self, url: str) -> float:
+        return self._stats(url).get("refresh_interval", SOURCE_REFRESH_DEFAULT)
+
+    def due_sources(self, urls: Iterable[str], now: Optional[float] = None) -> List[str]:
+        """已到期的源（从未抓取过的源视为到期）"""
+        now = time.time() if now is None else now
+        return [url for url in urls if self._stats(url).get("next_due", 0) <= now]
+
+    def record(self, url: str, success: bool, changed: bool = False, new_links: int = 0,
+               now: Optional[float] = None):
+        """
+        记录一次抓取结果并安排下次抓取
+
+        Args:
+            success: 是否抓取成功
+            changed: 内容哈希是否与上次不同
+            new_links: 相比上次该源的链接列表新增的链接数
+        """
+        now = time.time() if now is None else now
+        stats = self._stats(url)
+        interval = stats.get("refresh_interval", SOURCE_REFRESH_DEFAULT)
+
+        if not success:
+            interval *= FAILURE_FACTOR
+        elif changed:
+            last_changed = stats.get("last_changed")
+            if last_changed:
+                observed = now - last_changed
+                ema = stats.get("change_interval")
+                stats["change_interval"] = round(
+                    observed if ema is None else ema + CHANGE_EMA_ALPHA * (observed - ema)
+                )
+            stats["last_changed"] = now
+            interval *= SHRINK_FACTOR if new_links > 0 else LOW_YIELD_FACTOR
+        else:
+            interval *= STATIC_FACTOR
+
+        interval = min(SOURCE_REFRESH_MAX, max(SOURCE_REFRESH_MIN, interval))
+        stats["refresh_interval"] = round(interval)
+        stats["last_yield"] = new_links
+        stats["next_due"] = now + interval * random.uniform(1 - JITTER, 1 + JITTER)
+
+    def snapshot(self, urls: Iterable[str], now: Optional[float] = None) -> List[Dict]:
+        """各源刷新计划（用于接口展示）"""
+        now = time.time() if now is None else now
+        plan = []
+        for url in urls:
+            stats = self._stats(url)
+            next_due = stats.get("next_due", 0)
+            plan.append({
+                "url": url,
+                "interval": stats.get("refresh_interval", SOURCE_REFRESH_DEFAULT),
+                "change_interval": stats.get("change_interval"),
+                "last_yield": stats.get("last_yield"),
+                "due_in": max(0, round(next_due - now)),
+                "disabled": stats.get("is_disabled", False),
+            })
+        return sorted(plan, key=lambda item: item["due_in"])
@@ -0,0 +1,106 @@
+# backend/app/modules/node_hunter/ttl_cache.py
+"""
+有界 TTL 缓存
+
+IP -> 国家、域名 -> IP、域名 -> 国家这几类查询结果原先存在普通 dict 里，
+永不过期也没有上限，节点持续更替，服务运行几天后内存一直上涨。
+这里统一使用：
+- 容量上限，超出时按最近最少使用（LRU）淘汰
+- 每个条目单独过期（TTL）
+- 负缓存：查询失败记为 None，用较短的 TTL 缓存，避免对同一个失败目标反复查询
+- 命中 / 未命中 / 淘汰 / 过期计数，供 /nodes/stats 展示缓存效果
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+# get() 未命中时的默认返回值（与缓存的 None / 负缓存区分）
+MISSING = object()
+
+
+class TTLCache:
+    """容量有限、条目过期的 LRU 缓存（单线程 / 事件循环内使用）"""
+
+    def __init__(self, max_size: int = 10000, ttl: float = 3600, negative_ttl: float = 300):
+        self.max_size = max(1, max_size)
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        # key -> (过期时间, 值)；顺序即最近使用顺序，最旧的在最前
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        entry = self._data.get(key)
+        return entry is not None and entry[0] > time.monotonic()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        读取缓存；负缓存条目返回 None
+
+        需要区分「未缓存」与「缓存了失败结果」时传 default=MISSING
+        """
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.expirations += 1
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        if value is None:
+            self.negative_hits += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """写入缓存；value 为 None 时作为负缓存（默认使用 negative_ttl）"""
+        if ttl is None:
+            ttl = self.negative_ttl if value is None else self.ttl
+        data = self._data
+        if key in data:
+            data.move_to_end(key)
+        data[key] = (time.monotonic() + ttl, value)
+        while len(data) > self.max_size:
+            data.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def purge_expired(self) -> int:
+        """清理所有已过期的条目，返回清理数量"""
+        now = time.monotonic()
+        expired = [key for key, (expires_at, _) in self._data.items() if expires_at <= now]
+        for key in expired:
+            del self._data[key]
+        self.expirations += len(expired)
+        return len(expired)
+
+    def clear(self):
+        self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.negative_hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": round((self.hits + self.negative_hits) / lookups, 3) if lookups else None,
+        }
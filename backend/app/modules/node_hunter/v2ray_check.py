@@ -11,12 +11,24 @@ import tempfile
 import os
 import httpx
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional
 from dataclasses import dataclass
 import logging
 
+from .core_readiness import (
+    CoreExitedError,
+    CoreStartupError,
+    allocate_free_ports,
+    find_free_port,
+    wait_for_port,
+    wait_for_ports,
+)
+
 logger = logging.getLogger(__name__)
 
+# 批量模式下单个 Xray 进程承载的节点数
+XRAY_BATCH_SIZE = int(os.environ.get("XRAY_BATCH_SIZE", "50"))
+
 
 @dataclass
 class V2RayCheckResult:
@@ -25,6 +37,11 @@ class V2RayCheckResult:
     latency_ms: Optional[int] = None
     error_message: Optional[str] = None
     protocol: Optional[str] = None
+    failure_reason: Optional[str] = None  # 内核启动类失败的分类（见 core_readiness）
+
+
+# 流式结果回调：on_result(输入下标, 结果)，每个节点一出结果就调用
+ResultCallback = Callable[[int, V2RayCheckResult], None]
 
 
 class V2RayChecker:
@@ -109,6 +126,45 @@ class V2RayChecker:
         
         return config
     
+    def generate_v2ray_batch_config(self, nodes: List[Dict], ports: List[int]) -> Dict:
+        """
+        生成批量检测配置：N 个 HTTP 入站，每个入站按 tag 路由到各自的出站
+
+        Args:
+            nodes: 节点配置列表（Clash 格式）
+            ports: 与节点一一对应的监听端口
+
+        Returns:
+            V2Ray 配置字典
+        """
+        inbounds, outbounds, rules = [], [], []
+        for i, (node, port) in enumerate(zip(nodes, ports)):
+            inbounds.append({
+                "port": port,
+                "listen": "127.0.0.1",
+                "protocol": "http",
+                "settings": {"timeout": 300},
+                "tag": f"http-in-{i}"
+            })
+            outbounds.append({
+                "protocol": node.get("type", "vmess"),
+                "settings": self._build_outbound_settings(node),
+                "streamSettings": self._build_stream_settings(node),
+                "tag": f"proxy-out-{i}"
+            })
+            rules.append({
+                "type": "field",
+                "inboundTag": [f"http-in-{i}"],
+                "outboundTag": f"proxy-out-{i}"
+            })
+
+        return {
+            "inbounds": inbounds,
+            "outbounds": outbounds,
+            "routing": {"rules": rules},
+            "log": {"loglevel": "error"}
+        }
+
     def _build_outbound_settings(self, node: Dict) -> Dict:
         """构建出站设置"""
         protocol = node.get("type", "vmess").lower()
@@ -205,8 +261,8 @@ class V2RayChecker:
             检测结果
         """
         if port is None:
-            import random
-            port = random.randint(10000, 20000)
+            # 申请空闲端口，避免随机端口被占用时误判为内核已就绪
+            port = find_free_port()
         
         # 创建临时配置文件
         with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
@@ -224,8 +280,16 @@ class V2RayChecker:
                 stderr=asyncio.subprocess.DEVNULL
             )
             
-            # 等待 V2Ray 启动（可能较慢）
-            await asyncio.sleep(5)  # 增加到 5 秒，给 Xray 更多启动时间
+            # 等待 Xray 监听端口就绪（进程提前退出则直接判定失败，不做探测）
+            try:
+                await wait_for_port(process, port, timeout=self.timeout, name="xray")
+            except CoreStartupError as e:
+                return V2RayCheckResult(
+                    is_available=False,
+                    error_message=str(e),
+                    protocol=node.get("type", "unknown"),
+                    failure_reason=e.failure_reason
+                )
             
             # 测试连接
             start_time = asyncio.get_event_loop().time()
@@ -286,6 +350,173 @@ class V2RayChecker:
             except:
                 pass
 
+    async def _probe_port(self, port: int, node: Dict) -> V2RayCheckResult:
+        """通过本地 HTTP 入站测试对应节点"""
+        start_time = asyncio.get_event_loop().time()
+        try:
+            async with httpx.AsyncClient(
+                proxy=f"http://127.0.0.1:{port}",
+                timeout=10,
+                follow_redirects=False,
+                verify=False
+            ) as client:
+                response = await client.get(self.test_url)
+
+            elapsed_ms = int((asyncio.get_event_loop().time() - start_time) * 1000)
+
+            if response.status_code in [204, 200]:
+                return V2RayCheckResult(
+                    is_available=True,
+                    latency_ms=elapsed_ms,
+                    protocol=node.get("type", "unknown")
+                )
+            return V2RayCheckResult(
+                is_available=False,
+                error_message=f"HTTP {response.status_code}",
+                protocol=node.get("type", "unknown")
+            )
+        except (asyncio.TimeoutError, httpx.TimeoutException):
+            return V2RayCheckResult(
+                is_available=False,
+                error_message="连接超时",
+                protocol=node.get("type", "unknown")
+            )
+        except Exception as e:
+            return V2RayCheckResult(
+                is_available=False,
+                error_message=f"测试异常: {str(e)[:50]}",
+                protocol=node.get("type", "unknown")
+            )
+
+    async def test_nodes_batch_with_v2ray(self, nodes: List[Dict], probe_concurrency: int = 20,
+                                          on_result: Optional[ResultCallback] = None,
+                                          offset: int = 0) -> List[V2RayCheckResult]:
+        """
+        使用单个 Xray 进程批量测试多个节点
+
+        所有节点写入同一份配置（每个节点独立入站/出站），只启动一次进程。
+        如果整批配置导致 Xray 启动失败，二分拆分重试，直到定位出坏节点。
+
+        Args:
+            nodes: 节点配置列表（Clash 格式）
+            probe_concurrency: 批内并发探测数
+            on_result: 流式结果回调
+            offset: 本批第一个节点在整体输入中的下标（用于 on_result）
+
+        Returns:
+            与输入顺序一致的检测结果
+        """
+        if not nodes:
+            return []
+
+        def emit_all(results: List[V2RayCheckResult]) -> List[V2RayCheckResult]:
+            if on_result:
+                for i, result in enumerate(results):
+                    on_result(offset + i, result)
+            return results
+
+        # 先逐个校验出站配置：格式有问题的节点直接判失败，不拖累同批其它节点
+        invalid: Dict[int, V2RayCheckResult] = {}
+        for i, node in enumerate(nodes):
+            try:
+                self._build_outbound_settings(node)
+                self._build_stream_settings(node)
+            except Exception as e:
+                invalid[i] = V2RayCheckResult(
+                    is_available=False,
+                    error_message=f"配置无效: {str(e)[:50]}",
+                    protocol=node.get("type", "unknown")
+                )
+        if invalid:
+            valid_indices = [i for i in range(len(nodes)) if i not in invalid]
+            for i, result in invalid.items():
+                if on_result:
+                    on_result(offset + i, result)
+
+            def remap(index: int, result: V2RayCheckResult):
+                on_result(offset + valid_indices[index], result)
+
+            valid_results = await self.test_nodes_batch_with_v2ray(
+                [nodes[i] for i in valid_indices], probe_concurrency,
+                remap if on_result else None, 0)
+            merged = dict(invalid)
+            merged.update(zip(valid_indices, valid_results))
+            return [merged[i] for i in range(len(nodes))]
+
+        process = None
+        config_path = None
+        try:
+            ports = allocate_free_ports(len(nodes))
+            with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
+                json.dump(self.generate_v2ray_batch_config(nodes, ports), f)
+                config_path = f.name
+
+            process = await asyncio.create_subprocess_exec(
+                str(self.v2ray_path),
+                "run", "-c", config_path,
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.DEVNULL
+            )
+
+            try:
+                await wait_for_ports(process, ports, timeout=self.timeout, name="xray")
+            except CoreExitedError as e:
+                # 整批启动失败：单节点直接判定，多节点二分隔离
+                if len(nodes) == 1:
+                    return emit_all([V2RayCheckResult(
+                        is_available=False,
+                        error_message=f"启动异常: {e}",
+                        protocol=nodes[0].get("type", "unknown"),
+                        failure_reason=e.failure_reason
+                    )])
+                logger.debug(f"Xray 批量配置启动失败，拆分 {len(nodes)} 个节点重试")
+                mid = len(nodes) // 2
+                left = await self.test_nodes_batch_with_v2ray(
+                    nodes[:mid], probe_concurrency, on_result, offset)
+                right = await self.test_nodes_batch_with_v2ray(
+                    nodes[mid:], probe_concurrency, on_result, offset + mid)
+                return left + right
+            except CoreStartupError as e:
+                return emit_all([V2RayCheckResult(
+                    is_available=False,
+                    error_message=str(e),
+                    protocol=node.get("type", "unknown"),
+                    failure_reason=e.failure_reason
+                ) for node in nodes])
+
+            semaphore = asyncio.Semaphore(probe_concurrency)
+
+            async def probe(index: int, port: int, node: Dict) -> V2RayCheckResult:
+                async with semaphore:
+                    result = await self._probe_port(port, node)
+                if on_result:
+                    on_result(offset + index, result)
+                return result
+
+            return await asyncio.gather(*[
+                probe(i, p, n) for i, (p, n) in enumerate(zip(ports, nodes))
+            ])
+
+        except Exception as e:
+            return emit_all([V2RayCheckResult(
+                is_available=False,
+                error_message=f"启动异常: {str(e)[:50]}",
+                protocol=node.get("type", "unknown")
+            ) for node in nodes])
+        finally:
+            if process and process.returncode is None:
+                try:
+                    process.terminate()
+                    await asyncio.wait_for(process.wait(), timeout=2)
+                except:
+                    process.kill()
+
+            if config_path:
+                try:
+                    os.unlink(config_path)
+                except:
+                    pass
+
 
 async def check_node_v2ray(node: Dict) -> V2RayCheckResult:
     """便捷函数：检测单个节点"""
@@ -300,17 +531,52 @@ async def check_node_v2ray(node: Dict) -> V2RayCheckResult:
         )
 
 
-async def check_nodes_v2ray(nodes: List[Dict], max_concurrent: int = 3) -> List[V2RayCheckResult]:
-    """便捷函数：批量检测节点（并发数较低因为 V2Ray 启动较慢）"""
+async def check_nodes_v2ray(nodes: List[Dict], max_concurrent: int = 3,
+                            batch_size: int = XRAY_BATCH_SIZE,
+                            on_result: Optional[ResultCallback] = None) -> List[V2RayCheckResult]:
+    """
+    便捷函数：批量检测节点
+
+    默认使用批量模式：每 batch_size 个节点共用一个 Xray 进程，max_concurrent
+    限制同时运行的 Xray 进程数。batch_size <= 1 时退回逐节点启动进程。
+    on_result 为流式结果回调，每个节点一出结果就调用 on_result(下标, 结果)。
+    """
     try:
         checker = V2RayChecker()
         semaphore = asyncio.Semaphore(max_concurrent)
-        
-        async def check_with_semaphore(node):
+
+        if batch_size > 1:
+            batches = [(i, nodes[i:i + batch_size]) for i in range(0, len(nodes), batch_size)]
+
+            async def check_batch_with_semaphore(offset, batch):
+                async with semaphore:
+                    return await checker.test_nodes_batch_with_v2ray(
+                        batch, on_result=on_result, offset=offset)
+
+            batch_results = await asyncio.gather(
+                *[check_batch_with_semaphore(o, b) for o, b in batches], return_exceptions=True
+            )
+            final_results = []
+            for (_, batch), results in zip(batches, batch_results):
+                if isinstance(results, BaseException):
+                    # 单批异常只影响本批，其余批次的结果照常返回
+                    logger.warning(f"Xray 批量检测异常 ({len(batch)} 个节点): {results}")
+                    results = [V2RayCheckResult(
+                        is_available=False,
+                        error_message=f"检测异常: {str(results)[:50]}",
+                        protocol=node.get("type", "unknown")
+                    ) for node in batch]
+                final_results.extend(results)
+            return final_results
+
+        async def check_with_semaphore(index, node):
             async with semaphore:
-                return await checker.test_node_with_v2ray(node)
+                result = await checker.test_node_with_v2ray(node)
+            if on_result:
+                on_result(index, result)
+            return result
         
-        tasks = [check_with_semaphore(node) for node in nodes]
+        tasks = [check_with_semaphore(i, node) for i, node in enumerate(nodes)]
         results = await asyncio.gather(*tasks, return_exceptions=True)
         
         final_results = []
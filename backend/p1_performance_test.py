@@ -9,12 +9,15 @@ P1性能诊断脚本
 import sys
 import time
 import json
+import random
+import re
 from pathlib import Path
 
 # 添加模块路径
 sys.path.insert(0, str(Path(__file__).parent))
 
 from app.modules.node_hunter.geolocation_helper import GeolocationHelper
+from app.modules.node_hunter.country_matcher import match_country, match_countries
 
 def test_country_detection():
     """测试国家识别功能"""
@@ -154,5 +157,179 @@ def test_country_detection():
   3️⃣ 整体扫描时间 (vs P0之前的耗时对比)
 """)
 
+# ===== 旧实现（node_hunter._guess_country_from_name + NAME_TO_CODE，已被 country_matcher 取代）=====
+# 原样保留作为对照基准
+_LEGACY_COUNTRY_PATTERNS = [
+    # 亚洲
+    ('CN', ['CN', 'CHINA', '中国', '回国', 'BEIJING', 'SHANGHAI', 'SHENZHEN', 'CHONGQING', 'HANGZHOU', 'WUHAN', 'CHENG', 'XIAN', 'SICHUAN', 'JIANGSU', 'GUANGDONG']),
+    ('HK', ['HK', 'HONG KONG', 'HONGKONG', '香港', 'HKG']),
+    ('TW', ['TW', 'TAIWAN', 'TAIPEI', '台湾', 'TPE']),
+    ('JP', ['JP', 'JAPAN', '日本', 'TOKYO', 'OSAKA', 'YOKOHAMA', 'KOBE', 'TYO', 'NRT', 'KIX']),
+    ('SG', ['SG', 'SINGAPORE', '新加坡', 'SIN']),
+    ('KR', ['KR', 'KOREA', '韩国', 'SEOUL', 'BUSAN', 'ICN', 'PUS']),
+    ('TH', ['TH', 'THAILAND', '泰国', 'BANGKOK', 'BKK']),
+    ('MY', ['MY', 'MALAYSIA', '马来西亚', 'KUALA LUMPUR', 'KUL']),
+    ('PH', ['PH', 'PHILIPPINES', '菲律宾', 'MANILA', 'MNL']),
+    ('VN', ['VN', 'VIETNAM', '越南', 'HANOI', 'HO CHI MINH', 'HAN', 'SGN']),
+    ('ID', ['ID', 'INDONESIA', '印尼', 'JAKARTA', 'CGK']),
+    ('IN', ['IN', 'INDIA', '印度', 'DELHI', 'BOMBAY', 'MUMBAI', 'BANGALORE', 'DEL', 'BOM']),
+    ('PK', ['PK', 'PAKISTAN', '巴基斯坦', 'ISLAMABAD', 'KARACHI']),
+    ('BD', ['BD', 'BANGLADESH', '孟加拉', 'DHAKA']),
+    ('LK', ['LK', 'SRI LANKA', '斯里兰卡', 'COLOMBO', 'CMB']),
+    # 中东
+    ('TR', ['TR', 'TURKEY', '土耳其', 'ISTANBUL', 'ANKARA', 'IST']),
+    ('AE', ['AE', 'UAE', 'UNITED ARAB EMIRATES', '阿联酋', 'DUBAI', 'ABU DHABI', 'DXB']),
+    ('SA', ['SA', 'SAUDI ARABIA', '沙特', 'RIYADH', 'JEDDAH', 'RUH']),
+    ('IL', ['IL', 'ISRAEL', '以色列', 'TEL AVIV', 'JERUSALEM', 'TLV']),
+    ('JO', ['JO', 'JORDAN', '约旦', 'AMMAN', 'AMM']),
+    # 欧洲
+    ('GB', ['GB', 'UK', 'UNITED KINGDOM', '英国', 'LONDON', 'MANCHESTER', 'EDINBURGH', 'LHR', 'LGW']),
+    ('DE', ['DE', 'GERMANY', '德国', 'FRANKFURT', 'BERLIN', 'MUNICH', 'HAMBURG', 'FRA', 'BER']),
+    ('FR', ['FR', 'FRANCE', '法国', 'PARIS', 'LYON', 'MARSEILLE', 'CDG', 'ORY']),
+    ('IT', ['IT', 'ITALY', '意大利', 'MILAN', 'ROME', 'VENICE', 'MXP', 'FCO']),
+    ('ES', ['ES', 'SPAIN', '西班牙', 'MADRID', 'BARCELONA', 'VALENCIA', 'MAD', 'BCN']),
+    ('NL', ['NL', 'NETHERLANDS', '荷兰', 'AMSTERDAM', 'ROTTERDAM', 'AMS']),
+    ('BE', ['BE', 'BELGIUM', '比利时', 'BRUSSELS', 'ANTWERP', 'BRU']),
+    ('PT', ['PT', 'PORTUGAL', '葡萄牙', 'LISBON', 'PORTO', 'LIS']),
+    ('PL', ['PL', 'POLAND', '波兰', 'WARSAW', 'KRAKOW', 'WAW']),
+    ('SE', ['SE', 'SWEDEN', '瑞典', 'STOCKHOLM', 'STOCKHOLM', 'ARN']),
+    ('NO', ['NO', 'NORWAY', '挪威', 'OSLO', 'OSLO', 'OSL']),
+    ('DK', ['DK', 'DENMARK', '丹麦', 'COPENHAGEN', 'CPH']),
+    ('FI', ['FI', 'FINLAND', '芬兰', 'HELSINKI', 'HEL']),
+    ('CH', ['CH', 'SWITZERLAND', '瑞士', 'ZURICH', 'GENEVA', 'ZRH']),
+    ('AT', ['AT', 'AUSTRIA', '奥地利', 'VIENNA', 'VIENNA', 'VIE']),
+    ('CZ', ['CZ', 'CZECH', 'CZECHOSLOVAKIA', '捷克', 'PRAGUE', 'PRG']),
+    ('HU', ['HU', 'HUNGARY', '匈牙利', 'BUDAPEST', 'BUD']),
+    ('RO', ['RO', 'ROMANIA', '罗马尼亚', 'BUCHAREST', 'BUH']),
+    ('GR', ['GR', 'GREECE', '希腊', 'ATHENS', 'THESSALONIKI', 'ATH']),
+    ('RU', ['RU', 'RUSSIA', '俄罗斯', 'MOSCOW', 'ST PETERSBURG', 'VLADIVOSTOK', 'SVO', 'LED']),
+    ('UA', ['UA', 'UKRAINE', '乌克兰', 'KYIV', 'KHARKIV', 'KBP']),
+    ('BG', ['BG', 'BULGARIA', '保加利亚', 'SOFIA', 'SOF']),
+    # 北美
+    ('US', ['US', 'USA', 'AMERICA', 'UNITED STATES', '美国', 'NEW YORK', 'LOS ANGELES', 'CHICAGO', 'DALLAS', 'SEATTLE', 'MIAMI', 'DENVER', 'SFO', 'LAX', 'JFK', 'ORD', 'DFW']),
+    ('CA', ['CA', 'CANADA', '加拿大', 'TORONTO', 'VANCOUVER', 'MONTREAL', 'CALGARY', 'YYZ', 'YVR']),
+    ('MX', ['MX', 'MEXICO', '墨西哥', 'MEXICO CITY', 'MEX']),
+    # 南美
+    ('BR', ['BR', 'BRAZIL', '巴西', 'SAO PAULO', 'RIO DE JANEIRO', 'GIG', 'GRU']),
+    ('AR', ['AR', 'ARGENTINA', '阿根廷', 'BUENOS AIRES', 'AEP']),
+    ('CL', ['CL', 'CHILE', '智利', 'SANTIAGO', 'SCL']),
+    ('CO', ['CO', 'COLOMBIA', '哥伦比亚', 'BOGOTA', 'BOG']),
+    ('PE', ['PE', 'PERU', '秘鲁', 'LIMA', 'LIM']),
+    ('VE', ['VE', 'VENEZUELA', '委内瑞拉', 'CARACAS', 'CCS']),
+    # 大洋洲
+    ('AU', ['AU', 'AUSTRALIA', '澳洲', 'SYDNEY', 'MELBOURNE', 'BRISBANE', 'SYD', 'MEL']),
+    ('NZ', ['NZ', 'NEW ZEALAND', '新西兰', 'AUCKLAND', 'WELLINGTON', 'AKL']),
+    # 非洲
+    ('ZA', ['ZA', 'SOUTH AFRICA', '南非', 'JOHANNESBURG', 'CAPE TOWN', 'JNB']),
+    ('EG', ['EG', 'EGYPT', '埃及', 'CAIRO', 'ALEXANDRIA', 'CAI']),
+    ('NG', ['NG', 'NIGERIA', '尼日利亚', 'LAGOS', 'LOS']),
+]
+# 旧 NAME_TO_CODE 里出现过的国家代码（旧实现的两字母代码兜底只用到这些值）
+_LEGACY_NAME_TO_CODE_VALUES = frozenset({
+    "AE", "AR", "AT", "AU", "BD", "BE", "BG", "BR", "CA", "CH", "CL", "CN", "CO", "CZ", "DE",
+    "DK", "EG", "ES", "FI", "FR", "GB", "GR", "HK", "HU", "ID", "IL", "IN", "IT", "JO", "JP",
+    "KR", "LK", "MO", "MX", "MY", "NG", "NL", "NO", "NZ", "PE", "PH", "PK", "PL", "PT", "RO",
+    "RU", "SA", "SE", "SG", "TH", "TR", "TW", "UA", "US", "VE", "VN", "ZA"
+})
+
+
+def _legacy_guess_country(name):
+    """旧实现：按国家逐个关键词做子串查找，最后兜底匹配括号 / 横线包围的两字母代码"""
+    if not name: return None
+    upper_name = name.upper()
+    for country, keywords in _LEGACY_COUNTRY_PATTERNS:
+        for keyword in keywords:
+            if keyword in upper_name:
+                return country
+    codes_match = re.findall(r'[(\-\s]([A-Z]{2})[\)\-\s\:]', f'-{upper_name}-')
+    if codes_match and codes_match[0] in _LEGACY_NAME_TO_CODE_VALUES:
+        return codes_match[0]
+    return None
+
+
+# 带标注的识别准确率样本：(节点名称, 期望国家，None 表示名称里没有国家信息)
+LABELLED_NAMES = [
+    ('🇺🇸 US-01 | VIP', 'US'),
+    ('🇯🇵 日本 Tokyo 03', 'JP'),
+    ('香港 HK12 专线', 'HK'),
+    ('Germany Frankfurt IPLC-7', 'DE'),
+    ('SINGAPORE-004', 'SG'),
+    ('KR Seoul BGP 5', 'KR'),
+    ('🇷🇺 Moscow Netflix', 'RU'),
+    ('Los Angeles 9 ChatGPT', 'US'),
+    ('台湾 TPE 家宽', 'TW'),
+    ('UK London 02', 'GB'),
+    ('Amsterdam | NL', 'NL'),
+    ('Canada Toronto', 'CA'),
+    ('Sydney AU 1Gbps', 'AU'),
+    ('[TR] Istanbul', 'TR'),
+    ('Dubai (AE)', 'AE'),
+    ('回国 上海电信', 'CN'),
+    ('vmess-Node-17', None),
+    ('server3.example.com', None),
+    ('@channel_88 免费节点', None),
+    ('Relay #12 Netflix', None),
+    ('FAST-Premium-Node', None),
+    ('TG@proxy Relay #4', None),
+    ('Github Mirror 7', None),
+    ('Premium SSR 1', None),
+    ('US No.1', 'US'),
+    ('US|SIN', 'US'),
+    ('Los-Angeles 01', 'US'),
+    ('Server No.3', None),
+]
+
+
+def test_matcher_accuracy():
+    """在带标注样本上对比旧实现与 country_matcher 的识别结果"""
+    print("\n" + "="*80)
+    print("🧪 P1 性能诊断: 国家识别准确率（带标注样本）")
+    print("="*80)
+
+    for label, guess in (("旧实现 _guess_country_from_name", _legacy_guess_country),
+                         ("country_matcher.match_country", match_country)):
+        wrong = [(name, expected, guess(name)) for name, expected in LABELLED_NAMES if guess(name) != expected]
+        correct = len(LABELLED_NAMES) - len(wrong)
+        print(f"   {label:34} 正确 {correct}/{len(LABELLED_NAMES)} ({correct/len(LABELLED_NAMES)*100:.1f}%)")
+        for name, expected, got in wrong:
+            print(f"      ✗ {name!r:32} 期望 {expected}  实际 {got}")
+
+
+def test_matcher_throughput(total=20000):
+    """国家识别吞吐量基准：旧实现 vs 编译后的单次扫描 vs 批量接口（名称互不相同，不受记忆化影响）"""
+    print("\n" + "="*80)
+    print("🧪 P1 性能诊断: 国家识别吞吐量")
+    print("="*80)
+
+    random.seed(42)
+    templates = [
+        '🇺🇸 US-{n} | {tag}', '🇯🇵 日本 Tokyo {n:02d}', '香港 HK{n} 专线', 'vmess-Node-{n}',
+        'Germany Frankfurt {tag}-{n}', 'SINGAPORE-{n:03d}', '{tag} Relay #{n}', 'Los Angeles {n} {tag}',
+        '@channel_{n} 免费节点', 'KR Seoul BGP {n}', '🇷🇺 Moscow {tag} {n}', 'server{n}.example.com',
+    ]
+    tags = ['VIP', 'IPLC', 'x2', 'Netflix', 'ChatGPT', 'TG@proxy', '1Gbps']
+    names = [random.choice(templates).format(n=i, tag=random.choice(tags)) for i in range(total)]
+    assert len(set(names)) == len(names)
+
+    results = {}
+    for label, run in (
+        ("旧实现 _guess_country_from_name", lambda: [_legacy_guess_country(n) for n in names]),
+        ("单次扫描 match_country", lambda: [match_country(n) for n in names]),
+        ("批量接口 match_countries", lambda: match_countries(names)),
+    ):
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        results[label] = elapsed
+        print(f"   {label:34} {elapsed*1000:9.1f}ms  {total/elapsed:12,.0f} 名称/秒")
+
+    baseline = results["旧实现 _guess_country_from_name"]
+    print(f"\n📈 单次扫描加速: {baseline/results['单次扫描 match_country']:.1f}x, "
+          f"批量接口加速: {baseline/results['批量接口 match_countries']:.1f}x "
+          f"({total} 个互不相同的名称；识别是否正确见上面的准确率样本)")
+
+
 if __name__ == '__main__':
     test_country_detection()
+    test_matcher_accuracy()
+    test_matcher_throughput()
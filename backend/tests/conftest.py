@@ -0,0 +1,6 @@
+# backend/tests/conftest.py
+import sys
+from pathlib import Path
+
+# 测试以 backend 为根目录导入 app.*
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,51 @@
+# backend/tests/test_country_matcher.py
+import pytest
+
+from app.modules.node_hunter.country_matcher import CountryMatcher, compile_keywords, match_countries, match_country
+
+
+@pytest.mark.parametrize("name, expected", [
+    # 国旗优先于其他任何关键词
+    ("🇯🇵 US-01", "JP"),
+    ("香港 US", "HK"),
+    # 同档取最靠左的命中
+    ("US No.1", "US"),
+    ("US|SIN", "US"),
+    ("HK|JP", "HK"),
+    # 多词名称的连字符 / 下划线 / 无空格写法
+    ("Los-Angeles 01", "US"),
+    ("Los_Angeles 01", "US"),
+    ("LosAngeles", "US"),
+    ("Hong-Kong 02", "HK"),
+    # 短代码前后不能紧挨字母
+    ("SINGAPORE-004", "SG"),
+    ("BUSAN KR", "KR"),
+    ("Canada Toronto", "CA"),
+    ("vmess-Node-17", None),
+    # 与英文单词冲突的代码不单独识别，国名仍可识别
+    ("Server No.3", None),
+    ("IT 01", None),
+    ("Norway 1", "NO"),
+    ("🇮🇳 Mumbai", "IN"),
+    ("", None),
+])
+def test_match_country(name, expected):
+    assert match_country(name) == expected
+
+
+def test_match_many_matches_single():
+    names = ["US No.1", "香港 HK12", "US No.1", "Relay #4", "Tokyo 3"]
+    assert match_countries(names) == [match_country(n) for n in names]
+
+
+def test_duplicate_keyword_keeps_first_country():
+    matcher = CountryMatcher([("AA", ["SHARED NAME"]), ("BB", ["SHARED NAME", "BB"])])
+    assert matcher.match("shared-name 1") == "AA"
+    assert matcher.match("BB 1") == "BB"
+
+
+def test_compile_keywords_matches_any():
+    regex = compile_keywords(["TRIAL", "TRIANGLE", "FREE"])
+    assert regex.search("A TRIANGLE").group() == "TRIANGLE"
+    assert regex.search("TRIAL RUN").group() == "TRIAL"
+    assert regex.search("PAID") is None
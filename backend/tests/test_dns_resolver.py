@@ -0,0 +1,117 @@
+# backend/tests/test_dns_resolver.py
+import asyncio
+import time
+
+import pytest
+
+from app.modules.node_hunter import dns_resolver
+from app.modules.node_hunter.dns_resolver import (
+    BatchDNSResolver, DNS_FAILED, DNS_NXDOMAIN, DNS_RESOLVED, pre_resolve_nodes,
+)
+from app.modules.node_hunter.real_availability_check import PREFILTER_DNS_FAILED, check_any_address
+
+
+class _Answer:
+    def __init__(self, host, ttl):
+        self.host = host
+        self.ttl = ttl
+
+
+class _FakeAiodns:
+    """按 (主机名, 记录类型) 返回预设应答或 c-ares 错误码"""
+
+    def __init__(self, table):
+        self.table = table
+        self.queries = []
+
+    async def query(self, host, qtype):
+        self.queries.append((host, qtype))
+        answer = self.table.get((host, qtype), 1)  # 默认 ARES_ENODATA
+        if isinstance(answer, int):
+            raise dns_resolver.aiodns.error.DNSError(answer, "fake")
+        return answer
+
+    def cancel(self):
+        pass
+
+
+def _resolver_with(table):
+    pytest.importorskip("aiodns")
+    resolver = BatchDNSResolver(timeout=1)
+    resolver._aiodns = _FakeAiodns(table)
+    return resolver
+
+
+def test_aiodns_ttl_is_clamped_and_cached():
+    resolver = _resolver_with({("cdn.example", "A"): [_Answer("1.1.1.1", 30), _Answer("1.0.0.1", 9000)]})
+
+    async def run():
+        first = await resolver.resolve("cdn.example")
+        second = await resolver.resolve("CDN.example.")
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first.status == DNS_RESOLVED and first.ips == ("1.1.1.1", "1.0.0.1")
+    assert second.cached and second.ips == first.ips
+    # 缓存时间取应答中最小的 TTL（30 秒），再夹到 [DNS_MIN_TTL, DNS_MAX_TTL]
+    expires_at, _ = resolver.cache._data["cdn.example"]
+    remaining = expires_at - time.monotonic()
+    assert dns_resolver.DNS_MIN_TTL - 5 < remaining <= dns_resolver.DNS_MIN_TTL
+    assert resolver.lookups == 1
+
+
+def test_aiodns_falls_back_to_aaaa_and_detects_nxdomain():
+    resolver = _resolver_with({
+        ("v6.example", "AAAA"): [_Answer("2001:db8::1", 600)],
+        ("gone.example", "A"): 4,   # ARES_ENOTFOUND
+        ("flaky.example", "A"): 11,  # ARES_ECONNREFUSED 等其它错误
+    })
+
+    async def run():
+        return await resolver.resolve_many(["v6.example", "gone.example", "flaky.example"])
+
+    results = asyncio.run(run())
+    assert results["v6.example"].ips == ("2001:db8::1",)
+    assert results["gone.example"].status == DNS_NXDOMAIN
+    assert results["flaky.example"].status == DNS_FAILED
+    # NXDOMAIN 负缓存，临时错误不缓存
+    assert "gone.example" in resolver.cache
+    assert "flaky.example" not in resolver.cache
+
+
+def test_pre_resolve_drops_nxdomain_and_keeps_transient_failures():
+    resolver = _resolver_with({
+        ("ok.example", "A"): [_Answer("203.0.113.7", 300)],
+        ("gone.example", "A"): 4,
+        ("flaky.example", "A"): 11,
+    })
+    nodes = [
+        {"host": "ok.example", "port": 443},
+        {"host": "gone.example", "port": 443},
+        {"host": "flaky.example", "port": 443},
+        {"host": "198.51.100.1", "port": 80},
+        {"host": "ok.example", "port": 8443},
+    ]
+
+    survivors, stats = asyncio.run(pre_resolve_nodes(nodes, resolver))
+
+    assert [n["port"] for n in survivors] == [443, 443, 80, 8443]
+    assert nodes[1]["prefilter_failure"] == PREFILTER_DNS_FAILED
+    assert survivors[0]["resolved_ips"] == ["203.0.113.7"]
+    assert survivors[2]["resolved_ips"] == ["198.51.100.1"]
+    assert "resolved_ips" not in survivors[1]
+    assert stats["hosts"] == 4 and stats["nxdomain"] == 1 and stats["failed"] == 1
+    # 同一主机名只查询一次（A 命中后不再查 AAAA）
+    assert resolver._aiodns.queries.count(("ok.example", "A")) == 1
+
+
+def test_check_any_address_tries_next_address():
+    attempts = []
+
+    async def check(address, port, timeout):
+        attempts.append(address)
+        return address == "192.0.2.2", 12
+
+    ok, latency = asyncio.run(check_any_address(check, ["192.0.2.1", "192.0.2.2", "192.0.2.3"], 443, timeout=1))
+    assert ok and latency == 12
+    assert attempts == ["192.0.2.1", "192.0.2.2"]
@@ -0,0 +1,108 @@
+# backend/tests/test_node_queue.py
+import random
+
+from app.modules.node_hunter.node_queue import (
+    PendingNodeQueue, PRIORITY_NEW, PRIORITY_RETRY, PRIORITY_REVALIDATE, PRIORITY_TESTED,
+)
+
+
+def _node(i):
+    return {'host': f'h{i}', 'port': i}
+
+
+def test_pop_order_by_priority_then_added_time():
+    queue = PendingNodeQueue()
+    queue.push('a', _node(1), PRIORITY_TESTED, added_time=1)
+    queue.push('b', _node(2), PRIORITY_NEW, added_time=3)
+    queue.push('c', _node(3), PRIORITY_RETRY, added_time=2)
+    queue.push('d', _node(4), PRIORITY_NEW, added_time=2)
+    assert [n['port'] for n in queue.pop(10)] == [4, 2, 3, 1]
+    assert not queue
+    assert queue.stats()['heap_size'] == 0
+
+
+def test_push_existing_only_promotes():
+    queue = PendingNodeQueue()
+    assert queue.push('a', _node(1), PRIORITY_REVALIDATE, added_time=5)
+    assert not queue.push('a', _node(99), PRIORITY_TESTED)
+    assert queue.get('a')['priority'] == PRIORITY_REVALIDATE
+    assert not queue.push('a', _node(99), PRIORITY_NEW)
+    entry = queue.get('a')
+    assert entry['priority'] == PRIORITY_NEW
+    # 提升优先级保留原节点和入队时间
+    assert entry['node']['port'] == 1 and entry['added_time'] == 5
+    assert len(queue) == 1
+    assert queue.pop_entries(5) == [entry]
+
+
+def test_lazy_deletion_skips_stale_heap_items():
+    queue = PendingNodeQueue()
+    for i in range(5):
+        queue.push(f'k{i}', _node(i), PRIORITY_TESTED, added_time=i)
+    queue.update_priority('k3', PRIORITY_NEW)
+    queue.update_priority('k3', PRIORITY_RETRY)
+    queue.remove('k0')
+    # 失效堆项仍在堆里，但不会被取出
+    assert queue.stats()['heap_size'] > len(queue)
+    assert 'k0' not in queue
+    assert [n['port'] for n in queue.pop(2)] == [3, 1]
+    # 删除后重新入队，旧堆项不能复活
+    queue.push('k0', _node(0), PRIORITY_TESTED, added_time=100)
+    assert [n['port'] for n in queue.pop(10)] == [2, 4, 0]
+    assert queue.pop(1) == []
+
+
+def test_priority_counts_track_updates():
+    queue = PendingNodeQueue()
+    queue.push('a', _node(1), PRIORITY_NEW)
+    queue.push('b', _node(2), PRIORITY_NEW)
+    queue.push('c', _node(3), PRIORITY_TESTED)
+    queue.update_priority('b', PRIORITY_RETRY)
+    queue.remove('a')
+    assert queue.priority_counts() == {'retry': 1, 'tested': 1}
+    queue.clear()
+    assert queue.priority_counts() == {} and len(queue) == 0
+
+
+def test_heap_compaction_bounds_growth():
+    rng = random.Random(1)
+    queue = PendingNodeQueue()
+    for i in range(10):
+        queue.push(f'k{i}', _node(i), PRIORITY_TESTED)
+    for _ in range(3000):
+        queue.update_priority(f'k{rng.randrange(10)}', rng.choice([PRIORITY_NEW, PRIORITY_TESTED]))
+    assert queue.stats()['heap_size'] <= 2 * len(queue) + 1024 + 1
+    assert len(queue.pop(100)) == 10
+
+
+def test_random_operations_match_reference():
+    """随机操作序列下，出队顺序与按 (priority, added_time) 排序的参照实现一致"""
+    rng = random.Random(7)
+    queue = PendingNodeQueue()
+    reference = {}
+    for step in range(5000):
+        key = f'k{rng.randrange(200)}'
+        op = rng.random()
+        if op < 0.45:
+            priority = rng.randrange(4)
+            if key in reference:
+                if priority < reference[key][0]:
+                    reference[key] = (priority, reference[key][1])
+            else:
+                reference[key] = (priority, step)
+            queue.push(key, _node(step), priority, added_time=step)
+        elif op < 0.65:
+            priority = rng.randrange(4)
+            if key in reference:
+                reference[key] = (priority, reference[key][1])
+            assert queue.update_priority(key, priority) == (key in reference)
+        elif op < 0.85:
+            assert (queue.remove(key) is not None) == (reference.pop(key, None) is not None)
+        else:
+            count = rng.randrange(1, 6)
+            expected = sorted(reference, key=lambda k: reference[k])[:count]
+            popped = queue.pop_entries(count)
+            assert [(e['priority'], e['added_time']) for e in popped] == [reference[k] for k in expected]
+            for k in expected:
+                del reference[k]
+        assert len(queue) == len(reference)
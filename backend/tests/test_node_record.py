@@ -0,0 +1,47 @@
+# backend/tests/test_node_record.py
+import pytest
+
+from app.modules.node_hunter.node_record import NodeRecord
+
+
+@pytest.mark.parametrize("node", [
+    {'host': 'a.example.com', 'port': 443, 'protocol': 'vless', 'name': '🇭🇰 HK 01', 'country': 'HK',
+     'uuid': 'u-1', 'network': 'ws', 'security': 'tls', 'sni': 'cdn.example.com', 'path': '/ws',
+     'host_header': 'cdn.example.com', 'source_url': 'https://s.example.com/sub', 'share_link': 'vless://...'},
+    {'host': '1.2.3.4', 'port': 8388, 'protocol': 'ss', 'method': 'aes-256-gcm', 'password': 'p'},
+    # 不常见字段与检测结果进入 extra
+    {'host': 'b', 'port': 1, 'protocol': 'vmess', 'alterId': 0, 'alive': True, 'latency': 120,
+     'resolved_ips': ['1.1.1.1']},
+    # 值为空字符串 / 0 的字段要原样保留
+    {'host': 'c', 'port': 2, 'protocol': 'trojan', 'name': '', 'sni': ''},
+])
+def test_round_trip(node):
+    record = NodeRecord.from_dict(dict(node))
+    assert record.to_dict() == node
+    assert record.key == f"{node['host']}:{node['port']}"
+
+
+def test_missing_host_and_port_defaults():
+    record = NodeRecord.from_dict({'protocol': 'http'})
+    assert (record.host, record.port) == ('', 0)
+    assert record.extra is None
+
+
+def test_get_reads_fields_and_extra():
+    record = NodeRecord.from_dict({'host': 'h', 'port': 1, 'latency': 50})
+    assert record.get('host') == 'h'
+    assert record.get('latency') == 50
+    assert record.get('country', 'UNK') == 'UNK'
+    assert record.get('missing') is None
+
+
+def test_limited_value_fields_are_interned():
+    first = NodeRecord.from_dict({'host': ''.join(['h', 'x']), 'port': 1, 'protocol': ''.join(['vm', 'ess'])})
+    second = NodeRecord.from_dict({'host': ''.join(['h', 'x']), 'port': 2, 'protocol': ''.join(['vme', 'ss'])})
+    assert first.protocol is second.protocol
+    assert first.host is second.host
+
+
+def test_uses_slots():
+    record = NodeRecord(host='h', port=1)
+    assert not hasattr(record, '__dict__')
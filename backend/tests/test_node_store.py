@@ -0,0 +1,108 @@
+# backend/tests/test_node_store.py
+import random
+
+from app.modules.node_hunter.node_store import NodeCollection, node_key
+
+
+def _node(i, country='US', protocol='vmess', alive=False):
+    return {'host': f'h{i}', 'port': 1000 + i, 'country': country, 'protocol': protocol, 'alive': alive}
+
+
+def _assert_consistent(collection: NodeCollection):
+    """二级索引与逐个扫描节点得到的结果一致"""
+    nodes = collection.copy()
+    assert len(collection) == len(nodes)
+    assert collection.alive() == [n for n in nodes if n.get('alive')]
+    assert collection.alive_count() == sum(1 for n in nodes if n.get('alive'))
+    countries = {n.get('country') or 'UNK' for n in nodes}
+    for country in countries:
+        assert collection.by_country(country) == [n for n in nodes if (n.get('country') or 'UNK') == country]
+    assert collection.country_counts() == {
+        c: sum(1 for n in nodes if (n.get('country') or 'UNK') == c) for c in countries
+    }
+    alive_counts = {}
+    for n in nodes:
+        if n.get('alive'):
+            c = n.get('country') or 'UNK'
+            alive_counts[c] = alive_counts.get(c, 0) + 1
+    assert collection.country_counts(alive_only=True) == alive_counts
+    protocols = {(n.get('protocol') or 'unknown').lower() for n in nodes}
+    assert collection.protocol_counts() == {
+        p: sum(1 for n in nodes if (n.get('protocol') or 'unknown').lower() == p) for p in protocols
+    }
+    for n in nodes:
+        assert collection.get(n['host'], n['port']) is n
+        assert n in collection and node_key(n) in collection
+
+
+def test_upsert_keeps_position_and_reindexes():
+    collection = NodeCollection([_node(1), _node(2, 'JP'), _node(3)])
+    replacement = _node(1, 'HK', 'trojan', alive=True)
+    assert collection.upsert(replacement) is False
+    assert collection[0] is replacement
+    assert collection.by_country('US') == [collection[2]]
+    assert collection.by_protocol('TROJAN') == [replacement]
+    _assert_consistent(collection)
+
+
+def test_replace_all_dedups_by_host_port():
+    first, second = _node(1, 'US'), _node(1, 'JP')
+    collection = NodeCollection([first, _node(2), second])
+    assert len(collection) == 2
+    assert collection[0] is second
+    _assert_consistent(collection)
+
+
+def test_update_and_reindex_after_in_place_change():
+    collection = NodeCollection([_node(1), _node(2)])
+    collection.update('h1:1001', {'alive': True, 'country': 'SG'})
+    assert collection.alive() == [collection[0]]
+    node = collection[1]
+    node['protocol'] = 'VLESS'
+    collection.reindex(node)
+    assert collection.by_protocol('vless') == [node]
+    assert collection.update('missing:1', {'alive': True}) is None
+    _assert_consistent(collection)
+
+
+def test_remove_and_clear_drop_empty_buckets():
+    collection = NodeCollection([_node(1, 'JP', alive=True), _node(2)])
+    assert collection.remove('h1:1001')['country'] == 'JP'
+    assert collection.remove('h1:1001') is None
+    assert 'JP' not in collection.country_counts()
+    assert collection.alive_count() == 0
+    collection.clear()
+    assert not collection and collection.protocol_counts() == {}
+
+
+def test_sort_reorders_index_results():
+    collection = NodeCollection([_node(i, alive=True) for i in range(5)])
+    collection.sort(key=lambda n: n['port'], reverse=True)
+    assert [n['port'] for n in collection.alive()] == [1004, 1003, 1002, 1001, 1000]
+    _assert_consistent(collection)
+
+
+def test_random_operations_keep_indexes_consistent():
+    rng = random.Random(3)
+    collection = NodeCollection()
+    countries = ['US', 'JP', 'HK', None]
+    protocols = ['vmess', 'VLESS', 'trojan', None]
+    for step in range(3000):
+        i = rng.randrange(60)
+        op = rng.random()
+        if op < 0.4:
+            collection.upsert(_node(i, rng.choice(countries), rng.choice(protocols), rng.random() < 0.5))
+        elif op < 0.6:
+            collection.update(f'h{i}:{1000 + i}', {'alive': rng.random() < 0.5, 'country': rng.choice(countries)})
+        elif op < 0.75:
+            node = collection.get(f'h{i}', 1000 + i)
+            if node is not None:
+                node['protocol'] = rng.choice(protocols)
+                collection.reindex(node)
+        elif op < 0.95:
+            collection.remove(f'h{i}:{1000 + i}')
+        else:
+            collection.sort(key=lambda n: rng.random())
+        if step % 100 == 0:
+            _assert_consistent(collection)
+    _assert_consistent(collection)
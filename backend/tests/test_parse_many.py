@@ -0,0 +1,64 @@
+# backend/tests/test_parse_many.py
+import base64
+import json
+
+import pytest
+
+from app.modules.node_hunter import parsers
+from app.modules.node_hunter.parsers import parse_many, parse_node_url, shutdown_parse_pool
+
+
+def _links(count=120):
+    links = []
+    for i in range(count):
+        vmess = {"v": "2", "ps": f"🇯🇵 Tokyo {i}", "add": f"v{i}.example.com", "port": str(10000 + i),
+                 "id": f"00000000-0000-0000-0000-{i:012d}", "aid": "0", "net": "ws", "path": "/ws", "tls": "tls"}
+        links.append("vmess://" + base64.b64encode(json.dumps(vmess).encode()).decode())
+        links.append(f"vless://00000000-0000-0000-0000-{i:012d}@l{i}.example.com:443"
+                     f"?security=tls&type=ws&sni=s{i}.example.com#US%20No.{i}")
+        links.append(f"trojan://pw{i}@t{i}.example.com:443?sni=t{i}.example.com#香港{i}")
+        ss = f"aes-256-gcm:pass{i}@1.2.3.{i % 250}:{8000 + i}".encode()
+        links.append("ss://" + base64.b64encode(ss).decode() + f"#SS{i}")
+        links.append(f"unknown://{i}")
+        links.append(f"vmess://not-base64-{i}")
+    return links
+
+
+@pytest.fixture
+def pool():
+    yield
+    shutdown_parse_pool()
+
+
+def test_serial_and_pool_results_match(pool):
+    links = _links()
+    serial, serial_stats = parse_many(links, use_pool=False, use_cache=False)
+    pooled, pooled_stats = parse_many(links, chunk_size=50, use_pool=True, use_cache=False)
+    assert parsers._parse_pool is not None
+    assert pooled == serial
+    assert pooled_stats == serial_stats
+    assert serial_stats["total"] == len(links)
+    assert serial_stats["parsed"] == sum(1 for node in serial if node) == 480
+    assert serial_stats["errors"].get("unknown") == 120
+
+
+def test_matches_single_link_parser(monkeypatch):
+    monkeypatch.setattr(parsers, "get_parse_cache", lambda: None)
+    links = _links(20)
+    results, _ = parse_many(links, use_pool=False, use_cache=False)
+    assert results == [parse_node_url(link) for link in links]
+
+
+def test_pool_failure_falls_back_to_serial(monkeypatch, pool):
+    class _BrokenPool:
+        def map(self, *args, **kwargs):
+            raise RuntimeError("pool broken")
+
+        def shutdown(self, *args, **kwargs):
+            pass
+
+    monkeypatch.setattr(parsers, "_parse_pool", _BrokenPool())
+    links = _links(20)
+    results, _ = parse_many(links, chunk_size=10, use_pool=True, use_cache=False)
+    assert results == parse_many(links, use_pool=False, use_cache=False)[0]
+    assert parsers._parse_pool is None
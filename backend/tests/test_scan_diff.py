@@ -0,0 +1,63 @@
+# backend/tests/test_scan_diff.py
+from app.modules.node_hunter.scan_diff import ScanDiffer, node_fingerprint
+
+
+def _node(host, port=443, source='s1', **fields):
+    node = {'host': host, 'port': port, 'protocol': 'vless', 'uuid': 'u', 'source_url': source}
+    node.update(fields)
+    return node
+
+
+def _keys(nodes):
+    return sorted(f"{n['host']}:{n['port']}" for n in nodes)
+
+
+def test_first_scan_is_all_new():
+    differ = ScanDiffer()
+    diff = differ.diff([_node('a'), _node('b'), _node('a')], scope={'s1'})
+    assert _keys(diff.new) == ['a:443', 'b:443']
+    assert diff.summary() == {'new': 2, 'changed': 0, 'unchanged': 0, 'vanished': 0}
+    assert len(differ) == 2
+
+
+def test_classifies_changed_unchanged_and_vanished():
+    differ = ScanDiffer()
+    differ.diff([_node('a'), _node('b'), _node('c')], scope={'s1'})
+    diff = differ.diff([_node('a', name='renamed'), _node('b', uuid='other'), _node('d')], scope={'s1'})
+    # 名称变化不算配置变化
+    assert _keys(diff.unchanged) == ['a:443']
+    assert _keys(diff.changed) == ['b:443']
+    assert _keys(diff.new) == ['d:443']
+    assert diff.vanished == ['c:443']
+    assert len(differ) == 3
+    # 消失的节点从当前代移除，再次出现时算新节点
+    assert _keys(differ.diff([_node('c')], scope=None).new) == ['c:443']
+
+
+def test_vanished_only_within_scope():
+    differ = ScanDiffer()
+    differ.diff([_node('a', source='s1'), _node('b', source='s2'), _node('c', source=None)], scope={'s1', 's2', ''})
+    diff = differ.diff([], scope={'s2'})
+    assert diff.vanished == ['b:443']
+    # 无来源的节点记为 ""
+    assert differ.diff([], scope={''}).vanished == ['c:443']
+    assert differ.diff([], scope={'unknown-source'}).vanished == []
+    assert differ.diff([], scope=None).vanished == []
+    assert len(differ) == 1
+
+
+def test_node_moving_to_another_source_follows_new_source():
+    differ = ScanDiffer()
+    differ.diff([_node('a', source='s1')], scope={'s1'})
+    diff = differ.diff([_node('a', source='s2')], scope={'s2'})
+    assert _keys(diff.unchanged) == ['a:443']
+    # 节点已改由 s2 提供，s1 刷新时不再判为消失
+    assert differ.diff([], scope={'s1'}).vanished == []
+    assert differ.diff([], scope={'s2'}).vanished == ['a:443']
+
+
+def test_fingerprint_ignores_display_fields():
+    base = _node('a')
+    assert node_fingerprint(base) == node_fingerprint(dict(base, name='x', country='JP', source_url='s9'))
+    assert node_fingerprint(base) != node_fingerprint(dict(base, sni='cdn.example.com'))
+    assert node_fingerprint(base) != node_fingerprint(dict(base, port=80))
@@ -0,0 +1,84 @@
+# backend/tests/test_stream_extractor.py
+import base64
+import hashlib
+import json
+
+import pytest
+
+from app.modules.link_scraper.link_scraper import LinkScraper
+from app.modules.link_scraper.stream_extractor import MAX_CARRY, StreamingLinkExtractor, build_link_regex
+
+# 与抓取器使用同一套协议正则
+LINK_REGEX = build_link_regex(LinkScraper().patterns)
+
+
+def _sample_text(count=300):
+    lines = []
+    for i in range(count):
+        vmess = json.dumps({"add": f"h{i}.example.com", "port": i}).encode()
+        lines.append("vmess://" + base64.b64encode(vmess).decode())
+        lines.append(f"vless://uuid-{i}@v{i}.example.com:443?security=tls&sni=s{i}.example.com#节点{i}")
+        lines.append(f"说明文字 \"trojan://pw{i}@t{i}.example.com:443#T{i}\" 其他")
+        lines.append(f"ss://YWVzLTI1Ni1nY206cGFzcw=={i}@1.2.3.{i % 255}:8388")
+        lines.append(f"'https://raw.example.com/sub/{i}.yaml'")
+    return "\r\n".join(lines)
+
+
+def _expected(text):
+    return [m.group(0) for m in LINK_REGEX.finditer(text)]
+
+
+def _extract(body: bytes, chunk_size: int):
+    extractor = StreamingLinkExtractor(LINK_REGEX)
+    for i in range(0, len(body), chunk_size):
+        extractor.feed(body[i:i + chunk_size])
+    return extractor, extractor.finish()
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 7, 64, 1000, 4096, 65536, 10 ** 7])
+def test_plain_text_matches_finditer(chunk_size):
+    text = _sample_text()
+    body = text.encode("utf-8")
+    extractor, links = _extract(body, chunk_size)
+    assert links == _expected(text)
+    assert extractor.body_bytes == len(body)
+    assert extractor.sha256 == hashlib.sha256(body).hexdigest()
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 77, 4096, 10 ** 7])
+@pytest.mark.parametrize("wrap", [0, 76])
+def test_base64_body_matches_finditer(chunk_size, wrap):
+    text = _sample_text(120)
+    encoded = base64.b64encode(text.encode("utf-8"))
+    if wrap:
+        encoded = b"\n".join(encoded[i:i + wrap] for i in range(0, len(encoded), wrap))
+    _, links = _extract(encoded, chunk_size)
+    assert links == _expected(text)
+
+
+def test_urlsafe_base64_without_padding():
+    text = "vless://a@b.example.com:443?x=1#~~~\nvless://c@d.example.com:80#??>"
+    encoded = base64.urlsafe_b64encode(text.encode("utf-8")).rstrip(b"=")
+    _, links = _extract(encoded, 3)
+    assert links == _expected(text)
+
+
+def test_multibyte_text_split_inside_character():
+    text = "节点列表：\nvless://u@h.example.com:443#香港01\n" * 50
+    _, links = _extract(text.encode("utf-8"), 5)
+    assert links == _expected(text)
+
+
+@pytest.mark.parametrize("chunk_size", [4096, 65536])
+def test_long_run_without_delimiters(chunk_size):
+    # 超过 MAX_CARRY 的一整段不含分隔符：不能丢失、截断或重复链接
+    text = "x" * (MAX_CARRY + 1000) + "vless://u@h.example.com:443#A" + "," * (MAX_CARRY + 10) \
+        + "ss://YWVz@1.2.3.4:1" + "\nvless://last@h.example.com:1"
+    _, links = _extract(text.encode("utf-8"), chunk_size)
+    assert links == _expected(text)
+
+
+def test_text_that_only_starts_like_base64():
+    text = "A" * 5000 + "\nvless://u@h.example.com:443#名称\n"
+    _, links = _extract(text.encode("utf-8"), 1024)
+    assert links == _expected(text)